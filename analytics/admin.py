@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import ProductView, SearchQuery, CartActivityLog, SalesMetrics
+from .models import (
+    ProductView, ProductViewHourly, ProductViewDaily, SearchQuery, SearchQueryDaily,
+    CartActivityLog, CartActivityDaily, SalesMetrics, RollupWatermark,
+)
 
 
 @admin.register(ProductView)
@@ -10,6 +13,22 @@ class ProductViewAdmin(admin.ModelAdmin):
     readonly_fields = ['viewed_at']
 
 
+@admin.register(ProductViewHourly)
+class ProductViewHourlyAdmin(admin.ModelAdmin):
+    list_display = ['product', 'hour', 'views']
+    list_filter = ['hour']
+    search_fields = ['product__name']
+    readonly_fields = ['product', 'hour', 'views']
+
+
+@admin.register(ProductViewDaily)
+class ProductViewDailyAdmin(admin.ModelAdmin):
+    list_display = ['product', 'date', 'views', 'unique_sessions']
+    list_filter = ['date']
+    search_fields = ['product__name']
+    readonly_fields = ['product', 'date', 'views', 'unique_sessions']
+
+
 @admin.register(SearchQuery)
 class SearchQueryAdmin(admin.ModelAdmin):
     list_display = ['query', 'user', 'results_count', 'searched_at']
@@ -18,6 +37,14 @@ class SearchQueryAdmin(admin.ModelAdmin):
     readonly_fields = ['searched_at']
 
 
+@admin.register(SearchQueryDaily)
+class SearchQueryDailyAdmin(admin.ModelAdmin):
+    list_display = ['query', 'date', 'searches', 'zero_results']
+    list_filter = ['date']
+    search_fields = ['query']
+    readonly_fields = ['query', 'date', 'searches', 'zero_results']
+
+
 @admin.register(CartActivityLog)
 class CartActivityLogAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'action', 'quantity', 'created_at']
@@ -26,9 +53,22 @@ class CartActivityLogAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(CartActivityDaily)
+class CartActivityDailyAdmin(admin.ModelAdmin):
+    list_display = ['date', 'action', 'events', 'quantity', 'unique_sessions', 'unique_users']
+    list_filter = ['action', 'date']
+    readonly_fields = ['date', 'action', 'events', 'quantity', 'unique_sessions', 'unique_users']
+
+
 @admin.register(SalesMetrics)
 class SalesMetricsAdmin(admin.ModelAdmin):
     list_display = ['date', 'total_orders', 'completed_orders', 'total_revenue', 'new_users']
     list_filter = ['date']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'date'
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value', 'updated_at']
+    readonly_fields = ['updated_at']
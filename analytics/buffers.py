@@ -0,0 +1,183 @@
+"""
+In-process write buffers for high-volume analytics events.
+
+A ``BatchBuffer`` queues events in memory and hands them to a writer in
+batches, either from a background thread (when ``batch_size`` events are
+waiting or the oldest has waited ``flush_interval`` seconds) or inline
+through ``flush()``. ``stop()`` drains what is left and runs at interpreter
+exit once the thread has started. Events that arrive while ``max_size``
+are already waiting are dropped and counted rather than growing memory
+without bound; ``metrics()`` reports depth, throughput and flush latency.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBuffer:
+    """Thread-safe queue whose events are written by ``writer(events)`` in batches."""
+
+    def __init__(self, name, writer, batch_size=500, flush_interval=2.0, max_size=50000):
+        self.name = name
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+
+        # (enqueued monotonic time, event)
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._atexit_registered = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_at = None
+        self.last_flush_duration = 0.0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, event):
+        """Queue ``event``; returns False when the buffer is full and it was dropped."""
+        with self._condition:
+            if len(self._events) >= self.max_size:
+                self.dropped += 1
+                return False
+            self._events.append((time.monotonic(), event))
+            self.enqueued += 1
+            full_batch = len(self._events) >= self.batch_size
+            # Wake the flusher to start the interval clock or write a full batch
+            if full_batch or len(self._events) == 1:
+                self._condition.notify()
+        if full_batch and not self.running:
+            # Without the background thread, writes happen on the caller's thread
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write every queued event now, in batches; returns how many were written."""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def start(self):
+        """Start the background flusher if it is not running."""
+        with self._condition:
+            if self.running:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name=f'{self.name}-flusher', daemon=True
+            )
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self, timeout=10.0):
+        """Stop the flusher after it drains the queue; flushes inline if it cannot."""
+        thread = self._thread
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def metrics(self):
+        with self._condition:
+            depth = len(self._events)
+            oldest_age = time.monotonic() - self._events[0][0] if depth else 0.0
+        return {
+            'name': self.name,
+            'running': self.running,
+            'depth': depth,
+            'oldest_event_age_ms': round(oldest_age * 1000, 1),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'last_flush_at': self.last_flush_at,
+            'last_flush_duration_ms': round(self.last_flush_duration * 1000, 1),
+            'last_flush_latency_ms': round(self.last_flush_latency * 1000, 1),
+            'max_flush_latency_ms': round(self.max_flush_latency * 1000, 1),
+        }
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self._stopping and not self._due():
+                        self._condition.wait(self._wait_time())
+                    stopping = self._stopping
+                # Drop connections the database closed while the thread idled
+                close_old_connections()
+                if stopping:
+                    self.flush()
+                    return
+                batch = self._take(self.batch_size)
+                if batch:
+                    self._write(batch)
+        finally:
+            connection.close()
+
+    def _due(self):
+        if not self._events:
+            return False
+        return (
+            len(self._events) >= self.batch_size
+            or time.monotonic() - self._events[0][0] >= self.flush_interval
+        )
+
+    def _wait_time(self):
+        if not self._events:
+            return None
+        return max(self.flush_interval - (time.monotonic() - self._events[0][0]), 0.0)
+
+    def _take(self, count):
+        with self._condition:
+            count = min(count, len(self._events))
+            return [self._events.popleft() for _ in range(count)]
+
+    def _write(self, batch):
+        # One writer at a time so a manual flush and the thread never interleave
+        with self._flush_lock:
+            started = time.monotonic()
+            try:
+                self.writer([event for _, event in batch])
+            except Exception:
+                self.failed += len(batch)
+                logger.exception('Dropped %d events from the %s buffer', len(batch), self.name)
+                return 0
+            finished = time.monotonic()
+            latency = finished - batch[0][0]
+            self.written += len(batch)
+            self.flushes += 1
+            self.last_flush_at = time.time()
+            self.last_flush_duration = finished - started
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            return len(batch)
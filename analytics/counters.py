@@ -0,0 +1,56 @@
+"""
+Additive upserts for pre-aggregated counter tables.
+
+``add_to_counters`` adds deltas to counter rows identified by a unique key,
+creating missing rows, with one ``INSERT ... ON CONFLICT DO UPDATE``
+statement per row on SQLite and PostgreSQL (``bulk_create`` conflict
+handling can only overwrite, not add). Other databases fall back to
+``F()`` updates.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+
+
+def add_to_counters(model, key_fields, counter_fields, deltas):
+    """
+    Add ``deltas`` to ``model``'s counters.
+
+    ``deltas`` maps a tuple of ``key_fields`` values (unique together) to a
+    tuple of increments for ``counter_fields``.
+    """
+    if not deltas:
+        return
+    if connection.vendor in ('sqlite', 'postgresql'):
+        keys = [model._meta.get_field(name) for name in key_fields]
+        counters = [model._meta.get_field(name) for name in counter_fields]
+        table = model._meta.db_table
+        columns = ', '.join(field.column for field in keys + counters)
+        placeholders = ', '.join(['%s'] * (len(keys) + len(counters)))
+        conflict = ', '.join(field.column for field in keys)
+        updates = ', '.join(
+            f'{field.column} = {table}.{field.column} + excluded.{field.column}' for field in counters
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+                f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}',
+                [
+                    (
+                        *(
+                            field.get_db_prep_value(value, connection)
+                            for field, value in zip(keys, key, strict=True)
+                        ),
+                        *increments,
+                    )
+                    for key, increments in deltas.items()
+                ],
+            )
+        return
+    with transaction.atomic():
+        for key, increments in deltas.items():
+            lookup = dict(zip(key_fields, key, strict=True))
+            updated = model.objects.filter(**lookup).update(**{
+                name: F(name) + increment for name, increment in zip(counter_fields, increments, strict=True)
+            })
+            if not updated:
+                model.objects.create(**lookup, **dict(zip(counter_fields, increments, strict=True)))
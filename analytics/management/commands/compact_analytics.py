@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from analytics import retention
+
+
+class Command(BaseCommand):
+    help = 'Roll raw analytics events past their retention into daily aggregates and purge them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=list(retention.TABLES),
+            help='Table to compact; repeat for several (default: all)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Keep this many whole days of raw rows instead of ANALYTICS_RETENTION_DAYS',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=7,
+            help='Days rolled up per transaction (default: 7)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help='Write each purged batch to a gzipped JSONL file in this directory first',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='VACUUM the SQLite database afterwards to return freed pages to the filesystem',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if options['chunk_days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--chunk-days and --batch-size must be at least 1')
+
+        for table in options['table'] or retention.TABLES:
+            before, deleted = retention.compact(
+                table,
+                days=options['days'],
+                chunk_days=options['chunk_days'],
+                batch_size=options['batch_size'],
+                archive_dir=options['archive_dir'],
+            )
+            self.stdout.write(f'{table}: purged {deleted} rows before {before:%Y-%m-%d}')
+
+        if options['vacuum']:
+            if connection.vendor != 'sqlite':
+                raise CommandError('--vacuum is only supported on SQLite')
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS('Analytics tables compacted.'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from analytics.trending import rebuild_hourly_views
+
+
+class Command(BaseCommand):
+    help = 'Recompute hourly product view buckets from raw product views'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=48,
+            help='Rebuild buckets for this many most recent hours (default: 48)',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        buckets = rebuild_hourly_views(since)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {buckets} hourly view buckets for the last {options['hours']} hours."
+        ))
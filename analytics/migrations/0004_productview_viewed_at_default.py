@@ -0,0 +1,19 @@
+# Generated by Django 5.0.13 on 2026-10-17 05:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productview',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
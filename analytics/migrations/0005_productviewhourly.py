@@ -0,0 +1,53 @@
+# Generated by Django 5.0.13 on 2026-10-17 05:20
+
+import django.db.models.deletion
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def populate_hourly_views(apps, schema_editor):
+    """Bucket the raw views already recorded."""
+    ProductView = apps.get_model('analytics', 'ProductView')
+    ProductViewHourly = apps.get_model('analytics', 'ProductViewHourly')
+    buckets = ProductView.objects.annotate(
+        bucket=TruncHour('viewed_at', tzinfo=datetime.timezone.utc)
+    ).values('product_id', 'bucket').annotate(views=Count('id')).order_by()
+    ProductViewHourly.objects.bulk_create(
+        [
+            ProductViewHourly(product_id=row['product_id'], hour=row['bucket'], views=row['views'])
+            for row in buckets.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_productview_viewed_at_default'),
+        ('products', '0010_identifier_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductViewHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour (UTC)')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_views', to='products.product')),
+            ],
+            options={
+                'db_table': 'product_view_hourly',
+                'indexes': [models.Index(fields=['hour', 'product'], name='product_vie_hour_5fdbe4_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productviewhourly',
+            constraint=models.UniqueConstraint(fields=('product', 'hour'), name='unique_product_view_hour'),
+        ),
+        migrations.RunPython(populate_hourly_views, migrations.RunPython.noop),
+    ]
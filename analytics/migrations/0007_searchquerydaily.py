@@ -0,0 +1,65 @@
+# Generated by Django 5.0.13 on 2026-10-17 05:26
+
+import datetime
+import unicodedata
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_daily_counts(apps, schema_editor):
+    """Fold the raw search log into normalized per-day counters."""
+    SearchQuery = apps.get_model('analytics', 'SearchQuery')
+    SearchQueryDaily = apps.get_model('analytics', 'SearchQueryDaily')
+    counts = {}
+    for query, searched_at, results_count in SearchQuery.objects.values_list(
+        'query', 'searched_at', 'results_count'
+    ).iterator():
+        query = ' '.join(unicodedata.normalize('NFKC', query).casefold().split())[:255].strip()
+        if not query:
+            continue
+        key = (query, searched_at.astimezone(datetime.timezone.utc).date())
+        searches, zero_results = counts.get(key, (0, 0))
+        counts[key] = (searches + 1, zero_results + (results_count == 0))
+    SearchQueryDaily.objects.bulk_create(
+        [
+            SearchQueryDaily(query=query, date=date, searches=searches, zero_results=zero_results)
+            for (query, date), (searches, zero_results) in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_rollupwatermark'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchquery',
+            name='searched_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SearchQueryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(help_text='Normalized query text', max_length=255)),
+                ('date', models.DateField()),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_results', models.PositiveIntegerField(default=0, help_text='Searches that found nothing')),
+            ],
+            options={
+                'verbose_name_plural': 'Search query daily counts',
+                'db_table': 'search_query_daily',
+                'indexes': [models.Index(fields=['date'], name='search_quer_date_543d56_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchquerydaily',
+            constraint=models.UniqueConstraint(fields=('query', 'date'), name='unique_search_query_day'),
+        ),
+        migrations.RunPython(populate_daily_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.13 on 2026-10-17 05:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_searchquerydaily'),
+        ('products', '0010_identifier_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartActivityDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action', models.CharField(choices=[('add', 'Add Item'), ('remove', 'Remove Item'), ('update', 'Update Quantity'), ('clear', 'Clear Cart'), ('checkout', 'Checkout')], max_length=20)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('unique_sessions', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Cart activity daily counts',
+                'db_table': 'cart_activity_daily',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_sessions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Product view daily counts',
+                'db_table': 'product_view_daily',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productview',
+            index=models.Index(fields=['viewed_at'], name='product_vie_viewed__28cb00_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartactivitydaily',
+            constraint=models.UniqueConstraint(fields=('date', 'action'), name='unique_cart_activity_day'),
+        ),
+        migrations.AddField(
+            model_name='productviewdaily',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='productviewdaily',
+            index=models.Index(fields=['date'], name='product_vie_date_38db37_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productviewdaily',
+            constraint=models.UniqueConstraint(fields=('product', 'date'), name='unique_product_view_day'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.13 on 2026-10-17 05:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_retention_aggregates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cartactivitylog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from products.models import Product
 
 
@@ -26,20 +27,71 @@ class ProductView(models.Model):
     # Referrer
     referrer = models.URLField(max_length=500, blank=True)
     
-    # Timestamp
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    # Timestamp; set when the view is tracked, which may precede its buffered insert
+    viewed_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'product_views'
         indexes = [
             models.Index(fields=['product', '-viewed_at']),
             models.Index(fields=['session_id']),
+            models.Index(fields=['viewed_at']),
         ]
     
     def __str__(self):
         return f"View of {self.product.name} at {self.viewed_at}"
 
 
+class ProductViewHourly(models.Model):
+    """Product view counts per hour, summed for trending instead of raw views."""
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='hourly_views'
+    )
+    hour = models.DateTimeField(help_text="Start of the hour (UTC)")
+    views = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'product_view_hourly'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'hour'], name='unique_product_view_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour', 'product']),
+        ]
+    
+    def __str__(self):
+        return f"{self.views} views of {self.product_id} at {self.hour}"
+
+
+class ProductViewDaily(models.Model):
+    """Product views per UTC day, kept after raw views pass their retention."""
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_views'
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_sessions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'product_view_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_view_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+        verbose_name_plural = 'Product view daily counts'
+    
+    def __str__(self):
+        return f"{self.views} views of {self.product_id} on {self.date}"
+
+
 class SearchQuery(models.Model):
     """Track search queries for analytics and recommendations."""
     
@@ -59,7 +111,7 @@ class SearchQuery(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
     # Timestamp
-    searched_at = models.DateTimeField(auto_now_add=True)
+    searched_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'search_queries'
@@ -73,8 +125,30 @@ class SearchQuery(models.Model):
         return f"Search: {self.query}"
 
 
+class SearchQueryDaily(models.Model):
+    """Per-day counters for each normalized search query."""
+    
+    query = models.CharField(max_length=255, help_text="Normalized query text")
+    date = models.DateField()
+    searches = models.PositiveIntegerField(default=0)
+    zero_results = models.PositiveIntegerField(default=0, help_text="Searches that found nothing")
+    
+    class Meta:
+        db_table = 'search_query_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['query', 'date'], name='unique_search_query_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+        verbose_name_plural = 'Search query daily counts'
+    
+    def __str__(self):
+        return f"{self.query} on {self.date}: {self.searches}"
+
+
 class CartActivityLog(models.Model):
-    """Log cart activities for analytics (triggered by Supabase Edge)."""
+    """Cart changes published by the cart and checkout, inserted in batches."""
     
     ACTION_CHOICES = (
         ('add', 'Add Item'),
@@ -107,7 +181,7 @@ class CartActivityLog(models.Model):
     cart_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
     # Timestamp
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'cart_activity_logs'
@@ -120,6 +194,27 @@ class CartActivityLog(models.Model):
         return f"{self.action} - {self.product.name if self.product else 'N/A'}"
 
 
+class CartActivityDaily(models.Model):
+    """Cart activity per UTC day and action, kept after raw logs pass their retention."""
+    
+    date = models.DateField()
+    action = models.CharField(max_length=20, choices=CartActivityLog.ACTION_CHOICES)
+    events = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    unique_sessions = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'cart_activity_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'action'], name='unique_cart_activity_day'),
+        ]
+        verbose_name_plural = 'Cart activity daily counts'
+    
+    def __str__(self):
+        return f"{self.events} {self.action} on {self.date}"
+
+
 class SalesMetrics(models.Model):
     """Aggregated daily sales metrics."""
     
@@ -154,3 +249,17 @@ class SalesMetrics(models.Model):
     
     def __str__(self):
         return f"Metrics for {self.date}"
+
+
+class RollupWatermark(models.Model):
+    """How far an incremental rollup job has processed its source rows."""
+    
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'rollup_watermarks'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
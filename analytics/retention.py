@@ -0,0 +1,180 @@
+"""
+Retention for the append-only analytics event tables.
+
+``compact`` keeps a table's raw rows for ``ANALYTICS_RETENTION_DAYS``
+whole UTC days. Older days are first rolled up into their daily
+aggregate (``ProductViewDaily``, ``CartActivityDaily``) chunk by chunk,
+each chunk moving the table's ``retention:<table>`` watermark in the same
+transaction, and then raw rows below the watermark are deleted in bounded
+batches, optionally after each batch is written to its own gzipped JSONL
+archive file. A run interrupted while purging resumes purging without
+counting any day or archiving any row twice. Search queries need no rollup (they are counted in
+``SearchQueryDaily`` as they are logged) and hourly view buckets are only
+read for trending, so both are purged directly.
+"""
+import datetime
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CartActivityDaily,
+    CartActivityLog,
+    ProductView,
+    ProductViewDaily,
+    ProductViewHourly,
+    RollupWatermark,
+    SearchQuery,
+)
+from .rollups import day_start
+
+def rollup_product_views(since, until):
+    rows = ProductView.objects.filter(viewed_at__gte=since, viewed_at__lt=until).annotate(
+        day=TruncDate('viewed_at', tzinfo=datetime.timezone.utc)
+    ).values('product_id', 'day').annotate(
+        views=Count('id'),
+        unique_sessions=Count('session_id', distinct=True, filter=~Q(session_id='')),
+    ).order_by()
+    ProductViewDaily.objects.bulk_create(
+        [
+            ProductViewDaily(
+                product_id=row['product_id'], date=row['day'],
+                views=row['views'], unique_sessions=row['unique_sessions'],
+            )
+            for row in rows.iterator()
+        ],
+        update_conflicts=True,
+        unique_fields=['product', 'date'],
+        update_fields=['views', 'unique_sessions'],
+        batch_size=500,
+    )
+
+
+def rollup_cart_activity(since, until):
+    rows = CartActivityLog.objects.filter(created_at__gte=since, created_at__lt=until).annotate(
+        day=TruncDate('created_at', tzinfo=datetime.timezone.utc)
+    ).values('day', 'action').annotate(
+        events=Count('id'),
+        quantity=Sum('quantity'),
+        unique_sessions=Count('session_id', distinct=True, filter=~Q(session_id='')),
+        unique_users=Count('user_id', distinct=True),
+    ).order_by()
+    CartActivityDaily.objects.bulk_create(
+        [
+            CartActivityDaily(
+                date=row['day'], action=row['action'], events=row['events'],
+                quantity=row['quantity'] or 0, unique_sessions=row['unique_sessions'],
+                unique_users=row['unique_users'],
+            )
+            for row in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['date', 'action'],
+        update_fields=['events', 'quantity', 'unique_sessions', 'unique_users'],
+        batch_size=500,
+    )
+
+
+# Table name -> (model, timestamp field, rollup into daily aggregates or None)
+TABLES = {
+    'product_views': (ProductView, 'viewed_at', rollup_product_views),
+    'search_queries': (SearchQuery, 'searched_at', None),
+    'cart_activity_logs': (CartActivityLog, 'created_at', rollup_cart_activity),
+    'product_view_hourly': (ProductViewHourly, 'hour', None),
+}
+
+
+def retention_days(table):
+    return settings.ANALYTICS_RETENTION_DAYS[table]
+
+
+def horizon(days, now=None):
+    """Start of the oldest UTC day whose raw rows are kept."""
+    today = (now or timezone.now()).astimezone(datetime.timezone.utc).date()
+    return day_start(today - timedelta(days=days))
+
+
+def rollup_before(table, before, chunk_days=7):
+    """
+    Roll ``table``'s rows older than ``before`` (a UTC midnight) into its
+    daily aggregate; returns the new watermark, below which rows may go.
+    """
+    model, field, rollup = TABLES[table]
+    name = f'retention:{table}'
+    watermark = RollupWatermark.objects.filter(name=name).values_list('value', flat=True).first()
+    if watermark is None:
+        first = model.objects.aggregate(first=Min(field))['first']
+        if first is None:
+            return before
+        watermark = day_start(first.astimezone(datetime.timezone.utc).date())
+
+    while watermark < before:
+        chunk_end = min(watermark + timedelta(days=chunk_days), before)
+        with transaction.atomic():
+            rollup(watermark, chunk_end)
+            RollupWatermark.objects.update_or_create(name=name, defaults={'value': chunk_end})
+        watermark = chunk_end
+    return watermark
+
+
+def purge_before(table, before, batch_size=5000, archive_dir=None):
+    """
+    Delete ``table``'s rows older than ``before`` ``batch_size`` at a time,
+    lowest pk first, writing each batch to ``archive_dir`` first; yields
+    batch sizes.
+    """
+    model, field, _ = TABLES[table]
+    old = model.objects.filter(**{f'{field}__lt': before}).order_by('pk')
+    while True:
+        with transaction.atomic():
+            if archive_dir is None:
+                pks = list(old.values_list('pk', flat=True)[:batch_size])
+            else:
+                rows = list(old.values()[:batch_size])
+                pks = [row[model._meta.pk.attname] for row in rows]
+                if rows:
+                    write_archive(archive_dir, table, rows, pks[0])
+            if not pks:
+                return
+            model.objects.filter(pk__in=pks).delete()
+        yield len(pks)
+
+
+def write_archive(directory, table, rows, first_pk):
+    """
+    Write one batch to a file named after its lowest pk.
+
+    A batch whose delete rolled back starts at the same pk when retried,
+    so the retry replaces the file instead of archiving its rows again.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{table}-{first_pk:012d}.jsonl.gz')
+    partial = path + '.partial'
+    with gzip.open(partial, 'wt', encoding='utf-8') as archive:
+        for row in rows:
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+    os.replace(partial, path)
+
+
+def compact(table, days=None, chunk_days=7, batch_size=5000, archive_dir=None):
+    """
+    Roll up and purge ``table``'s rows older than its retention; returns
+    the purge horizon and the number of rows deleted.
+    """
+    rollup = TABLES[table][2]
+    before = horizon(retention_days(table) if days is None else days)
+    if rollup is not None:
+        before = min(before, rollup_before(table, before, chunk_days))
+
+    deleted = 0
+    for count in purge_before(table, before, batch_size, archive_dir):
+        deleted += count
+    return before, deleted
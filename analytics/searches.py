@@ -0,0 +1,85 @@
+"""
+Normalized search query counters.
+
+Every logged search adds to ``SearchQueryDaily``, one row per normalized
+query and UTC day, so case and whitespace variants share a counter and
+popular, zero-result and suggested queries read a compact aggregate
+instead of the raw log. Raw ``SearchQuery`` rows are only kept for a
+``SEARCH_QUERY_RAW_SAMPLE_RATE`` sample of searches.
+"""
+import datetime
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .counters import add_to_counters
+from .models import SearchQueryDaily
+
+MAX_QUERY_LENGTH = SearchQueryDaily._meta.get_field('query').max_length
+
+
+def normalize_query(query):
+    """Case-folded, NFKC-normalized query with runs of whitespace collapsed."""
+    query = unicodedata.normalize('NFKC', query or '').casefold()
+    return ' '.join(query.split())[:MAX_QUERY_LENGTH].strip()
+
+
+def count_searches(searches):
+    """``{(query, day): (searches, zero_results)}`` for ``(query, results_count, searched_at)`` tuples."""
+    counts = {}
+    for query, results_count, searched_at in searches:
+        query = normalize_query(query)
+        if not query:
+            continue
+        key = (query, searched_at.astimezone(datetime.timezone.utc).date())
+        total, zero = counts.get(key, (0, 0))
+        counts[key] = (total + 1, zero + (results_count == 0))
+    return counts
+
+
+def record_daily_searches(counts):
+    add_to_counters(SearchQueryDaily, ['query', 'date'], ['searches', 'zero_results'], counts)
+
+
+def _window(days):
+    since = timezone.now().astimezone(datetime.timezone.utc).date() - timedelta(days=days - 1)
+    return SearchQueryDaily.objects.filter(date__gte=since).values('query')
+
+
+def popular_queries(days=7, limit=20):
+    """Most searched queries over the last ``days`` UTC days, today included."""
+    return list(
+        _window(days).annotate(
+            search_count=Sum('searches'), zero_results=Sum('zero_results')
+        ).order_by('-search_count', 'query')[:limit]
+    )
+
+
+def zero_result_queries(days=7, limit=20):
+    """Queries that most often found nothing over the last ``days``."""
+    return list(
+        _window(days).annotate(
+            zero_results=Sum('zero_results'), search_count=Sum('searches')
+        ).filter(zero_results__gt=0).order_by('-zero_results', 'query')[:limit]
+    )
+
+
+def min_suggestion_searches():
+    """Searches a query needs before it is shown to other shoppers."""
+    return getattr(settings, 'SEARCH_SUGGESTION_MIN_SEARCHES', 5)
+
+
+def suggest_queries(prefix, days=30, limit=10):
+    """Popular queries starting with ``prefix`` that usually found something."""
+    prefix = normalize_query(prefix)
+    if not prefix:
+        return []
+    rows = _window(days).filter(query__startswith=prefix).annotate(
+        search_count=Sum('searches'), zero_results=Sum('zero_results')
+    ).filter(
+        search_count__gte=min_suggestion_searches(), search_count__gt=F('zero_results') * 2
+    ).order_by('-search_count', 'query')
+    return [row['query'] for row in rows[:limit]]
@@ -15,6 +15,14 @@ class ProductViewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'viewed_at']
 
 
+class ProductViewTrackSerializer(serializers.Serializer):
+    """Payload of the public product view tracking endpoint."""
+    
+    product = serializers.UUIDField()
+    session_id = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    referrer = serializers.URLField(max_length=500, required=False, allow_blank=True, default='')
+
+
 class SearchQuerySerializer(serializers.ModelSerializer):
     """Serializer for SearchQuery model."""
     
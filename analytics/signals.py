@@ -0,0 +1,17 @@
+"""Log storefront searches and cart activity; handlers only queue events."""
+from django.dispatch import receiver
+
+from orders.signals import cart_activity
+from products.search import product_searched
+from .tracking import track_cart_activity, track_search
+
+
+@receiver(product_searched)
+def log_product_search(sender, query, results_count, user=None, session_id='', ip_address=None, **kwargs):
+    track_search(query, results_count, user=user, session_id=session_id, ip_address=ip_address)
+
+
+@receiver(cart_activity)
+def log_cart_activity(sender, user_id, cart_id, action, product_id=None, quantity=0, cart_total=None,
+                      session_id='', **kwargs):
+    track_cart_activity(user_id, cart_id, action, product_id, quantity, cart_total, session_id)
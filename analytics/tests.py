@@ -1,3 +1,552 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from decimal import Decimal
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .buffers import BatchBuffer
+from .models import (
+    CartActivityDaily, CartActivityLog, ProductView, ProductViewDaily, ProductViewHourly,
+    RollupWatermark, SalesMetrics, SearchQuery, SearchQueryDaily,
+)
+from .rollups import compute_sales_metrics
+from .searches import normalize_query
+from .tracking import cart_activity, product_views, search_queries, track_product_view, track_search
+from .trending import hour_bucket, trending_products
+
+User = get_user_model()
+
+
+class BatchBufferTest(SimpleTestCase):
+    def make_buffer(self, **options):
+        self.batches = []
+        self.written_event = threading.Event()
+    
+        def writer(events):
+            self.batches.append(list(events))
+            self.written_event.set()
+    
+        return BatchBuffer('test', writer, **options)
+    
+    def test_flushes_on_size_without_thread(self):
+        """Test a full batch is written inline when no flusher runs"""
+        buffer = self.make_buffer(batch_size=3)
+        for i in range(7):
+            buffer.add(i)
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer.metrics()['written'], 7)
+    
+    def test_background_flush_on_interval_and_drain_on_stop(self):
+        """Test the flusher writes aged events and stop drains the rest"""
+        buffer = self.make_buffer(batch_size=100, flush_interval=0.05)
+        buffer.start()
+        try:
+            buffer.add('a')
+            self.assertTrue(self.written_event.wait(2))
+            self.assertEqual(self.batches, [['a']])
+            self.assertGreater(buffer.metrics()['last_flush_latency_ms'], 0)
+    
+            buffer.flush_interval = 60
+            buffer.add('b')
+            buffer.add('c')
+        finally:
+            buffer.stop()
+        self.assertFalse(buffer.running)
+        self.assertEqual(self.batches, [['a'], ['b', 'c']])
+        self.assertEqual(buffer.metrics()['depth'], 0)
+    
+    def test_event_added_to_idle_flusher_is_written_on_interval(self):
+        """Test an event queued while the flusher already waits is not held until stop"""
+        buffer = self.make_buffer(batch_size=100, flush_interval=0.05)
+        buffer.start()
+        try:
+            # Let the thread reach its untimed wait on the empty queue
+            time.sleep(0.1)
+            buffer.add('a')
+            self.assertTrue(self.written_event.wait(1))
+            self.assertEqual(self.batches, [['a']])
+        finally:
+            buffer.stop()
+    
+    def test_drops_when_full_and_counts_failures(self):
+        """Test a full buffer drops events and writer errors are counted"""
+        buffer = BatchBuffer('failing', lambda events: 1 / 0, batch_size=10, max_size=2)
+        self.assertTrue(buffer.add(1))
+        self.assertTrue(buffer.add(2))
+        self.assertFalse(buffer.add(3))
+        with self.assertLogs('analytics.buffers', level='ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        metrics = buffer.metrics()
+        self.assertEqual((metrics['dropped'], metrics['failed'], metrics['depth']), (1, 2, 0))
+
+
+class ProductViewTrackingTest(TestCase):
+    def setUp(self):
+        product_views.flush()
+        self.seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass123', is_staff=True
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=self.seller, category=category, name='Laptop', slug='laptop',
+            description='Fast', price=999, stock=5, sku='LAP001'
+        )
+        self.client = APIClient()
+    
+    def test_track_queues_without_queries_and_flush_inserts_batch(self):
+        """Test tracking is write-free per view and flushed views land in one INSERT"""
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(3):
+                response = self.client.post(
+                    '/api/analytics/product-views/track/',
+                    {'product': str(self.product.id), 'session_id': 'abc'},
+                    HTTP_X_FORWARDED_FOR='203.0.113.9, 10.0.0.1',
+                )
+                self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(ProductView.objects.count(), 0)
+    
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(product_views.flush(), 3)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        # A client-sent X-Forwarded-For is not trusted without a configured proxy
+        view = ProductView.objects.first()
+        self.assertEqual((view.session_id, view.ip_address), ('abc', '127.0.0.1'))
+    
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_track_reads_address_appended_by_trusted_proxy(self):
+        """Test only the X-Forwarded-For entry added by the trusted proxy is used"""
+        self.client.post(
+            '/api/analytics/product-views/track/',
+            {'product': str(self.product.id), 'session_id': 'abc'},
+            HTTP_X_FORWARDED_FOR='203.0.113.9, 198.51.100.7',
+        )
+        product_views.flush()
+        self.assertEqual(ProductView.objects.get().ip_address, '198.51.100.7')
+    
+    def test_views_of_deleted_products_are_skipped(self):
+        """Test a batch still inserts when one of its products is gone"""
+        track_product_view(self.product.id, session_id='a')
+        track_product_view(uuid.uuid4(), session_id='b', ip_address='not an ip')
+        product_views.flush()
+        self.assertEqual(list(ProductView.objects.values_list('session_id', flat=True)), ['a'])
+    
+    def test_metrics_are_admin_only(self):
+        """Test buffer metrics are exposed to admins"""
+        self.assertEqual(self.client.get('/api/analytics/product-views/buffer_metrics/').status_code, 401)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/analytics/product-views/buffer_metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['name'], 'product_views')
+        self.assertIn('depth', response.data[0])
+
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_views.flush()
+        seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass123', is_staff=True
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.old, self.new = [
+            Product.objects.create(
+                seller=seller, category=category, name=name, slug=name.lower(),
+                description='Fast', price=10, stock=5, sku=name.upper()
+            )
+            for name in ('Radio', 'Phone')
+        ]
+    
+    def view(self, product, count, hours_ago=0):
+        viewed_at = timezone.now() - timedelta(hours=hours_ago)
+        ProductView.objects.bulk_create([
+            ProductView(product=product, session_id='s', viewed_at=viewed_at) for _ in range(count)
+        ])
+    
+    def test_flushed_views_accumulate_in_hourly_buckets(self):
+        """Test every flushed batch adds to its product's bucket for the hour"""
+        for _ in range(2):
+            for _ in range(3):
+                track_product_view(self.new.id, session_id='s')
+            product_views.flush()
+        bucket = ProductViewHourly.objects.get(product=self.new)
+        self.assertEqual((bucket.hour, bucket.views), (hour_bucket(timezone.now()), 6))
+    
+    def test_count_and_decay_rankings(self):
+        """Test count mode sums the window and decay mode favours recent views"""
+        self.view(self.old, 5, hours_ago=72)
+        self.view(self.new, 3)
+        self.view(self.old, 50, hours_ago=24 * 10)
+        call_command('rollup_product_views', hours=24 * 30, stdout=open(os.devnull, 'w'))
+        
+        by_count = trending_products(days=7)
+        self.assertEqual([(row['product__name'], row['view_count']) for row in by_count], [('Radio', 5), ('Phone', 3)])
+        by_decay = trending_products(days=7, mode='decay')
+        self.assertEqual([row['product__name'] for row in by_decay], ['Phone', 'Radio'])
+        self.assertAlmostEqual(by_decay[1]['score'], 5 * 0.5 ** 3, places=3)
+    
+    def test_rankings_are_cached_per_window(self):
+        """Test a repeated window is served without queries"""
+        self.view(self.new, 2)
+        call_command('rollup_product_views', stdout=open(os.devnull, 'w'))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        first = client.get('/api/analytics/product-views/trending/', {'days': 1})
+        self.assertEqual(first.status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            trending_products(days=1)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.data[0]['view_count'], 2)
+        self.assertEqual(
+            client.get('/api/analytics/product-views/trending/', {'mode': 'viral'}).status_code, 400
+        )
+
+
+@override_settings(SEARCH_QUERY_RAW_SAMPLE_RATE=0)
+class SearchQueryCounterTest(TestCase):
+    def setUp(self):
+        search_queries.flush()
+        seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass123', is_staff=True
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        Product.objects.create(
+            seller=seller, category=category, name='Gaming Laptop', slug='gaming-laptop',
+            description='Fast', price=999, stock=5, sku='LAP001'
+        )
+        self.client = APIClient()
+    
+    def test_variants_share_a_daily_counter(self):
+        """Test case, width and whitespace variants are counted as one query"""
+        self.assertEqual(normalize_query('  Gaming\tＬＡＰＴＯＰ '), 'gaming laptop')
+        for query in ('Gaming Laptop', 'gaming  laptop', 'GAMING LAPTOP'):
+            track_search(query, results_count=1)
+        track_search('tablet', results_count=0)
+        with CaptureQueriesContext(connection) as ctx:
+            search_queries.flush()
+        # One upsert statement for the whole batch, run once per counter row
+        self.assertEqual(len([q for q in ctx.captured_queries if 'ON CONFLICT' in q['sql']]), 1)
+        track_search('gaming laptop', results_count=1)
+        search_queries.flush()
+    
+        counters = SearchQueryDaily.objects.order_by('query')
+        self.assertEqual(
+            [(row.query, row.searches, row.zero_results) for row in counters],
+            [('gaming laptop', 4, 0), ('tablet', 1, 1)]
+        )
+        self.assertEqual(SearchQuery.objects.count(), 0)
+    
+    @override_settings(SEARCH_QUERY_RAW_SAMPLE_RATE=1)
+    def test_product_list_search_is_logged_and_sampled(self):
+        """Test a storefront search is counted and its raw row kept when sampled"""
+        self.client.get('/api/products/', {'search': 'Laptop'})
+        self.client.get('/api/products/', {'search': 'laptop', 'page': 2})
+        search_queries.flush()
+        self.assertEqual(SearchQueryDaily.objects.get().searches, 1)
+        self.assertEqual(SearchQuery.objects.get().results_count, 1)
+    
+    def test_reports_read_the_counters(self):
+        """Test popular, zero-result and suggestion endpoints use the daily counters"""
+        for query, results_count in [('laptop', 3), ('Laptop', 3), ('laptop bag', 0), ('lamp', 2)]:
+            track_search(query, results_count)
+        search_queries.flush()
+        SearchQueryDaily.objects.create(
+            query='laptop', date=timezone.now().date() - timedelta(days=30), searches=100
+        )
+    
+        self.client.force_authenticate(self.admin)
+        popular = self.client.get('/api/analytics/search-queries/popular/', {'days': 7})
+        self.assertEqual([(row['query'], row['search_count']) for row in popular.data][:2], [('laptop', 2), ('lamp', 1)])
+        zero = self.client.get('/api/analytics/search-queries/zero_results/')
+        self.assertEqual([row['query'] for row in zero.data], ['laptop bag'])
+        self.assertEqual(
+            self.client.get('/api/analytics/search-queries/popular/', {'days': 'week'}).status_code, 400
+        )
+    
+        self.client.force_authenticate(None)
+        suggestions = self.client.get('/api/analytics/search-queries/suggestions/', {'q': ' LA'})
+        # Below the default minimum of searches nothing is suggested
+        self.assertEqual(suggestions.data, [])
+        with self.settings(SEARCH_SUGGESTION_MIN_SEARCHES=1):
+            suggestions = self.client.get('/api/analytics/search-queries/suggestions/', {'q': ' LA'})
+        self.assertEqual(suggestions.data, ['laptop', 'lamp'])
+
+
+class CartActivityLoggingTest(TestCase):
+    def setUp(self):
+        cart_activity.flush()
+        seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com', username='buyer', password='pass123'
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=seller, category=category, name='Laptop', slug='laptop',
+            description='Fast', price=Decimal('100.00'), stock=10, sku='LAP001'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        
+    def post(self, path, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(path, data, format='json')
+        self.assertEqual(response.status_code, 200 if 'cart' in path else 201, response.data)
+        return response
+        
+    def test_cart_changes_are_queued_and_batch_inserted(self):
+        """Test cart actions publish events that are inserted in one batch with totals"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.post('/api/cart/add_item/', {'product_id': str(self.product.id), 'quantity': 2})
+        self.assertFalse([q for q in ctx.captured_queries if 'cart_activity_logs' in q['sql']])
+        item_id = self.client.get('/api/cart/').data['items'][0]['id']
+        self.post('/api/cart/update_item/', {'item_id': item_id, 'quantity': 3})
+        self.post('/api/cart/remove_item/', {'item_id': item_id})
+        self.post('/api/cart/add_item/', {'product_id': str(self.product.id), 'quantity': 1})
+        self.post('/api/cart/clear/', {})
+        self.assertEqual(CartActivityLog.objects.count(), 0)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(cart_activity.flush(), 5)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]), 1)
+        logs = CartActivityLog.objects.order_by('created_at', 'id')
+        self.assertEqual(
+            [(log.action, log.quantity) for log in logs],
+            [('add', 2), ('update', 3), ('remove', 3), ('add', 1), ('clear', 0)]
+        )
+        self.assertTrue(all(log.user_id == self.buyer.id for log in logs))
+        # Totals are read when the batch is written, after the cart was cleared
+        self.assertEqual(logs[0].cart_total, Decimal('0.00'))
+        
+    def test_checkout_logs_the_order_subtotal(self):
+        """Test checkout publishes one event carrying the cart's subtotal"""
+        self.post('/api/cart/add_item/', {'product_id': str(self.product.id), 'quantity': 2})
+        self.post('/api/orders/', {
+            'shipping_address': '1 Main St', 'shipping_city': 'Austin', 'shipping_state': 'TX',
+            'shipping_zip': '73301', 'shipping_country': 'USA', 'phone': '555',
+        })
+        cart_activity.flush()
+        checkout = CartActivityLog.objects.get(action='checkout')
+        self.assertEqual((checkout.quantity, checkout.cart_total, checkout.product_id), (2, Decimal('200.00'), None))
+        
+    def test_cart_changes_record_the_session(self):
+        """Test cart events carry the request's session key"""
+        session_key = self.client.session.session_key
+        self.post('/api/cart/add_item/', {'product_id': str(self.product.id), 'quantity': 1})
+        self.post('/api/orders/', {
+            'shipping_address': '1 Main St', 'shipping_city': 'Austin', 'shipping_state': 'TX',
+            'shipping_zip': '73301', 'shipping_country': 'USA', 'phone': '555',
+        })
+        cart_activity.flush()
+        self.assertTrue(session_key)
+        self.assertEqual(
+            set(CartActivityLog.objects.values_list('session_id', flat=True)), {session_key}
+        )
+        
+    def test_failed_changes_are_not_logged(self):
+        """Test a rejected cart change publishes nothing"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/cart/add_item/', {'product_id': str(self.product.id), 'quantity': 50}, format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(cart_activity), 0)
+
+
+class SalesRollupTest(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.yesterday = self.today - timedelta(days=1)
+        self.buyers = [
+            User.objects.create_user(email=f'buyer{i}@example.com', username=f'buyer{i}', password='pass123')
+            for i in range(2)
+        ]
+        self.orders = [
+            self.order(self.buyers[0], 'delivered', days_ago=1, quantities=[2, 1]),
+            self.order(self.buyers[1], 'pending', days_ago=1, quantities=[1]),
+            self.order(self.buyers[1], 'cancelled', days_ago=1, quantities=[5]),
+            self.order(self.buyers[0], 'pending', days_ago=0, quantities=[3]),
+        ]
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass123', is_staff=True
+        )
+    
+    def order(self, buyer, status, days_ago, quantities):
+        order = Order.objects.create(
+            user=buyer, status=status, subtotal=100, tax=10, shipping_cost=5, total=115,
+            shipping_address='1 Main St', shipping_city='Austin', shipping_state='TX',
+            shipping_zip='73301', shipping_country='USA', phone='555'
+        )
+        for index, quantity in enumerate(quantities):
+            OrderItem.objects.create(
+                order=order, product_name=f'Item {index}', product_sku=f'SKU-{index}',
+                price=10, quantity=quantity
+            )
+        created_at = timezone.now() - timedelta(days=days_ago)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+    
+    def run_rollup(self, *args):
+        call_command('rollup_sales_metrics', *args, stdout=open(os.devnull, 'w'))
+    
+    def test_backfill_builds_every_metric(self):
+        """Test a backfill writes each day from grouped queries"""
+        with CaptureQueriesContext(connection) as ctx:
+            metrics = compute_sales_metrics(self.yesterday, self.today + timedelta(days=1))
+        self.assertEqual(len(ctx.captured_queries), 3)
+        
+        self.run_rollup('--backfill', '--chunk-days', '1')
+        day = SalesMetrics.objects.get(date=self.yesterday)
+        self.assertEqual(
+            (day.total_orders, day.completed_orders, day.cancelled_orders, day.active_users),
+            (3, 1, 1, 2)
+        )
+        self.assertEqual((day.total_revenue, day.total_tax, day.total_shipping), (Decimal('230.00'), 20, 10))
+        self.assertEqual((day.total_products_sold, day.unique_products_sold), (4, 0))
+        self.assertEqual(SalesMetrics.objects.get(date=self.today).new_users, 3)
+        self.assertEqual(metrics[self.today]['total_products_sold'], 3)
+    
+    def test_incremental_run_rebuilds_only_changed_days(self):
+        """Test the watermark limits a run to days whose orders changed"""
+        self.run_rollup()
+        watermark = RollupWatermark.objects.get(name='sales_metrics').value
+        SalesMetrics.objects.filter(date=self.today).update(total_orders=99)
+        
+        order = Order.objects.get(pk=self.orders[1].pk)
+        order.status = 'cancelled'
+        order.save()
+        OrderItem.objects.filter(order=self.orders[0], quantity=2).update(
+            is_refunded=True, refunded_at=timezone.now()
+        )
+        self.run_rollup()
+        
+        day = SalesMetrics.objects.get(date=self.yesterday)
+        self.assertEqual((day.cancelled_orders, day.total_revenue, day.total_products_sold), (2, Decimal('115.00'), 1))
+        # Today was not touched since the last run, so it was not rebuilt
+        self.assertEqual(SalesMetrics.objects.get(date=self.today).total_orders, 99)
+        self.assertGreater(RollupWatermark.objects.get(name='sales_metrics').value, watermark)
+    
+    def test_summary_reads_rollup(self):
+        """Test the admin summary endpoint reports rolled up metrics"""
+        self.run_rollup()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/analytics/sales-metrics/summary/', {'days': 7})
+        self.assertEqual(response.data['total_orders'], 4)
+
+
+class RetentionTest(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=seller, category=category, name='Laptop', slug='laptop',
+            description='Fast', price=999, stock=5, sku='LAP001'
+        )
+        self.now = timezone.now()
+        self.old_day = (self.now - timedelta(days=100)).date()
+        views = [('a', 100), ('a', 100), ('b', 100), ('c', 1)]
+        ProductView.objects.bulk_create([
+            ProductView(product=self.product, session_id=session, viewed_at=self.now - timedelta(days=days))
+            for session, days in views
+        ])
+        for session, action, quantity, days in [('a', 'add', 2, 200), ('b', 'add', 1, 200), ('a', 'checkout', 0, 1)]:
+            log = CartActivityLog.objects.create(
+                product=self.product, action=action, quantity=quantity, session_id=session
+            )
+            CartActivityLog.objects.filter(pk=log.pk).update(created_at=self.now - timedelta(days=days))
+        SearchQuery.objects.create(query='old', session_id='a', searched_at=self.now - timedelta(days=100))
+        
+    def compact(self, *args):
+        call_command('compact_analytics', *args, stdout=open(os.devnull, 'w'))
+        
+    def test_old_rows_are_rolled_up_then_purged(self):
+        """Test rows past retention land in daily aggregates before they are deleted"""
+        self.compact('--batch-size', '1')
+        
+        daily = ProductViewDaily.objects.get()
+        self.assertEqual((daily.date, daily.views, daily.unique_sessions), (self.old_day, 3, 2))
+        self.assertEqual(list(ProductView.objects.values_list('session_id', flat=True)), ['c'])
+        cart = CartActivityDaily.objects.get()
+        self.assertEqual((cart.action, cart.events, cart.quantity, cart.unique_sessions), ('add', 2, 3, 2))
+        self.assertEqual(list(CartActivityLog.objects.values_list('action', flat=True)), ['checkout'])
+        self.assertFalse(SearchQuery.objects.exists())
+        
+    def test_rerun_after_partial_purge_does_not_recount(self):
+        """Test the watermark keeps a resumed run from rebuilding purged days"""
+        self.compact('--table', 'product_views', '--days', '50')
+        self.assertTrue(RollupWatermark.objects.filter(name='retention:product_views').exists())
+        ProductView.objects.create(
+            product=self.product, session_id='late', viewed_at=self.now - timedelta(days=100)
+        )
+        self.compact('--table', 'product_views', '--days', '50')
+        self.assertEqual(ProductViewDaily.objects.get().views, 3)
+        self.assertEqual(ProductView.objects.count(), 1)
+        
+    def test_purged_rows_are_archived(self):
+        """Test purged rows are written to a gzipped JSONL archive"""
+        with tempfile.TemporaryDirectory() as directory:
+            self.compact('--table', 'search_queries', '--archive-dir', directory)
+            self.compact('--table', 'search_queries', '--archive-dir', directory)
+            [name] = os.listdir(directory)
+            with gzip.open(os.path.join(directory, name), 'rt') as f:
+                rows = [json.loads(line) for line in f]
+        self.assertTrue(name.startswith('search_queries-'))
+        self.assertEqual([row['query'] for row in rows], ['old'])
+        
+    def test_retry_after_failed_delete_archives_rows_once(self):
+        """Test a batch archived before its delete rolled back is replaced, not repeated"""
+        real_delete = QuerySet.delete
+        deletes = []
+        
+        def fail_second_batch(queryset):
+            deletes.append(queryset)
+            if len(deletes) == 2:
+                raise DatabaseError('disk I/O error')
+            return real_delete(queryset)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.object(QuerySet, 'delete', autospec=True, side_effect=fail_second_batch):
+                with self.assertRaises(DatabaseError):
+                    self.compact('--table', 'product_views', '--archive-dir', directory, '--batch-size', '2')
+            self.assertEqual(ProductView.objects.count(), 2)
+            self.compact('--table', 'product_views', '--archive-dir', directory)
+            rows = []
+            for name in sorted(os.listdir(directory)):
+                with gzip.open(os.path.join(directory, name), 'rt') as f:
+                    rows.extend(json.loads(line) for line in f)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len({row['id'] for row in rows}), 3)
+        self.assertEqual(ProductView.objects.count(), 1)
 
-# Create your tests here.
@@ -0,0 +1,205 @@
+"""
+Buffered product view, search and cart activity tracking.
+
+``track_product_view`` queues a view in ``product_views``, a
+``BatchBuffer`` whose writer inserts each batch with one ``bulk_create``
+and folds it into the hourly buckets behind trending.
+The public tracking endpoint therefore does no database work per view.
+``track_search`` does the same for storefront searches in
+``search_queries``, whose writer adds to the daily query counters and
+inserts only the sampled raw rows. ``track_cart_activity`` queues the
+``orders.signals.cart_activity`` events in ``cart_activity``, whose writer
+fills in missing ``cart_total`` snapshots with one grouped query per
+batch before inserting the logs.
+A buffer's flusher thread starts on its first event unless
+``ANALYTICS_BUFFER_BACKGROUND`` is off, in which case full batches are
+written by the request that fills them and ``flush()`` writes the rest.
+"""
+import random
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Cart
+from products.models import Product
+
+from .buffers import BatchBuffer
+from .models import CartActivityLog, ProductView, SearchQuery
+from .searches import count_searches, record_daily_searches
+from .trending import count_views, record_hourly_views
+
+
+def write_product_views(events):
+    """
+    Insert a batch of views, skipping products deleted since they were
+    viewed, and add them to the hourly trending buckets.
+    """
+    product_ids = {event['product_id'] for event in events}
+    existing = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+    with transaction.atomic():
+        views = ProductView.objects.bulk_create(
+            [ProductView(**event) for event in events if event['product_id'] in existing],
+            batch_size=getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', 500),
+        )
+        record_hourly_views(count_views(views))
+
+
+product_views = BatchBuffer(
+    'product_views',
+    write_product_views,
+    batch_size=getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', 2.0),
+    max_size=getattr(settings, 'ANALYTICS_BUFFER_MAX_SIZE', 50000),
+)
+
+
+def write_search_queries(events):
+    """Add a batch of searches to the daily counters and insert the sampled raw rows."""
+    counts = count_searches(
+        (event['query'], event['results_count'], event['searched_at']) for event in events
+    )
+    with transaction.atomic():
+        record_daily_searches(counts)
+        SearchQuery.objects.bulk_create(
+            [SearchQuery(**event['row']) for event in events if event['row'] is not None],
+            batch_size=getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', 500),
+        )
+
+
+search_queries = BatchBuffer(
+    'search_queries',
+    write_search_queries,
+    batch_size=getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', 2.0),
+    max_size=getattr(settings, 'ANALYTICS_BUFFER_MAX_SIZE', 50000),
+)
+
+
+def write_cart_activity(events):
+    """
+    Insert a batch of cart activity logs. Events published without a total
+    get their cart's total at write time, a moment after the change.
+    """
+    cart_ids = {event['cart_id'] for event in events if event['cart_total'] is None}
+    totals = dict(
+        Cart.objects.filter(pk__in=cart_ids).with_totals().values_list('pk', 'items_price')
+    ) if cart_ids else {}
+    product_ids = {event['product_id'] for event in events if event['product_id'] is not None}
+    existing = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+    CartActivityLog.objects.bulk_create(
+        [
+            CartActivityLog(
+                user_id=event['user_id'],
+                product_id=event['product_id'] if event['product_id'] in existing else None,
+                action=event['action'],
+                quantity=event['quantity'],
+                session_id=event['session_id'],
+                cart_total=totals.get(event['cart_id']) if event['cart_total'] is None else event['cart_total'],
+                created_at=event['created_at'],
+            )
+            for event in events
+        ],
+        batch_size=getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', 500),
+    )
+
+
+cart_activity = BatchBuffer(
+    'cart_activity',
+    write_cart_activity,
+    batch_size=getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', 2.0),
+    max_size=getattr(settings, 'ANALYTICS_BUFFER_MAX_SIZE', 50000),
+)
+
+
+def _start(buffer):
+    if getattr(settings, 'ANALYTICS_BUFFER_BACKGROUND', True) and not buffer.running:
+        buffer.start()
+
+
+def client_ip(request):
+    """
+    The caller's address. ``X-Forwarded-For`` is client-controlled, so it is
+    only read behind ``TRUSTED_PROXY_COUNT`` proxies, taking the entry the
+    outermost of them appended.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [
+            address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+            if address.strip()
+        ]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def _valid_ip(ip_address):
+    # A malformed address would fail the whole batch's INSERT later
+    try:
+        validate_ipv46_address(ip_address or '')
+    except ValidationError:
+        return None
+    return ip_address
+
+
+def track_product_view(product_id, user=None, session_id='', ip_address=None, user_agent='', referrer=''):
+    """Queue one product view; returns False if the buffer was full and it was dropped."""
+    _start(product_views)
+    ip_address = _valid_ip(ip_address)
+    return product_views.add({
+        'product_id': product_id,
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+        'session_id': session_id,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'referrer': referrer,
+        'viewed_at': timezone.now(),
+    })
+
+
+def track_search(query, results_count, user=None, session_id='', ip_address=None):
+    """
+    Queue one search for the daily counters; a ``SEARCH_QUERY_RAW_SAMPLE_RATE``
+    share of searches also keeps its raw row. Returns False if it was dropped.
+    """
+    _start(search_queries)
+    searched_at = timezone.now()
+    row = None
+    if random.random() < getattr(settings, 'SEARCH_QUERY_RAW_SAMPLE_RATE', 0.1):
+        row = {
+            'query': query[:SearchQuery._meta.get_field('query').max_length],
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'results_count': results_count,
+            'session_id': session_id,
+            'ip_address': _valid_ip(ip_address),
+            'searched_at': searched_at,
+        }
+    return search_queries.add({
+        'query': query,
+        'results_count': results_count,
+        'searched_at': searched_at,
+        'row': row,
+    })
+
+
+def track_cart_activity(user_id, cart_id, action, product_id=None, quantity=0, cart_total=None, session_id=''):
+    """Queue one cart change; returns False if the buffer was full and it was dropped."""
+    _start(cart_activity)
+    return cart_activity.add({
+        'user_id': user_id,
+        'cart_id': cart_id,
+        'action': action,
+        'product_id': product_id,
+        'quantity': quantity,
+        'cart_total': cart_total,
+        'session_id': session_id,
+        'created_at': timezone.now(),
+    })
+
+
+def buffer_metrics():
+    return [product_views.metrics(), search_queries.metrics(), cart_activity.metrics()]
@@ -0,0 +1,120 @@
+"""
+Trending products from hourly view buckets.
+
+Every batch of tracked views also adds to ``ProductViewHourly`` (one
+upsert per product and hour), so trending over ``days`` sums at most
+``24 * days`` small rows per product instead of scanning raw views.
+``rebuild_hourly_views`` recomputes buckets from the raw table and backs
+the ``rollup_product_views`` command. Rankings are cached per window for
+the current hour.
+"""
+import datetime
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .counters import add_to_counters
+from .models import ProductView, ProductViewHourly
+
+MODES = ('count', 'decay')
+
+
+def hour_bucket(moment):
+    """Start of the UTC hour containing ``moment``."""
+    return moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def record_hourly_views(counts):
+    """Add ``{(product_id, hour): views}`` to the hourly buckets."""
+    add_to_counters(
+        ProductViewHourly, ['product', 'hour'], ['views'],
+        {key: (views,) for key, views in counts.items()},
+    )
+
+
+def count_views(views):
+    """Bucket counts for an iterable of ``ProductView`` instances."""
+    counts = {}
+    for view in views:
+        key = (view.product_id, hour_bucket(view.viewed_at))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def rebuild_hourly_views(since, until=None):
+    """
+    Recompute the buckets from ``since`` (rounded down to the hour) to
+    ``until`` from raw views; returns the number of buckets written.
+    """
+    since = hour_bucket(since)
+    views = ProductView.objects.filter(viewed_at__gte=since)
+    buckets = ProductViewHourly.objects.filter(hour__gte=since)
+    if until is not None:
+        views = views.filter(viewed_at__lt=until)
+        buckets = buckets.filter(hour__lt=until)
+    rows = views.annotate(
+        bucket=TruncHour('viewed_at', tzinfo=datetime.timezone.utc)
+    ).values('product_id', 'bucket').annotate(views=Count('id')).order_by()
+
+    with transaction.atomic():
+        buckets.delete()
+        created = ProductViewHourly.objects.bulk_create(
+            [
+                ProductViewHourly(product_id=row['product_id'], hour=row['bucket'], views=row['views'])
+                for row in rows.iterator()
+            ],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def trending_products(days=7, limit=10, mode='count', half_life_hours=None):
+    """
+    Most viewed active products over the last ``days``, best first.
+
+    ``count`` ranks by total views; ``decay`` weighs each hour's views by
+    ``0.5 ** (age / half_life_hours)`` so recent interest ranks higher.
+    Results are cached per window until the hour turns over or
+    ``TRENDING_CACHE_TIMEOUT`` passes.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown trending mode: {mode}')
+    half_life_hours = half_life_hours or getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+    current_hour = hour_bucket(timezone.now())
+    key = f'trending:{mode}:{days}:{limit}:{half_life_hours}:{current_hour:%Y%m%d%H}'
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    # The current, partial hour plus the previous 24 * days - 1 full hours
+    hours = [current_hour - timedelta(hours=age) for age in range(days * 24)]
+    buckets = ProductViewHourly.objects.filter(
+        hour__gte=hours[-1], product__is_active=True
+    ).values('product__id', 'product__name')
+    if mode == 'count':
+        ranked = buckets.annotate(view_count=Sum('views')).order_by('-view_count', 'product__id')
+    else:
+        weight = Case(
+            *[
+                When(hour=hour, then=Value(0.5 ** (age / half_life_hours)))
+                for age, hour in enumerate(hours)
+            ],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        ranked = buckets.annotate(
+            view_count=Sum('views'),
+            score=Sum(F('views') * weight, output_field=FloatField()),
+        ).order_by('-score', 'product__id')
+
+    result = list(ranked[:limit])
+    for row in result:
+        if 'score' in row:
+            row['score'] = round(row['score'], 4)
+    cache.set(key, result, getattr(settings, 'TRENDING_CACHE_TIMEOUT', 300))
+    return result
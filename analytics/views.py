@@ -1,12 +1,17 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Sum
+from django.conf import settings
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
 from .models import ProductView, SearchQuery, CartActivityLog, SalesMetrics
+from .searches import popular_queries, suggest_queries, zero_result_queries
+from .tracking import buffer_metrics, client_ip, track_product_view
+from .trending import MODES as TRENDING_MODES, count_views, record_hourly_views, trending_products
 from .serializers import (
     ProductViewSerializer,
+    ProductViewTrackSerializer,
     SearchQuerySerializer,
     CartActivityLogSerializer,
     SalesMetricsSerializer
@@ -20,19 +25,58 @@ class ProductViewViewSet(viewsets.ModelViewSet):
     serializer_class = ProductViewSerializer
     permission_classes = [permissions.IsAdminUser]
     
+    def perform_create(self, serializer):
+        view = serializer.save()
+        record_hourly_views(count_views([view]))
+    
     @action(detail=False, methods=['get'])
     def trending(self, request):
-        """Get trending products based on views."""
-        days = int(request.query_params.get('days', 7))
-        since = timezone.now() - timedelta(days=days)
+        """
+        Get trending products based on views.
+        
+        Sums hourly view buckets over the last ``days`` (at most
+        ``TRENDING_MAX_DAYS``); ``mode=decay`` favours recent views.
+        """
+        try:
+            days = int(request.query_params.get('days', 7))
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'days and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        mode = request.query_params.get('mode', 'count')
+        if mode not in TRENDING_MODES:
+            return Response(
+                {'error': f"mode must be one of: {', '.join(TRENDING_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        trending = ProductView.objects.filter(
-            viewed_at__gte=since
-        ).values('product__id', 'product__name').annotate(
-            view_count=Count('id')
-        ).order_by('-view_count')[:10]
+        days = min(max(days, 1), getattr(settings, 'TRENDING_MAX_DAYS', 30))
+        limit = min(max(limit, 1), 100)
+        return Response(trending_products(days=days, limit=limit, mode=mode))
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    def track(self, request):
+        """
+        Record a product page view without touching the database.
         
-        return Response(trending)
+        Views are queued in memory and inserted in batches by a background
+        flusher, so the response does not wait for a write.
+        """
+        serializer = ProductViewTrackSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queued = track_product_view(
+            serializer.validated_data['product'],
+            user=request.user,
+            session_id=serializer.validated_data['session_id'],
+            ip_address=client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            referrer=serializer.validated_data['referrer'],
+        )
+        return Response({'queued': queued}, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'])
+    def buffer_metrics(self, request):
+        """Depth, throughput and flush latency of the in-process view buffer."""
+        return Response(buffer_metrics())
 
 
 class SearchQueryViewSet(viewsets.ModelViewSet):
@@ -42,19 +86,37 @@ class SearchQueryViewSet(viewsets.ModelViewSet):
     serializer_class = SearchQuerySerializer
     permission_classes = [permissions.IsAdminUser]
     
+    def window(self, request, default_days):
+        """``days`` and ``limit`` query params, clamped; raises ``ValueError``."""
+        days = int(request.query_params.get('days', default_days))
+        limit = int(request.query_params.get('limit', 20))
+        return (
+            min(max(days, 1), getattr(settings, 'SEARCH_QUERY_MAX_DAYS', 90)),
+            min(max(limit, 1), 100),
+        )
+    
     @action(detail=False, methods=['get'])
     def popular(self, request):
-        """Get popular search queries."""
-        days = int(request.query_params.get('days', 7))
-        since = timezone.now() - timedelta(days=days)
-        
-        popular = SearchQuery.objects.filter(
-            searched_at__gte=since
-        ).values('query').annotate(
-            search_count=Count('id')
-        ).order_by('-search_count')[:20]
-        
-        return Response(popular)
+        """Get popular search queries from the normalized daily counters."""
+        try:
+            days, limit = self.window(request, 7)
+        except ValueError:
+            return Response({'error': 'days and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(popular_queries(days=days, limit=limit))
+    
+    @action(detail=False, methods=['get'])
+    def zero_results(self, request):
+        """Get the queries that most often found no products."""
+        try:
+            days, limit = self.window(request, 7)
+        except ValueError:
+            return Response({'error': 'days and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(zero_result_queries(days=days, limit=limit))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def suggestions(self, request):
+        """Popular past queries completing ``?q=``, for the search box."""
+        return Response(suggest_queries(request.query_params.get('q', '')))
 
 
 class CartActivityLogViewSet(viewsets.ModelViewSet):
@@ -398,3 +398,81 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # In Docker, use /app/media for persistent storage
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.getenv('MEDIA_ROOT', BASE_DIR / 'media')
+
+# Cart stock reservations
+# Units added to a cart are held for this many minutes before
+# `release_expired_reservations` returns them to stock
+CART_RESERVATION_TTL = timedelta(minutes=int(os.getenv('CART_RESERVATION_TTL_MINUTES', '15')))
+
+# Product search
+# Dotted path to a products.search backend; defaults to the SQLite FTS5
+# index on SQLite and to unindexed name/brand/SKU matching elsewhere
+if os.getenv('PRODUCT_SEARCH_BACKEND'):
+    PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND')
+PRODUCT_SEARCH_LIMIT = 500
+
+# Product detail responses are cached per (slug, detail_version)
+PRODUCT_DETAIL_CACHE_TIMEOUT = int(os.getenv('PRODUCT_DETAIL_CACHE_TIMEOUT', 60 * 15))
+# Reviews embedded in product detail; the rest come from the paginated feed
+PRODUCT_DETAIL_REVIEW_COUNT = 5
+
+# Bulk catalog imports: rows validated and written per transaction, rows per
+# INSERT/UPDATE statement, and rejected rows listed in an API response
+PRODUCT_IMPORT_CHUNK_SIZE = 1000
+PRODUCT_IMPORT_BATCH_SIZE = 500
+PRODUCT_IMPORT_MAX_ERRORS = 1000
+
+# Rows fetched per round trip while streaming order exports
+ORDER_EXPORT_CHUNK_SIZE = 2000
+
+# Analytics events (product views, searches, cart activity) are queued in
+# memory per kind and inserted in batches of ANALYTICS_BUFFER_BATCH_SIZE, or
+# once the oldest has waited ANALYTICS_BUFFER_FLUSH_INTERVAL seconds; past
+# ANALYTICS_BUFFER_MAX_SIZE queued events new ones are dropped. Without the background flusher, full
+# batches are written by the request that fills them.
+ANALYTICS_BUFFER_BATCH_SIZE = int(os.getenv('ANALYTICS_BUFFER_BATCH_SIZE', '500'))
+ANALYTICS_BUFFER_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_BUFFER_FLUSH_INTERVAL', '2.0'))
+ANALYTICS_BUFFER_MAX_SIZE = int(os.getenv('ANALYTICS_BUFFER_MAX_SIZE', '50000'))
+ANALYTICS_BUFFER_BACKGROUND = os.getenv('ANALYTICS_BUFFER_BACKGROUND', 'True') == 'True'
+
+# Applies config.testing.TEST_SETTINGS for manage.py test; pytest
+# gets them from conftest.py
+TEST_RUNNER = 'config.testing.TestRunner'
+
+# Reverse proxies in front of the app that append to X-Forwarded-For; at 0
+# the header is ignored and analytics record REMOTE_ADDR
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+
+# Trending products: rankings are cached per window for TRENDING_CACHE_TIMEOUT
+# seconds (and never across an hour boundary); decay mode halves a view's
+# weight every TRENDING_HALF_LIFE_HOURS
+TRENDING_CACHE_TIMEOUT = 300
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_MAX_DAYS = 30
+
+# Storefront searches feed per-day counters of the normalized query; only
+# this share of searches (0 to 1) also keeps a raw search_queries row
+SEARCH_QUERY_RAW_SAMPLE_RATE = float(os.getenv('SEARCH_QUERY_RAW_SAMPLE_RATE', '0.1'))
+SEARCH_QUERY_MAX_DAYS = 90
+
+# Past queries are only suggested to shoppers (suggestions endpoint and
+# autocomplete) once searched this many times in the window, so a query
+# typed by a single person is never shown to others
+SEARCH_SUGGESTION_MIN_SEARCHES = int(os.getenv('SEARCH_SUGGESTION_MIN_SEARCHES', '5'))
+
+# Search box autocomplete: each process keeps an in-memory prefix index of
+# active products and the AUTOCOMPLETE_QUERY_COUNT most searched queries of
+# the last AUTOCOMPLETE_QUERY_DAYS, reloaded after AUTOCOMPLETE_REFRESH_INTERVAL
+# seconds to pick up other processes' writes
+AUTOCOMPLETE_REFRESH_INTERVAL = 600
+AUTOCOMPLETE_QUERY_DAYS = 30
+AUTOCOMPLETE_QUERY_COUNT = 5000
+
+# Whole UTC days of raw analytics rows kept by compact_analytics; older
+# product views and cart activity are rolled into daily aggregates first
+ANALYTICS_RETENTION_DAYS = {
+    'product_views': 90,
+    'search_queries': 90,
+    'cart_activity_logs': 180,
+    'product_view_hourly': 35,
+}
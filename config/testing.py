@@ -0,0 +1,20 @@
+"""Settings overridden for every test run, whichever runner starts it."""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_SETTINGS = {
+    # The analytics flusher threads commit from their own connection,
+    # outside each test's transaction; tests write buffered events inline
+    'ANALYTICS_BUFFER_BACKGROUND': False,
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(**TEST_SETTINGS)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
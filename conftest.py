@@ -0,0 +1,10 @@
+import pytest
+from django.test.utils import override_settings
+
+from config.testing import TEST_SETTINGS
+
+
+@pytest.fixture(autouse=True, scope='session')
+def apply_test_settings():
+    with override_settings(**TEST_SETTINGS):
+        yield
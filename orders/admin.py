@@ -1,6 +1,6 @@
 from django.contrib import admin
 from decimal import Decimal
-from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory
+from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory, StockReservation
 
 
 class CartItemInline(admin.TabularInline):
@@ -104,3 +104,15 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['order__order_number', 'notes']
     readonly_fields = ['created_at']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['cart', 'product', 'quantity', 'expires_at', 'updated_at']
+    list_filter = ['expires_at']
+    search_fields = ['cart__user__email', 'product__name', 'product__sku']
+    readonly_fields = ['cart', 'product', 'quantity', 'expires_at', 'created_at', 'updated_at']
+    
+    def has_add_permission(self, request):
+        # Reservations move stock; they are only created through the cart
+        return False
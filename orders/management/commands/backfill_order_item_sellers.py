@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from orders.models import OrderItem
+from products.models import Product
+from sellers.rollups import rebuild_seller_stats
+
+
+class Command(BaseCommand):
+    help = 'Fill OrderItem.seller from the product for legacy rows where it is missing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of order items updated per statement (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        missing = OrderItem.objects.filter(seller__isnull=True, product__isnull=False)
+        product_seller = Product.objects.filter(pk=OuterRef('product_id')).values('seller_id')[:1]
+
+        total = 0
+        last_id = 0
+        sellers = set()
+        while True:
+            batch = list(
+                missing.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            total += OrderItem.objects.filter(id__in=batch).update(seller=Subquery(product_seller))
+            sellers.update(
+                OrderItem.objects.filter(id__in=batch).values_list('seller_id', flat=True).distinct()
+            )
+            last_id = batch[-1]
+            self.stdout.write(f'Backfilled {total} order items...')
+
+        if sellers:
+            # Rollups are keyed on OrderItem.seller, so refresh the sellers we touched
+            rebuild_seller_stats(seller_ids=sellers)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled seller on {total} order items across {len(sellers)} sellers.'
+        ))
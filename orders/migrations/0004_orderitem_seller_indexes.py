@@ -0,0 +1,24 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_orderitem_is_refunded_orderitem_refunded_at_and_more'),
+        ('products', '0004_product_deletion_requested_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['seller', 'order', 'created_at'], name='order_items_seller__b0d9bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['seller', 'product'], name='order_items_seller__aae035_idx'),
+        ),
+    ]
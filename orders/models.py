@@ -1,8 +1,35 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from products.models import Product
 
 
+class CartQuerySet(models.QuerySet):
+    """Cart read paths that avoid per-item queries."""
+    
+    def with_totals(self):
+        """Annotate item and price totals computed in SQL."""
+        return self.annotate(
+            items_quantity=Coalesce(Sum('items__quantity'), 0),
+            items_price=Coalesce(
+                Sum(F('items__quantity') * F('items__product__price')),
+                Decimal('0.00'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+    
+    def with_items(self):
+        """Prefetch items with their products in one extra query."""
+        return self.prefetch_related(Prefetch(
+            'items',
+            queryset=CartItem.objects.select_related(
+                'product__category', 'product__seller'
+            ).order_by('added_at', 'id'),
+        ))
+
+
 class Cart(models.Model):
     """Shopping cart for users."""
     
@@ -14,19 +41,30 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartQuerySet.as_manager()
+    
     class Meta:
         db_table = 'carts'
     
     def __str__(self):
         return f"Cart for {self.user.email}"
     
+    def _totals(self):
+        # Use the with_totals() annotations when present, else one aggregate query
+        if hasattr(self, 'items_quantity'):
+            return self.items_quantity, self.items_price
+        totals = Cart.objects.filter(pk=self.pk).with_totals().values(
+            'items_quantity', 'items_price'
+        ).first() or {'items_quantity': 0, 'items_price': Decimal('0.00')}
+        return totals['items_quantity'], totals['items_price']
+    
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self._totals()[0]
     
     @property
     def total_price(self):
-        return sum(item.subtotal for item in self.items.all())
+        return self._totals()[1]
 
 
 class CartItem(models.Model):
@@ -57,6 +95,35 @@ class CartItem(models.Model):
         return self.product.price * self.quantity
 
 
+class StockReservation(models.Model):
+    """Stock held for a cart item until checkout or expiry."""
+    
+    cart = models.ForeignKey(
+        Cart,
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    quantity = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        unique_together = ['cart', 'product']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} held until {self.expires_at}"
+
+
 class Order(models.Model):
     """Customer orders with status tracking."""
     
@@ -174,10 +241,21 @@ class OrderItem(models.Model):
     
     class Meta:
         db_table = 'order_items'
+        indexes = [
+            # Seller-scoped lookups (dashboard, seller orders, refunds, payouts)
+            models.Index(fields=['seller', 'order', 'created_at']),
+            models.Index(fields=['seller', 'product']),
+        ]
     
     def __str__(self):
         return f"{self.quantity}x {self.product_name}" if self.quantity and self.product_name else "Order Item"
     
+    def save(self, *args, **kwargs):
+        # Denormalize the seller so seller queries never need the product table
+        if self.seller_id is None and self.product_id is not None:
+            self.seller_id = self.product.seller_id
+        super().save(*args, **kwargs)
+    
     @property
     def subtotal(self):
         if self.price is None or self.quantity is None:
@@ -0,0 +1,120 @@
+"""
+Time-limited cart reservations on top of the atomic stock primitives.
+
+Adding a product to a cart takes the units out of ``Product.stock`` right
+away and records them in a ``StockReservation``. Checkout converts the
+held units into a sale, while removing items or letting a reservation
+expire puts them back. ``release_expired`` is run by the
+``release_expired_reservations`` command and, for a single product,
+whenever a hold fails, so abandoned carts never block real buyers.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from products.inventory import InsufficientStockError, decrement_stock, increment_stock
+from .models import StockReservation
+
+
+def reservation_ttl():
+    return getattr(settings, 'CART_RESERVATION_TTL', timedelta(minutes=15))
+
+
+def hold(cart, product_id, quantity):
+    """
+    Make ``cart`` hold exactly ``quantity`` units of a product.
+
+    Only the difference to what is already held touches stock. Raises
+    ``InsufficientStockError`` if the extra units are not available.
+    """
+    with transaction.atomic():
+        reservation = StockReservation.objects.select_for_update().filter(
+            cart=cart, product_id=product_id
+        ).first()
+        held = reservation.quantity if reservation else 0
+        delta = quantity - held
+
+        if delta > 0:
+            try:
+                decrement_stock({product_id: delta})
+            except InsufficientStockError:
+                # Expired holds from other carts may be blocking; free them and retry once
+                if not release_expired(product_ids=[product_id], exclude_cart=cart):
+                    raise
+                decrement_stock({product_id: delta})
+        elif delta < 0:
+            increment_stock({product_id: -delta})
+
+        if quantity <= 0:
+            if reservation:
+                reservation.delete()
+            return None
+
+        expires_at = timezone.now() + reservation_ttl()
+        if reservation:
+            reservation.quantity = quantity
+            reservation.expires_at = expires_at
+            reservation.save(update_fields=['quantity', 'expires_at', 'updated_at'])
+            return reservation
+        return StockReservation.objects.create(
+            cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at
+        )
+
+
+def release_cart(cart):
+    """Return everything a cart holds to stock."""
+    with transaction.atomic():
+        reservations = list(StockReservation.objects.select_for_update().filter(cart=cart))
+        _release(reservations)
+
+
+def consume(cart, quantities):
+    """
+    Turn a cart's reservations into a sale of ``{product_id: quantity}``.
+
+    Units already held are kept; any shortfall (e.g. an expired hold) is
+    taken with one guarded decrement and any surplus is returned.
+    """
+    with transaction.atomic():
+        reservations = list(StockReservation.objects.select_for_update().filter(cart=cart))
+        held = Counter({r.product_id: r.quantity for r in reservations})
+
+        decrement_stock({
+            product_id: quantity - held[product_id]
+            for product_id, quantity in quantities.items()
+        })
+        increment_stock({
+            product_id: held[product_id] - quantities.get(product_id, 0)
+            for product_id in held
+        })
+        StockReservation.objects.filter(id__in=[r.id for r in reservations]).delete()
+
+
+def release_expired(now=None, product_ids=None, exclude_cart=None, batch_size=1000):
+    """Return expired reservations to stock in bounded batches; returns units released."""
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=product_ids)
+    if exclude_cart is not None:
+        expired = expired.exclude(cart=exclude_cart)
+
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(expired.select_for_update().order_by('id')[:batch_size])
+            if not batch:
+                return released
+            released += _release(batch)
+
+
+def _release(reservations):
+    quantities = Counter()
+    for reservation in reservations:
+        quantities[reservation.product_id] += reservation.quantity
+    increment_stock(quantities)
+    StockReservation.objects.filter(id__in=[r.id for r in reservations]).delete()
+    return sum(quantities.values())
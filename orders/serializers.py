@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
 from .models import Cart, CartItem, Order, OrderItem, OrderStatusHistory
+from . import reservations
+from .signals import order_items_created, publish_cart_activity, request_session_id
+from products.inventory import InsufficientStockError
 from products.models import Product
 from products.serializers import ProductListSerializer
 
@@ -119,69 +124,95 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         try:
             cart = user.cart
         except Cart.DoesNotExist:
-            raise serializers.ValidationError("Cart is empty.")
-        
-        # Check cart has items
-        if not cart.items.exists():
-            raise serializers.ValidationError("Cart is empty.")
+            raise serializers.ValidationError("Cart is empty.") from None
         
-        # Calculate totals (use Decimal for all calculations)
-        subtotal = Decimal(str(cart.total_price))
-        tax = subtotal * Decimal('0.10')  # 10% tax
-        shipping_cost = Decimal('0.00')  # FREE shipping
-        total = subtotal + tax + shipping_cost
-        
-        # Handle wallet payment
-        payment_method = validated_data.get('payment_method', 'cash_on_delivery')
-        payment_status = 'pending'
-        
-        if payment_method == 'wallet':
-            # Check wallet balance
-            if user.wallet_balance < total:
-                raise serializers.ValidationError('Insufficient wallet balance.')
+        with transaction.atomic():
+            # Load the cart once and lock the products it touches
+            cart_items = list(cart.items.all())
+            if not cart_items:
+                raise serializers.ValidationError("Cart is empty.")
             
-            # Deduct from wallet
-            user.wallet_balance -= total
-            user.save()
-            payment_status = 'completed'
-        
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            subtotal=subtotal,
-            tax=tax,
-            shipping_cost=shipping_cost,
-            total=total,
-            payment_status=payment_status,
-            **validated_data
-        )
-        
-        # Create order items from cart (save seller info for refund tracking)
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
+            quantities = {}
+            for cart_item in cart_items:
+                quantities[cart_item.product_id] = quantities.get(cart_item.product_id, 0) + cart_item.quantity
+            products = Product.objects.select_for_update().in_bulk(quantities.keys())
+            
+            if len(products) != len(quantities):
+                raise serializers.ValidationError("Some products in your cart are no longer available.")
+            
+            # Convert the cart's reservations into the sale; any shortfall is
+            # taken from stock with one guarded UPDATE
+            try:
+                reservations.consume(cart, quantities)
+            except InsufficientStockError as exc:
+                raise serializers.ValidationError("Insufficient stock.") from exc
+            
+            # Calculate totals (use Decimal for all calculations)
+            subtotal = sum(
+                (products[item.product_id].price * item.quantity for item in cart_items),
+                Decimal('0.00')
+            )
+            tax = subtotal * Decimal('0.10')  # 10% tax
+            shipping_cost = Decimal('0.00')  # FREE shipping
+            total = subtotal + tax + shipping_cost
+            
+            # Handle wallet payment
+            payment_method = validated_data.get('payment_method', 'cash_on_delivery')
+            payment_status = 'pending'
+            
+            if payment_method == 'wallet':
+                # Deduct from wallet only if the balance covers the total
+                charged = type(user).objects.filter(
+                    pk=user.pk,
+                    wallet_balance__gte=total
+                ).update(wallet_balance=F('wallet_balance') - total)
+                if not charged:
+                    raise serializers.ValidationError('Insufficient wallet balance.')
+                user.wallet_balance -= total
+                payment_status = 'completed'
+            
+            # Create order
+            order = Order.objects.create(
+                user=user,
+                subtotal=subtotal,
+                tax=tax,
+                shipping_cost=shipping_cost,
+                total=total,
+                payment_status=payment_status,
+                **validated_data
+            )
+            
+            # Create order items from cart (save seller info for refund tracking)
+            items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=products[cart_item.product_id],
+                    product_name=products[cart_item.product_id].name,
+                    product_sku=products[cart_item.product_id].sku,
+                    price=products[cart_item.product_id].price,
+                    quantity=cart_item.quantity,
+                    seller_id=products[cart_item.product_id].seller_id  # Save seller for refund tracking
+                )
+                for cart_item in cart_items
+            ])
+            
+            # Clear cart
+            cart.items.all().delete()
+            
+            # Create status history
+            OrderStatusHistory.objects.create(
                 order=order,
-                product=cart_item.product,
-                product_name=cart_item.product.name,
-                product_sku=cart_item.product.sku,
-                price=cart_item.product.price,
-                quantity=cart_item.quantity,
-                seller=cart_item.product.seller  # Save seller for refund tracking
+                status='pending',
+                notes='Order created',
+                changed_by=user
             )
             
-            # Reduce stock
-            cart_item.product.stock -= cart_item.quantity
-            cart_item.product.save()
-        
-        # Clear cart
-        cart.items.all().delete()
-        
-        # Create status history
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='pending',
-            notes='Order created',
-            changed_by=user
-        )
+            # bulk_create skips post_save, so notify listeners explicitly
+            order_items_created.send(sender=Order, order=order, items=items)
+            publish_cart_activity(
+                cart, 'checkout', quantity=sum(quantities.values()), cart_total=subtotal,
+                session_id=request_session_id(self.context['request']),
+            )
         
         return order
 
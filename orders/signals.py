@@ -0,0 +1,34 @@
+"""Order and cart lifecycle signals for code paths that bypass ``Model.save``."""
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent after checkout bulk-creates order items (which skips post_save).
+# Arguments: ``order`` and ``items`` (the created OrderItem instances).
+order_items_created = Signal()
+
+# Sent once a cart change has committed. Arguments: ``user_id``, ``cart_id``,
+# ``action`` (a CartActivityLog action), ``product_id``, ``quantity``,
+# ``cart_total`` (``None`` when the sender did not compute it) and
+# ``session_id`` ('' without a session). Receivers run on the request
+# thread, so they should only queue work.
+cart_activity = Signal()
+
+
+def request_session_id(request):
+    """The request's session key, or '' when it has no session."""
+    session = getattr(request, 'session', None)
+    return getattr(session, 'session_key', None) or ''
+
+
+def publish_cart_activity(cart, action, product_id=None, quantity=0, cart_total=None, session_id=''):
+    """Send ``cart_activity`` for ``cart`` when the current transaction commits."""
+    transaction.on_commit(lambda: cart_activity.send(
+        sender=type(cart),
+        user_id=cart.user_id,
+        cart_id=cart.pk,
+        action=action,
+        product_id=product_id,
+        quantity=quantity,
+        cart_total=cart_total,
+        session_id=session_id,
+    ))
@@ -1,6 +1,18 @@
-from django.test import TestCase
+import csv
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from .models import Cart, CartItem, Order, OrderItem
+from rest_framework.test import APIClient
+from . import reservations
+from .models import Cart, CartItem, Order, OrderItem, StockReservation
+from products.inventory import InsufficientStockError, decrement_stock
 from products.models import Product, Category
 
 User = get_user_model()
@@ -79,3 +91,350 @@ class OrderModelTest(TestCase):
         self.assertEqual(order.status, 'pending')
         self.assertIsNotNone(order.order_number)
         self.assertTrue(order.order_number.startswith('ORD-'))
+
+
+class CheckoutTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            password='pass123'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.category = Category.objects.create(
+            name='Electronics',
+            slug='electronics'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.shipping = {
+            'shipping_address': '123 Main St',
+            'shipping_city': 'New York',
+            'shipping_state': 'NY',
+            'shipping_zip': '10001',
+            'shipping_country': 'USA',
+            'phone': '1234567890',
+        }
+    
+    def fill_cart(self, lines, stock=10, sellers=None):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        sellers = sellers or [self.seller]
+        batch = Product.objects.count()
+        products = Product.objects.bulk_create([
+            Product(
+                seller=sellers[i % len(sellers)],
+                category=self.category,
+                name=f'Product {i}',
+                slug=f'product-{batch}-{i}',
+                description='A product',
+                price=Decimal('10.00'),
+                stock=stock,
+                sku=f'SKU-{batch}-{i}'
+            )
+            for i in range(lines)
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=2) for product in products
+        ])
+        return products
+    
+    def checkout(self):
+        return self.client.post('/api/orders/', self.shipping)
+    
+    def test_checkout_creates_items_and_reduces_stock(self):
+        """Test checkout snapshots items, reduces stock and clears the cart"""
+        products = self.fill_cart(3)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(order.subtotal, Decimal('60.00'))
+        self.assertTrue(all(item.seller_id == self.seller.id for item in order.items.all()))
+        self.assertEqual(Product.objects.get(pk=products[0].pk).stock, 8)
+        self.assertFalse(CartItem.objects.exists())
+    
+    def test_checkout_rejects_insufficient_stock(self):
+        """Test checkout is all-or-nothing when a product is short"""
+        products = self.fill_cart(2)
+        Product.objects.filter(pk=products[1].pk).update(stock=1)
+        
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=products[0].pk).stock, 10)
+    
+    def test_checkout_query_count_is_constant(self):
+        """Benchmark: checkout queries do not grow with cart size or sellers"""
+        sellers = [self.seller] + [
+            User.objects.create_user(
+                email=f'seller{i}@example.com', username=f'seller{i}', password='pass123', role='seller'
+            )
+            for i in range(2)
+        ]
+        # Warm up once so one-off rows (e.g. the seller balances) already exist
+        self.fill_cart(3, sellers=sellers)
+        self.checkout()
+        
+        counts = {}
+        for lines in (1, 10, 100):
+            self.fill_cart(lines, sellers=sellers)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.checkout()
+            self.assertEqual(response.status_code, 201)
+            counts[lines] = len(ctx.captured_queries)
+        self.assertEqual(counts[1], counts[10])
+        # SQLite caps statements at 999 parameters, so 100 lines split the
+        # order item and ledger bulk inserts into two batches each
+        self.assertLessEqual(counts[100] - counts[1], 2)
+
+
+class StockReservationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            password='pass123'
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='pass123'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=self.seller,
+            category=self.category,
+            name='Laptop',
+            slug='laptop',
+            description='A great laptop',
+            price=Decimal('100.00'),
+            stock=5,
+            sku='LAP001'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def stock(self):
+        return Product.objects.get(pk=self.product.pk).stock
+    
+    def add(self, quantity):
+        return self.client.post(
+            '/api/cart/add_item/',
+            {'product_id': self.product.id, 'quantity': quantity},
+            format='json'
+        )
+    
+    def test_add_item_holds_stock(self):
+        """Test adding to the cart takes units out of stock"""
+        self.assertEqual(self.add(2).status_code, 200)
+        self.assertEqual(self.add(1).status_code, 200)
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(StockReservation.objects.get().quantity, 3)
+        
+        response = self.add(3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+    
+    def test_remove_and_update_release_stock(self):
+        """Test shrinking or removing a cart item returns the units"""
+        self.add(4)
+        item = CartItem.objects.get()
+        self.client.post('/api/cart/update_item/', {'item_id': item.id, 'quantity': 1}, format='json')
+        self.assertEqual(self.stock(), 4)
+        
+        self.client.post('/api/cart/remove_item/', {'item_id': item.id}, format='json')
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockReservation.objects.exists())
+    
+    def test_expired_reservations_are_released(self):
+        """Test expired holds go back to stock and unblock other carts"""
+        self.add(5)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        
+        other_cart = Cart.objects.create(user=self.other)
+        reservations.hold(other_cart, self.product.id, 3)
+        self.assertEqual(self.stock(), 2)
+        self.assertFalse(StockReservation.objects.filter(cart__user=self.user).exists())
+    
+    def test_checkout_consumes_reservation(self):
+        """Test checkout keeps the held units instead of decrementing again"""
+        self.add(2)
+        response = self.client.post('/api/orders/', {
+            'shipping_address': '123 Main St',
+            'shipping_city': 'New York',
+            'shipping_state': 'NY',
+            'shipping_zip': '10001',
+            'shipping_country': 'USA',
+            'phone': '1234567890',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_cart_response_query_count_is_constant(self):
+        """Benchmark: cart reads cost the same for 1 or 10 items"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        with CaptureQueriesContext(connection) as one:
+            response = self.client.get('/api/cart/')
+        self.assertEqual(response.data['total_items'], 2)
+        
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=Product.objects.create(
+                seller=self.seller,
+                category=self.category,
+                name=f'Mouse {i}',
+                slug=f'mouse-{i}',
+                description='A mouse',
+                price=Decimal('10.00'),
+                stock=5,
+                sku=f'MOU{i:03d}'
+            ))
+            for i in range(9)
+        ])
+        with CaptureQueriesContext(connection) as ten:
+            response = self.client.get('/api/cart/')
+        self.assertEqual(len(response.data['items']), 10)
+        self.assertEqual(response.data['total_items'], 11)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('290.00'))
+        self.assertEqual(len(one.captured_queries), len(ten.captured_queries))
+
+
+class InventoryConcurrencyTest(TransactionTestCase):
+    """Stress test: concurrent buyers can never oversell a product."""
+    
+    def setUp(self):
+        seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=seller,
+            category=category,
+            name='Laptop',
+            slug='laptop',
+            description='A great laptop',
+            price=Decimal('100.00'),
+            stock=5,
+            sku='LAP001'
+        )
+    
+    def test_concurrent_decrements_never_oversell(self):
+        results = []
+        
+        def buy():
+            try:
+                for _ in range(200):
+                    try:
+                        decrement_stock({self.product.id: 1})
+                        results.append(True)
+                        return
+                    except InsufficientStockError:
+                        results.append(False)
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting
+                        time.sleep(0.005)
+            finally:
+                connections.close_all()
+        
+        threads = [threading.Thread(target=buy) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(results.count(False), 15)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 0)
+
+
+class OrderExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='pass123', is_staff=True
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com', username='buyer', password='pass123'
+        )
+        self.sellers = [
+            User.objects.create_user(
+                email=f'seller{i}@example.com', username=f'seller{i}', password='pass123', role='seller'
+            )
+            for i in range(2)
+        ]
+        for i in range(3):
+            order = Order.objects.create(
+                user=self.buyer, subtotal=30, total=30, status='delivered' if i else 'pending',
+                shipping_address='1 Main St', shipping_city='Austin', shipping_state='TX',
+                shipping_zip='73301', shipping_country='USA', phone='555'
+            )
+            for seller in self.sellers:
+                OrderItem.objects.create(
+                    order=order, seller=seller, product_name=f'Item {i}',
+                    product_sku=f'SKU-{i}-{seller.username}', price=15, quantity=1
+                )
+        self.client = APIClient()
+    
+    def export(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/orders/export/', params)
+        return response, b''.join(response.streaming_content).decode()
+    
+    def test_csv_export_streams_one_row_per_item(self):
+        """Test admins get every order item with its order joined in one query"""
+        with CaptureQueriesContext(connection) as ctx:
+            response, body = self.export(self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        
+        rows = list(csv.DictReader(body.splitlines()))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['buyer_email'], 'buyer@example.com')
+        self.assertEqual(rows[0]['order_total'], '30.00')
+        self.assertEqual(len([q for q in ctx.captured_queries if 'order_items' in q['sql']]), 1)
+    
+    def test_jsonl_export_is_scoped_and_filtered(self):
+        """Test sellers only export their own items and filters apply"""
+        response, body = self.export(self.sellers[0], export_format='jsonl', status='delivered')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row['seller_id'] == self.sellers[0].id for row in rows))
+        self.assertEqual({row['order_status'] for row in rows}, {'delivered'})
+    
+    def test_date_filters_cover_whole_days_as_a_range(self):
+        """Test date filters include both boundary days and compare created_at directly"""
+        today = timezone.localdate()
+        Order.objects.filter(status='pending').update(created_at=timezone.now() - timedelta(days=3))
+        with CaptureQueriesContext(connection) as ctx:
+            response, body = self.export(self.admin, created_after=today.isoformat(), created_before=today.isoformat())
+        self.assertEqual(len(list(csv.DictReader(body.splitlines()))), 4)
+        export_sql = next(q['sql'] for q in ctx.captured_queries if 'order_items' in q['sql'])
+        self.assertNotIn('cast_date', export_sql)
+        
+        response, body = self.export(self.admin, created_before=(today - timedelta(days=3)).isoformat())
+        self.assertEqual({row['order_status'] for row in csv.DictReader(body.splitlines())}, {'pending'})
+    
+    def test_invalid_parameters_are_rejected(self):
+        """Test unknown formats and malformed dates return 400"""
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/orders/export/', {'export_format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export/', {'created_after': 'soon'}).status_code, 400)
@@ -1,8 +1,16 @@
+from decimal import Decimal
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from . import exports, reservations
 from .models import Cart, CartItem, Order, OrderStatusHistory
+from .signals import publish_cart_activity, request_session_id
+from products.inventory import InsufficientStockError
 from products.models import Product
 from .serializers import (
     CartSerializer,
@@ -22,93 +30,135 @@ class CartViewSet(viewsets.ViewSet):
     def list(self, request):
         """Get user's cart."""
         cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return _cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def add_item(self, request):
-        """Add item to cart."""
+        """Add item to cart, reserving the stock it needs."""
         cart, created = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get('product_id')
-        quantity = request.data.get('quantity', 1)
+        quantity = _parse_quantity(request.data.get('quantity', 1))
+        if quantity is None or quantity <= 0:
+            return Response(
+                {'error': 'Quantity must be a positive integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
+        except (Product.DoesNotExist, ValueError, TypeError):
             return Response(
                 {'error': 'Product not found.'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check stock
-        if product.stock < quantity:
+        try:
+            with transaction.atomic():
+                cart_item = CartItem.objects.select_for_update().filter(
+                    cart=cart, product=product
+                ).first()
+                new_quantity = quantity + (cart_item.quantity if cart_item else 0)
+                reservations.hold(cart, product.id, new_quantity)
+                if cart_item:
+                    cart_item.quantity = new_quantity
+                    cart_item.save()
+                else:
+                    CartItem.objects.create(cart=cart, product=product, quantity=new_quantity)
+        except InsufficientStockError:
             return Response(
                 {'error': 'Insufficient stock.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Add or update cart item
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
+        publish_cart_activity(
+            cart, 'add', product.id, quantity,
+            session_id=request_session_id(request),
         )
-        
-        if not created:
-            cart_item.quantity += quantity
-            if cart_item.quantity > product.stock:
-                return Response(
-                    {'error': 'Insufficient stock.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            cart_item.save()
-        
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return _cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def update_item(self, request):
-        """Update cart item quantity."""
+        """Update cart item quantity and its reservation."""
         cart = get_object_or_404(Cart, user=request.user)
         item_id = request.data.get('item_id')
-        quantity = request.data.get('quantity')
+        quantity = _parse_quantity(request.data.get('quantity'))
+        if quantity is None:
+            return Response(
+                {'error': 'Quantity must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
         
+        try:
+            with transaction.atomic():
+                reservations.hold(cart, cart_item.product_id, max(quantity, 0))
+                if quantity <= 0:
+                    cart_item.delete()
+                else:
+                    cart_item.quantity = quantity
+                    cart_item.save()
+        except InsufficientStockError:
+            return Response(
+                {'error': 'Insufficient stock.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         if quantity <= 0:
-            cart_item.delete()
+            publish_cart_activity(
+                cart, 'remove', cart_item.product_id, cart_item.quantity,
+                session_id=request_session_id(request),
+            )
         else:
-            if cart_item.product.stock < quantity:
-                return Response(
-                    {'error': 'Insufficient stock.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            cart_item.quantity = quantity
-            cart_item.save()
-        
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+            publish_cart_activity(
+                cart, 'update', cart_item.product_id, quantity,
+                session_id=request_session_id(request),
+            )
+        return _cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def remove_item(self, request):
-        """Remove item from cart."""
+        """Remove item from cart and release its reservation."""
         cart = get_object_or_404(Cart, user=request.user)
         item_id = request.data.get('item_id')
         
         cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-        cart_item.delete()
+        with transaction.atomic():
+            reservations.hold(cart, cart_item.product_id, 0)
+            cart_item.delete()
         
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        publish_cart_activity(
+            cart, 'remove', cart_item.product_id, cart_item.quantity,
+            session_id=request_session_id(request),
+        )
+        return _cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def clear(self, request):
-        """Clear cart."""
+        """Clear cart and release every reservation."""
         cart = get_object_or_404(Cart, user=request.user)
-        cart.items.all().delete()
+        with transaction.atomic():
+            reservations.release_cart(cart)
+            cart.items.all().delete()
         
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        publish_cart_activity(
+            cart, 'clear', cart_total=Decimal('0.00'),
+            session_id=request_session_id(request),
+        )
+        return _cart_response(cart)
+
+
+def _cart_response(cart):
+    # Reload with SQL totals and one prefetch for items and their products
+    cart = Cart.objects.with_totals().with_items().get(pk=cart.pk)
+    return Response(CartSerializer(cart).data)
+
+
+def _parse_quantity(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -129,7 +179,7 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.all()
         elif user.is_seller:
             # Sellers see orders containing their products
-            return Order.objects.filter(items__product__seller=user).distinct()
+            return Order.objects.filter(items__seller=user).distinct()
         else:
             # Buyers see only their orders
             return Order.objects.filter(user=user)
@@ -137,6 +187,42 @@ class OrderViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save()
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the full order history visible to the user as CSV or JSONL.
+        
+        One row per order item with its order joined in. ``export_format``
+        picks the format (``format`` is taken by DRF); ``status``,
+        ``created_after`` and ``created_before`` (YYYY-MM-DD) narrow it.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in exports.FORMATS:
+            return Response(
+                {'error': f"export_format must be one of: {', '.join(exports.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dates = {}
+        for param in ('created_after', 'created_before'):
+            value = request.query_params.get(param)
+            if value:
+                dates[param] = parse_date(value)
+                if dates[param] is None:
+                    return Response(
+                        {'error': f'{param} must be a date (YYYY-MM-DD).'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+        
+        items = exports.export_queryset(request.user, status=request.query_params.get('status'), **dates)
+        response = StreamingHttpResponse(
+            exports.stream(exports.export_rows(items), export_format),
+            content_type=exports.FORMATS[export_format]
+        )
+        filename = f"orders-{timezone.now():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def update_status(self, request, pk=None):
         """Update order status (admin only)."""
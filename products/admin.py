@@ -4,10 +4,11 @@ from .models import Category, Product, ProductImage, ProductReview
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'parent', 'created_at']
-    list_filter = ['parent', 'created_at']
+    list_display = ['name', 'slug', 'parent', 'depth', 'created_at']
+    list_filter = ['parent', 'depth', 'created_at']
     search_fields = ['name', 'slug', 'description']
     prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ['path', 'depth']
 
 
 class ProductImageInline(admin.TabularInline):
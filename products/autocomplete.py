@@ -0,0 +1,253 @@
+"""
+In-memory prefix autocomplete for the storefront search box.
+
+``AutocompleteIndex`` keeps three sorted arrays of ``"<normalized text>\\0<id>"``
+keys: active product names, their brands and the most searched queries.
+A lookup is a ``bisect`` to the first key at or after the prefix and a
+scan of the matches, so its cost depends on the number of suggestions,
+not the catalog size (``benchmark_autocomplete`` measures it).
+
+Each process builds its index on first use and keeps it current with the
+``products.signals`` handlers and bulk imports. Since writes made by other
+processes are not seen, the whole index is reloaded in the background
+once it is ``AUTOCOMPLETE_REFRESH_INTERVAL`` seconds old.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from analytics.searches import min_suggestion_searches, normalize_query, popular_queries
+
+from .models import Product
+
+SEPARATOR = '\0'
+
+
+class SortedKeys:
+    """Sorted array of unique ``text\\0ident`` keys with prefix scans."""
+
+    def __init__(self, keys=()):
+        self.keys = sorted(set(keys))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        if position == len(self.keys) or self.keys[position] != key:
+            self.keys.insert(position, key)
+
+    def discard(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def scan(self, prefix, limit=None):
+        """Yield ``(text, ident)`` for keys starting with ``prefix``, in order."""
+        position = bisect.bisect_left(self.keys, prefix)
+        end = len(self.keys) if limit is None else min(position + limit, len(self.keys))
+        for index in range(position, end):
+            key = self.keys[index]
+            if not key.startswith(prefix):
+                break
+            yield tuple(key.split(SEPARATOR, 1))
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over product names, brands and popular queries.
+
+    ``products`` yields ``(pk, name, slug, brand)`` and ``queries`` yields
+    ``(query, search_count)`` with queries already normalized.
+    """
+
+    def __init__(self, products=(), queries=()):
+        self.lock = threading.Lock()
+        self.products = {}
+        self.brands = {}
+        name_keys = []
+        for pk, name, slug, brand in products:
+            key = self._product_key(pk, name)
+            if key is None:
+                continue
+            self.products[str(pk)] = (key, name, slug, self._count_brand(brand, 1))
+            name_keys.append(key)
+        self.names = SortedKeys(name_keys)
+        self.brand_keys = SortedKeys(f'{norm}{SEPARATOR}' for norm in self.brands)
+        self.set_queries(queries)
+
+    def __len__(self):
+        return len(self.names) + len(self.brand_keys) + len(self.query_keys)
+
+    @staticmethod
+    def _product_key(pk, name):
+        norm = normalize_query(name)
+        return f'{norm}{SEPARATOR}{pk}' if norm else None
+
+    def _count_brand(self, brand, delta):
+        """Adjust a brand's product count; returns its normalized name."""
+        norm = normalize_query(brand)
+        if not norm:
+            return ''
+        display, count = self.brands.get(norm, (brand, 0))
+        count += delta
+        if count > 0:
+            self.brands[norm] = (display, count)
+        else:
+            self.brands.pop(norm, None)
+        return norm
+
+    def set_queries(self, queries):
+        counts = {query: count for query, count in queries if query}
+        keys = SortedKeys(f'{query}{SEPARATOR}' for query in counts)
+        self.query_counts, self.query_keys = counts, keys
+
+    def add_product(self, pk, name, slug, brand):
+        """Add or refresh one active product."""
+        with self.lock:
+            self._remove(str(pk))
+            key = self._product_key(pk, name)
+            if key is None:
+                return
+            brand_norm = self._count_brand(brand, 1)
+            if brand_norm and self.brands[brand_norm][1] == 1:
+                self.brand_keys.add(f'{brand_norm}{SEPARATOR}')
+            self.products[str(pk)] = (key, name, slug, brand_norm)
+            self.names.add(key)
+
+    def remove_product(self, pk):
+        with self.lock:
+            self._remove(str(pk))
+
+    def _remove(self, pk):
+        entry = self.products.pop(pk, None)
+        if entry is None:
+            return
+        key, _, _, brand_norm = entry
+        self.names.discard(key)
+        if brand_norm:
+            self._count_brand(brand_norm, -1)
+            if brand_norm not in self.brands:
+                self.brand_keys.discard(f'{brand_norm}{SEPARATOR}')
+
+    def complete(self, prefix, limit=10):
+        """
+        Up to ``limit`` suggestions for ``prefix``: popular queries first,
+        then brands by product count, then product names alphabetically.
+        Suggestions with the same text are listed once.
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        with self.lock:
+            queries = sorted(
+                (-self.query_counts[text], text) for text, _ in self.query_keys.scan(prefix)
+            )
+            brands = sorted(
+                (-self.brands[text][1], text, self.brands[text][0]) for text, _ in self.brand_keys.scan(prefix)
+            )
+            # Names that repeat a query or brand are skipped below, so read a few spare
+            names = [
+                (text, self.products[pk]) for text, pk in self.names.scan(prefix, limit * 2)
+            ]
+
+        candidates = (
+            [(text, {'text': text, 'type': 'query'}) for _, text in queries]
+            + [(text, {'text': display, 'type': 'brand'}) for _, text, display in brands]
+            + [(text, {'text': name, 'type': 'product', 'slug': slug}) for text, (_, name, slug, _) in names]
+        )
+        suggestions, seen = [], set()
+        for text, suggestion in candidates:
+            if text in seen:
+                continue
+            seen.add(text)
+            suggestions.append(suggestion)
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+
+def load_products():
+    return Product.objects.filter(is_active=True).values_list(
+        'pk', 'name', 'slug', 'brand'
+    ).iterator(chunk_size=5000)
+
+
+def load_queries():
+    """
+    The most searched recent queries, leaving out rare ones (which may be
+    personal) and those that mostly found nothing.
+    """
+    min_searches = min_suggestion_searches()
+    return [
+        (row['query'], row['search_count'])
+        for row in popular_queries(
+            days=getattr(settings, 'AUTOCOMPLETE_QUERY_DAYS', 30),
+            limit=getattr(settings, 'AUTOCOMPLETE_QUERY_COUNT', 5000),
+        )
+        if row['search_count'] >= min_searches and row['search_count'] > row['zero_results'] * 2
+    ]
+
+
+_index = None
+_built_at = 0.0
+_rebuilding = threading.Lock()
+
+
+def build_index():
+    """Load a fresh index from the database."""
+    return AutocompleteIndex(load_products(), load_queries())
+
+
+def get_index():
+    """The process's index, built on first use and reloaded in the background when stale."""
+    global _index, _built_at
+    if _index is None:
+        with _rebuilding:
+            if _index is None:
+                _index, _built_at = build_index(), time.monotonic()
+    elif time.monotonic() - _built_at > getattr(settings, 'AUTOCOMPLETE_REFRESH_INTERVAL', 600):
+        if _rebuilding.acquire(blocking=False):
+            _built_at = time.monotonic()
+            threading.Thread(target=_refresh, name='autocomplete-refresh', daemon=True).start()
+    return _index
+
+
+def _refresh():
+    global _index, _built_at
+    try:
+        _index, _built_at = build_index(), time.monotonic()
+    finally:
+        close_old_connections()
+        _rebuilding.release()
+
+
+def reset_index():
+    """Drop the process's index; the next lookup rebuilds it."""
+    global _index
+    _index = None
+
+
+def index_products(products):
+    """Refresh the given products in a built index; inactive ones are removed."""
+    if _index is None:
+        return
+    for product in products:
+        if product.is_active:
+            _index.add_product(product.pk, product.name, product.slug, product.brand)
+        else:
+            _index.remove_product(product.pk)
+
+
+def remove_products(product_ids):
+    if _index is None:
+        return
+    for product_id in product_ids:
+        _index.remove_product(product_id)
+
+
+def complete(prefix, limit=10):
+    return get_index().complete(prefix, limit)
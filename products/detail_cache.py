@@ -0,0 +1,51 @@
+"""
+Versioned response cache for the product detail endpoint.
+
+Each product carries a ``detail_version`` that every write affecting its
+detail page bumps with an ``F()`` update. Cached responses are keyed by
+slug, id and version, so a bump makes the old entry unreachable instead of
+requiring an explicit delete, and the version doubles as the ETag.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Category, Product
+
+
+def cache_timeout():
+    return getattr(settings, 'PRODUCT_DETAIL_CACHE_TIMEOUT', 60 * 15)
+
+
+def cache_key(slug, product_id, version):
+    # The id guards against a recreated product reusing an old slug
+    return f'product-detail:{slug}:{product_id.hex}:{version}'
+
+
+def etag(product_id, version):
+    return f'"{product_id.hex}-{version}"'
+
+
+def get_cached(slug, product_id, version):
+    return cache.get(cache_key(slug, product_id, version))
+
+
+def store(slug, product_id, version, data):
+    cache.set(cache_key(slug, product_id, version), data, cache_timeout())
+
+
+def bump(**filters):
+    """Invalidate the cached detail of every product matching ``filters``."""
+    return Product.objects.filter(**filters).update(detail_version=F('detail_version') + 1)
+
+
+def bump_for_category_path(path):
+    """Bump products whose rendered category tree includes the category at ``path``."""
+    if not path:
+        return 0
+    # Products in the category or any ancestor (their nested children change)
+    ancestor_hexes = [segment for segment in path.split(Category.PATH_SEPARATOR) if segment]
+    return bump(category__path__in=[
+        Category.PATH_SEPARATOR.join(ancestor_hexes[:depth + 1]) + Category.PATH_SEPARATOR
+        for depth in range(len(ancestor_hexes))
+    ])
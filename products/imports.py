@@ -0,0 +1,288 @@
+"""
+Bulk product import from CSV or JSONL catalogs.
+
+``import_products`` reads rows lazily from a binary line iterator (an
+uploaded file or an open file), validates them a chunk at a time with
+``ProductImportSerializer`` and upserts each chunk keyed by SKU: rows with
+a new SKU become products through one ``bulk_create`` with slugs and SKUs
+allocated in blocks, rows whose SKU the seller already owns update that
+product through one ``bulk_update``. Bad rows are reported with their line
+number and never stop the rest of the import. Used by the ``import``
+action on the products API and the ``import_products`` command.
+"""
+import codecs
+import csv
+import json
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import autocomplete
+from .models import Category, IdentifierSequence, Product
+from .search import get_backend
+from .serializers import ProductImportSerializer
+
+FORMATS = ('csv', 'jsonl')
+EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}
+JSON_FIELDS = ('tags', 'technical_specs')
+
+
+def detect_format(filename):
+    """Import format implied by a file name, or ``None``."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return EXTENSIONS.get(extension)
+
+
+class ImportResult:
+    """Counts and per-row errors of one import; keeps at most ``max_errors`` errors."""
+
+    def __init__(self, max_errors=None):
+        self.max_errors = max_errors
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': len(self.errors) < self.failed,
+        }
+
+
+def read_rows(lines, file_format):
+    """
+    Yield ``(line, data, error)`` for every record in ``lines``.
+
+    ``lines`` yields bytes; only the current record is held in memory.
+    """
+    text = codecs.iterdecode(lines, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, _clean_csv_row(row), None
+    elif file_format == 'jsonl':
+        for line, record in enumerate(text, start=1):
+            if not record.strip():
+                continue
+            try:
+                data = json.loads(record)
+            except ValueError as exc:
+                yield line, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+                continue
+            if not isinstance(data, dict):
+                yield line, None, {'non_field_errors': ['Each line must be a JSON object.']}
+                continue
+            yield line, data, None
+    else:
+        raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def _clean_csv_row(row):
+    # Empty cells fall back to model defaults; list and dict columns hold JSON
+    data = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        key, value = key.strip(), value.strip()
+        if not key or not value:
+            continue
+        if key in JSON_FIELDS:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                if key == 'tags':
+                    value = [tag.strip() for tag in value.split(',') if tag.strip()]
+        data[key] = value
+    return data
+
+
+def import_products(lines, seller, file_format, chunk_size=None, dry_run=False, max_errors=None, on_error=None):
+    """
+    Create or update ``seller``'s products from a CSV or JSONL catalog.
+
+    Each chunk is validated and written in its own transaction. With
+    ``dry_run`` rows are only validated. ``on_error(line, errors)`` is called
+    for every rejected row in addition to recording it on the result.
+    """
+    chunk_size = chunk_size or getattr(settings, 'PRODUCT_IMPORT_CHUNK_SIZE', 1000)
+    result = ImportResult(max_errors=max_errors)
+    seen_skus = set()
+    rows = read_rows(lines, file_format)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        errors = _import_chunk(chunk, seller, seen_skus, dry_run, result)
+        for line, row_errors in errors:
+            result.add_error(line, row_errors)
+            if on_error is not None:
+                on_error(line, row_errors)
+    return result
+
+
+def _import_chunk(chunk, seller, seen_skus, dry_run, result):
+    """Validate and upsert one chunk; returns ``(line, errors)`` for rejected rows."""
+    errors = []
+    rows = []
+    for line, data, error in chunk:
+        if error:
+            errors.append((line, error))
+        else:
+            rows.append((line, data))
+
+    # One query each for the chunk's existing SKUs and referenced categories
+    skus = {str(data['sku']).strip() for _, data in rows if data.get('sku')}
+    existing = {product.sku: product for product in Product.objects.filter(sku__in=skus)} if skus else {}
+    categories = _resolve_categories({data['category'] for _, data in rows if data.get('category')})
+
+    creates, updates = [], []
+    for line, data in rows:
+        sku = str(data.get('sku') or '').strip()
+        if sku and sku in seen_skus:
+            errors.append((line, {'sku': ['This SKU appears more than once in the file.']}))
+            continue
+        instance = existing.get(sku)
+        if instance is not None and instance.seller_id != seller.pk:
+            errors.append((line, {'sku': ['This SKU belongs to another seller.']}))
+            continue
+
+        serializer = ProductImportSerializer(instance, data=data, partial=instance is not None)
+        if not serializer.is_valid():
+            errors.append((line, serializer.errors))
+            continue
+        values = dict(serializer.validated_data)
+        if values.get('category'):
+            category = categories.get(values['category'])
+            if category is None:
+                errors.append((line, {'category': ['Unknown category.']}))
+                continue
+            values['category'] = category
+
+        if sku:
+            seen_skus.add(sku)
+        if instance is None:
+            creates.append((line, Product(seller=seller, **values)))
+        else:
+            for field, value in values.items():
+                setattr(instance, field, value)
+            updates.append((line, instance, values.keys()))
+
+    if not dry_run:
+        # Slugs picked by hand in this chunk are not in the table yet
+        reserved = {product.slug for _, product in creates if product.slug}
+        reserved.update(product.slug for _, product, fields in updates if 'slug' in fields)
+        _allocate_identifiers([product for _, product in creates], reserved)
+    errors.extend(_reject_slug_conflicts(creates, updates, assigned=not dry_run))
+    rejected = {line for line, _ in errors}
+    creates = [product for line, product in creates if line not in rejected]
+    updates = [(product, fields) for line, product, fields in updates if line not in rejected]
+
+    if not dry_run:
+        _write(creates, updates)
+    result.created += len(creates)
+    result.updated += len(updates)
+    return sorted(errors, key=lambda error: error[0])
+
+
+def _resolve_categories(references):
+    """Map each category id or slug in ``references`` to its category."""
+    if not references:
+        return {}
+    ids = set()
+    for reference in references:
+        try:
+            ids.add(uuid.UUID(str(reference)))
+        except ValueError:
+            pass
+    resolved = {}
+    for category in Category.objects.filter(Q(slug__in=references) | Q(id__in=ids)):
+        resolved[category.slug] = category
+        resolved[str(category.id)] = category
+        resolved[category.id.hex] = category
+    return resolved
+
+
+def _allocate_identifiers(products, reserved=()):
+    """Give new products without a slug or SKU one, avoiding the ``reserved`` slugs."""
+    unnamed = [product for product in products if not product.slug]
+    slugs = Product.allocate_slugs((product.name for product in unnamed), reserved) if unnamed else []
+    for product, slug in zip(unnamed, slugs, strict=True):
+        product.slug = slug
+        product._generated_slug = True
+    without_sku = [product for product in products if not product.sku]
+    skus = Product.allocate_skus(len(without_sku)) if without_sku else []
+    for product, sku in zip(without_sku, skus, strict=True):
+        product.sku = sku
+
+
+def _reject_slug_conflicts(creates, updates, assigned=True):
+    """
+    Errors for rows whose slug is already used, checked with one query.
+
+    A generated slug that collides with a hand-picked one gets a fresh
+    slug after its sequence is caught up, like ``Product.save`` does.
+    """
+    wanted = {}
+    for line, product in creates:
+        if product.slug:
+            wanted.setdefault(product.slug, []).append((line, product))
+    for line, product, fields in updates:
+        if 'slug' in fields:
+            wanted.setdefault(product.slug, []).append((line, product))
+    if not wanted:
+        return []
+
+    taken = dict(Product.objects.filter(slug__in=wanted).values_list('slug', 'id'))
+    errors = []
+    regenerate = []
+    for slug, claims in wanted.items():
+        owner = taken.get(slug)
+        for index, (line, product) in enumerate(claims):
+            if owner is None and index == 0 or owner == product.pk and not product._state.adding:
+                continue
+            if getattr(product, '_generated_slug', False):
+                regenerate.append(product)
+            else:
+                errors.append((line, {'slug': ['A product with this slug already exists.']}))
+
+    if assigned and regenerate:
+        for base in {Product.slug_base(product.name) for product in regenerate}:
+            IdentifierSequence.advance(f'slug:{base}', Product.next_slug_suffix(base))
+        for product in regenerate:
+            product.slug = ''
+        _allocate_identifiers(regenerate, reserved=set(wanted))
+    return errors
+
+
+def _write(creates, updates):
+    """Insert and update one chunk atomically and refresh their search entries."""
+    batch_size = getattr(settings, 'PRODUCT_IMPORT_BATCH_SIZE', 500)
+    with transaction.atomic():
+        if creates:
+            Product.objects.bulk_create(creates, batch_size=batch_size)
+        if updates:
+            now = timezone.now()
+            fields = {'detail_version', 'updated_at'}
+            for product, changed in updates:
+                fields.update(changed)
+                product.updated_at = now
+                # Invalidates cached detail pages, as Product.save does
+                product.detail_version = F('detail_version') + 1
+            Product.objects.bulk_update([product for product, _ in updates], sorted(fields), batch_size=batch_size)
+        # Bulk writes skip post_save, so index explicitly
+        written = creates + [product for product, _ in updates]
+        get_backend().index(written)
+        autocomplete.index_products(written)
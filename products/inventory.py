@@ -0,0 +1,64 @@
+"""
+Race-free stock adjustments.
+
+Stock is never read, compared in Python and written back. Every change is
+a single UPDATE with ``F('stock')`` arithmetic, and decrements carry a
+``stock >= n`` guard so concurrent buyers can never drive stock negative.
+Each update also bumps ``detail_version`` so cached detail pages show
+the new stock.
+"""
+from django.db import models, transaction
+from django.db.models import Case, F, Q, When
+
+from .models import Product
+
+
+class InsufficientStockError(Exception):
+    """Raised when a guarded decrement cannot be applied to every product."""
+
+
+def _stock_case(quantities, sign):
+    return Case(
+        *[When(id=product_id, then=F('stock') + sign * quantity)
+          for product_id, quantity in quantities.items()],
+        default=F('stock'),
+        output_field=models.PositiveIntegerField(),
+    )
+
+
+def _positive(quantities):
+    return {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+
+
+def decrement_stock(quantities):
+    """
+    Atomically take ``{product_id: quantity}`` out of stock.
+
+    All products are updated by one guarded UPDATE; if any of them is short
+    nothing is changed and ``InsufficientStockError`` is raised.
+    """
+    quantities = _positive(quantities)
+    if not quantities:
+        return
+    guard = Q()
+    for product_id, quantity in quantities.items():
+        guard |= Q(id=product_id, stock__gte=quantity)
+
+    with transaction.atomic():
+        updated = Product.objects.filter(guard).update(
+            stock=_stock_case(quantities, -1),
+            detail_version=F('detail_version') + 1,
+        )
+        if updated != len(quantities):
+            # Roll back the rows that did have enough stock
+            raise InsufficientStockError('Insufficient stock.')
+
+
+def increment_stock(quantities):
+    """Atomically return ``{product_id: quantity}`` to stock in one UPDATE."""
+    quantities = _positive(quantities)
+    if quantities:
+        Product.objects.filter(id__in=quantities.keys()).update(
+            stock=_stock_case(quantities, 1),
+            detail_version=F('detail_version') + 1,
+        )
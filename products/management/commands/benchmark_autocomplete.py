@@ -0,0 +1,76 @@
+import random
+import statistics
+import string
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from products.autocomplete import AutocompleteIndex
+
+
+class Command(BaseCommand):
+    help = 'Build an in-memory autocomplete index over synthetic products and time prefix lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=1000000,
+            help='Synthetic products to index (default: 1000000)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=5000,
+            help='Synthetic popular queries to index (default: 5000)',
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=10000,
+            help='Prefix lookups to time (default: 10000)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = [self.word(rng) for _ in range(5000)]
+        brands = [self.word(rng).title() for _ in range(2000)]
+
+        def products():
+            for _ in range(options['products']):
+                name = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 4))).title()
+                yield uuid.uuid4(), name, '', rng.choice(brands)
+
+        queries = [
+            (' '.join(rng.choice(words) for _ in range(rng.randint(1, 3))), rng.randint(1, 10000))
+            for _ in range(options['queries'])
+        ]
+
+        started = time.perf_counter()
+        index = AutocompleteIndex(products(), queries)
+        self.stdout.write(f'Indexed {len(index)} keys in {time.perf_counter() - started:.1f}s')
+
+        timings = []
+        for _ in range(options['lookups']):
+            word = rng.choice(words)
+            prefix = word[:rng.randint(1, len(word))]
+            started = time.perf_counter()
+            index.complete(prefix)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        p99 = timings[min(int(len(timings) * 0.99), len(timings) - 1)]
+        self.stdout.write(
+            f'{len(timings)} lookups: p50 {statistics.median(timings):.3f} ms, '
+            f'p99 {p99:.3f} ms, max {timings[-1]:.3f} ms'
+        )
+
+        adds = 1000
+        started = time.perf_counter()
+        for _ in range(adds):
+            index.add_product(uuid.uuid4(), rng.choice(words).title(), '', rng.choice(brands))
+        self.stdout.write(f'Incremental add: {(time.perf_counter() - started) / adds * 1000:.3f} ms per product')
+
+    @staticmethod
+    def word(rng):
+        return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
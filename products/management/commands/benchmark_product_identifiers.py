@@ -0,0 +1,124 @@
+import random
+import string
+import time
+from datetime import datetime
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import slugify
+from products.models import Category, Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and time per insert spent allocating slugs and SKUs for repeated and distinct names'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=10000,
+            help='Products with the same name to insert with the current allocator (default: 10000)',
+        )
+        parser.add_argument(
+            '--legacy-count',
+            type=int,
+            default=500,
+            help='Products to insert with the previous probing allocator (default: 500)',
+        )
+        parser.add_argument(
+            '--unique-count',
+            type=int,
+            default=1000,
+            help='Products with distinct names to insert with the current allocator (default: 1000)',
+        )
+        parser.add_argument(
+            '--name',
+            default='Benchmark Widget',
+            help='Product name shared by every insert',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seller, _ = User.objects.get_or_create(
+                email='benchmark-seller@example.com',
+                defaults={'username': 'benchmark-seller', 'role': 'seller'},
+            )
+            category, _ = Category.objects.get_or_create(
+                name='Benchmark', defaults={'slug': 'benchmark'}
+            )
+            results = {
+                'legacy': self.measure(
+                    seller, category, f"{options['name']} legacy", options['legacy_count'], legacy=True
+                ),
+                'current': self.measure(seller, category, options['name'], options['count']),
+                'unique': self.measure(
+                    seller, category, f"{options['name']} unique", options['unique_count'], unique=True
+                ),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'':9}{'inserts':>10}{'queries/insert':>16}{'ms/insert':>11}{'last 100 ms':>13}")
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:9}{result['inserts']:>10}{result['queries']:>16.2f}"
+                f"{result['ms']:>11.3f}{result['tail_ms']:>13.3f}"
+            )
+
+    def measure(self, seller, category, name, count, legacy=False, unique=False):
+        """
+        Insert ``count`` products one at a time and average the cost of
+        allocating their slug and SKU. Products share ``name`` unless
+        ``unique``, in which case each gets a numbered one.
+        """
+        tail = max(count - 100, 0)
+        elapsed = tail_elapsed = 0.0
+        queries = 0
+        for i in range(count):
+            product = Product(
+                seller=seller, category=category, name=f'{name} {i}' if unique else name, price=10, stock=1
+            )
+            # Keep the capped query log from wrapping over thousands of inserts
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                if legacy:
+                    product.slug = self.legacy_slug(name)
+                    product.sku = self.legacy_sku()
+                else:
+                    product.slug = product.generate_unique_slug()
+                    product.sku = product.generate_sku()
+                took = time.perf_counter() - started
+            product.save()
+            elapsed += took
+            if i >= tail:
+                tail_elapsed += took
+            queries += len(ctx.captured_queries)
+
+        return {
+            'inserts': count,
+            'queries': queries / count if count else 0,
+            'ms': elapsed / count * 1000 if count else 0,
+            'tail_ms': tail_elapsed / (count - tail) * 1000 if count else 0,
+        }
+
+    def legacy_slug(self, name):
+        """Slug generation before allocation: probe base-1, base-2, ... until free."""
+        base_slug = slugify(name)
+        slug = base_slug
+        counter = 1
+        while Product.objects.filter(slug=slug).exists():
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        return slug
+
+    def legacy_sku(self):
+        """SKU generation before the sequence: random suffix checked for collisions."""
+        date_str = datetime.now().strftime('%Y%m%d')
+        while True:
+            random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+            sku = f"PRD-{date_str}-{random_str}"
+            if not Product.objects.filter(sku=sku).exists():
+                return sku
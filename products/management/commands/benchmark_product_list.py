@@ -0,0 +1,128 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from products.models import Category, Product, ProductImage, ProductReview
+from products.serializers import ProductListSerializer
+from products.views import product_list_queryset
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare bytes fetched and query time for one product listing page before and after column pruning'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Products per page (default: 20)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs per queryset (default: 5)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Create this many synthetic products with reviews first; rolled back afterwards',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+
+            # The listing queryset before user-facing column pruning
+            legacy = Product.objects.select_related('category', 'seller').prefetch_related(
+                'images', 'reviews'
+            ).filter(is_active=True)
+            pruned = product_list_queryset().filter(is_active=True)
+
+            results = {
+                'before': self.measure(legacy, options['page_size'], options['repeat']),
+                'after': self.measure(pruned, options['page_size'], options['repeat']),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'':8}{'queries':>10}{'bytes':>12}{'ms/page':>10}")
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:8}{result['queries']:>10}{result['bytes']:>12}{result['ms']:>10.2f}"
+            )
+        before, after = results['before']['bytes'], results['after']['bytes']
+        if before:
+            self.stdout.write(self.style.SUCCESS(
+                f'Listing page fetches {100 - after / before * 100:.1f}% fewer bytes.'
+            ))
+
+    def measure(self, queryset, page_size, repeat):
+        """Serialize one page ``repeat`` times; report per-page averages."""
+        elapsed = 0.0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                # Reading .data is what renders the page
+                _ = ProductListSerializer(list(queryset[:page_size]), many=True).data
+                elapsed += time.perf_counter() - started
+
+        return {
+            'queries': len(ctx.captured_queries),
+            'bytes': sum(self.fetched_bytes(query['sql']) for query in ctx.captured_queries),
+            'ms': elapsed / repeat * 1000,
+        }
+
+    def fetched_bytes(self, sql):
+        """Size of the rows a captured SELECT returns, as text."""
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return sum(
+                len(str(value).encode())
+                for row in cursor.fetchall()
+                for value in row
+                if value is not None
+            )
+
+    def seed(self, count):
+        seller, _ = User.objects.get_or_create(
+            email='benchmark-seller@example.com',
+            defaults={'username': 'benchmark-seller', 'role': 'seller'},
+        )
+        reviewer, _ = User.objects.get_or_create(
+            email='benchmark-buyer@example.com',
+            defaults={'username': 'benchmark-buyer'},
+        )
+        category, _ = Category.objects.get_or_create(
+            name='Benchmark', defaults={'slug': 'benchmark'}
+        )
+        products = Product.objects.bulk_create([
+            Product(
+                seller=seller,
+                category=category,
+                name=f'Benchmark product {i}',
+                slug=f'benchmark-product-{i}',
+                sku=f'BENCH-{i:06d}',
+                description='Long marketing copy. ' * 200,
+                technical_specs={f'spec_{n}': 'value ' * 10 for n in range(30)},
+                refund_policy='Returns accepted within 30 days. ' * 20,
+                price=10,
+                stock=10,
+            )
+            for i in range(count)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image_url=f'https://example.com/{product.sku}-{n}.jpg')
+            for product in products for n in range(3)
+        ])
+        ProductReview.objects.bulk_create([
+            ProductReview(
+                product=product, user=reviewer, rating=4,
+                title='Benchmark review', comment='Detailed review text. ' * 30,
+            )
+            for product in products
+        ])
@@ -0,0 +1,77 @@
+import json
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from products import imports
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Create or update a seller\'s products from a CSV or JSONL catalog, matched by SKU'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Catalog file (.csv, .jsonl or .ndjson)')
+        parser.add_argument(
+            '--seller',
+            required=True,
+            help='Email of the seller who owns the imported products',
+        )
+        parser.add_argument(
+            '--file-format',
+            choices=imports.FORMATS,
+            help='Catalog format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Rows validated and written per transaction (default: PRODUCT_IMPORT_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--errors',
+            help='Write rejected rows to this JSONL file instead of the console',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only validate rows without writing products',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(email=options['seller'])
+        except User.DoesNotExist as exc:
+            raise CommandError(f"No user with email {options['seller']}") from exc
+
+        file_format = options['file_format'] or imports.detect_format(options['path'])
+        if file_format is None:
+            raise CommandError('Cannot tell the catalog format; pass --file-format')
+
+        error_file = open(options['errors'], 'w') if options['errors'] else None
+        try:
+            def report(line, errors):
+                if error_file is not None:
+                    error_file.write(json.dumps({'line': line, 'errors': errors}) + '\n')
+                else:
+                    self.stderr.write(f'Line {line}: {json.dumps(errors)}')
+
+            with open(options['path'], 'rb') as catalog:
+                result = imports.import_products(
+                    catalog,
+                    seller,
+                    file_format,
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                    max_errors=0,
+                    on_error=report,
+                )
+        except UnicodeDecodeError as exc:
+            raise CommandError('Catalog must be UTF-8 encoded') from exc
+        finally:
+            if error_file is not None:
+                error_file.close()
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} catalog: {result.created} created, {result.updated} updated, '
+            f'{result.failed} rejected.'
+        ))
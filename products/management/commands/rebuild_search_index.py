@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import Product
+from products.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the products table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of products indexed per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_backend()
+
+        products = Product.objects.only('id', 'name', 'brand', 'sku', 'description').order_by()
+        batch = []
+        total = 0
+        # Searches keep seeing the old index until the rebuild commits
+        with transaction.atomic():
+            backend.clear()
+            for product in products.iterator(chunk_size=batch_size):
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    backend.index(batch)
+                    total += len(batch)
+                    batch = []
+                    self.stdout.write(f'Indexed {total} products...')
+            backend.index(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} products with {type(backend).__name__}.'
+        ))
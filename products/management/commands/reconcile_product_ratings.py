@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from products.models import Product
+from products.ratings import SUMMARY_FIELDS, aggregate_ratings, product_rating_changed
+
+
+class Command(BaseCommand):
+    help = 'Verify stored product rating summaries against reviews and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of products checked per grouped query (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted products without repairing them',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+
+        checked = drifted = 0
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            expected = aggregate_ratings(batch)
+            stale = []
+            for product in Product.objects.filter(id__in=batch).only('id', 'slug', *SUMMARY_FIELDS):
+                summary = expected[product.id]
+                if any(getattr(product, field) != value for field, value in summary.items()):
+                    self.stdout.write(f'Drift on {product.slug}')
+                    deltas = {
+                        'sum_delta': summary['rating_sum'] - product.rating_sum,
+                        'count_delta': summary['review_count'] - product.review_count,
+                    }
+                    for field, value in summary.items():
+                        setattr(product, field, value)
+                    product.detail_version = F('detail_version') + 1
+                    stale.append((product, deltas))
+            checked += len(batch)
+            drifted += len(stale)
+
+            if stale and not options['dry_run']:
+                with transaction.atomic():
+                    Product.objects.bulk_update(
+                        [product for product, _ in stale], [*SUMMARY_FIELDS, 'detail_version']
+                    )
+                    # Let seller aggregates absorb the corrections
+                    for product, deltas in stale:
+                        if deltas['sum_delta'] or deltas['count_delta']:
+                            product_rating_changed.send(sender=Product, product_id=product.id, **deltas)
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} products. {action} {drifted} with rating drift.'
+        ))
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 index used by products.search.SQLiteFTSBackend."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "product_id UNINDEXED, name, brand, sku, description, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts_vocab USING fts5vocab(products_fts, 'row')"
+    )
+    populate_search_index(apps, schema_editor)
+
+
+def populate_search_index(apps, schema_editor, batch_size=1000):
+    """Index the existing products, keyed like SQLiteFTSBackend.rowid."""
+    Product = apps.get_model('products', 'Product')
+    products = Product.objects.using(schema_editor.connection.alias).values_list(
+        'pk', 'name', 'brand', 'sku', 'description'
+    ).order_by()
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for pk, name, brand, sku, description in products.iterator(chunk_size=batch_size):
+            batch.append((pk.int & ((1 << 63) - 1), pk.hex, name, brand, sku, description))
+            if len(batch) >= batch_size:
+                _insert_rows(cursor, batch)
+                batch = []
+        _insert_rows(cursor, batch)
+
+
+def _insert_rows(cursor, rows):
+    if rows:
+        cursor.executemany(
+            'INSERT INTO products_fts (rowid, product_id, name, brand, sku, description) '
+            'VALUES (%s, %s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS products_fts_vocab")
+    schema_editor.execute("DROP TABLE IF EXISTS products_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_deletion_requested_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
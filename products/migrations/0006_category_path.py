@@ -0,0 +1,41 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:42
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    """Compute path and depth for existing categories, parents first."""
+    Category = apps.get_model('products', 'Category')
+    categories = list(Category.objects.all())
+    children = {}
+    for category in categories:
+        children.setdefault(category.parent_id, []).append(category)
+
+    pending = [(category, '') for category in children.get(None, [])]
+    while pending:
+        category, parent_path = pending.pop()
+        category.path = f"{parent_path}{category.id.hex}/"
+        category.depth = category.path.count('/') - 1
+        pending.extend((child, category.path) for child in children.get(category.id, []))
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=1000),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
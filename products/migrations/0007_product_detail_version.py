@@ -0,0 +1,18 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='detail_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_histograms(apps, schema_editor):
+    """Fill the per-star counts from existing reviews in one grouped query."""
+    Product = apps.get_model('products', 'Product')
+    ProductReview = apps.get_model('products', 'ProductReview')
+    rows = ProductReview.objects.values('product_id').annotate(**{
+        f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)
+    }).order_by()
+    for row in rows:
+        product_id = row.pop('product_id')
+        Product.objects.filter(pk=product_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_detail_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='product_rev_product_4bb642_idx'),
+        ),
+        migrations.RunPython(populate_histograms, migrations.RunPython.noop),
+    ]
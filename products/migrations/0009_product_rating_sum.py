@@ -0,0 +1,33 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:48
+
+from django.db import migrations, models
+
+from products.ratings import aggregate_ratings
+
+
+def populate_rating_summaries(apps, schema_editor, batch_size=500):
+    """
+    Recompute every rating summary column from the reviews; the stored
+    counts and averages predate review writes maintaining them.
+    """
+    Product = apps.get_model('products', 'Product')
+    product_ids = list(Product.objects.values_list('pk', flat=True))
+    for start in range(0, len(product_ids), batch_size):
+        for product_id, summary in aggregate_ratings(product_ids[start:start + batch_size]).items():
+            Product.objects.filter(pk=product_id).update(**summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_review_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_summaries, migrations.RunPython.noop),
+    ]
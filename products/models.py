@@ -1,9 +1,11 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F, Max, Q, Value
+from django.db.models.functions import Cast, Concat, Substr
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.utils.text import slugify
+import re
 import uuid
-import random
-import string
 
 
 class Category(models.Model):
@@ -20,9 +22,17 @@ class Category(models.Model):
         blank=True,
         related_name='children'
     )
+    # Materialized path: the hex ids of every ancestor and of the category
+    # itself, each followed by PATH_SEPARATOR. A subtree is the index range
+    # [path, path + PATH_END).
+    path = models.CharField(max_length=1000, blank=True, editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    PATH_SEPARATOR = '/'
+    PATH_END = '~'  # sorts after every hex digit and the separator
+    
     class Meta:
         db_table = 'categories'
         verbose_name_plural = 'Categories'
@@ -30,6 +40,113 @@ class Category(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def build_path(self):
+        # Read the parent's path from the database; a cached parent may be stale
+        parent_path = Category.objects.filter(pk=self.parent_id).values_list(
+            'path', flat=True
+        ).first() if self.parent_id else ''
+        return f"{parent_path}{self.id.hex}{self.PATH_SEPARATOR}"
+    
+    def save(self, *args, **kwargs):
+        old_path = self.path
+        # Read by the post_save handler that invalidates the branch left behind
+        self._previous_path = old_path
+        new_path = self.build_path()
+        if old_path and new_path != old_path and new_path.startswith(old_path):
+            raise ValidationError('A category cannot be moved under its own subcategory.')
+        self.path = new_path
+        self.depth = new_path.count(self.PATH_SEPARATOR) - 1
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != new_path:
+                # Re-root the whole subtree in one UPDATE
+                Category.objects.filter(
+                    path__gt=old_path, path__lt=old_path + self.PATH_END
+                ).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (self.depth - (old_path.count(self.PATH_SEPARATOR) - 1)),
+                )
+    
+    def get_descendants(self, include_self=True):
+        """The category's subtree as one indexed range query."""
+        descendants = Category.objects.filter(**self.subtree_filter(self.path, prefix=''))
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+    
+    @classmethod
+    def subtree_filter(cls, path, prefix='category__'):
+        """Filter kwargs matching rows whose category lies under ``path``."""
+        return {f'{prefix}path__gte': path, f'{prefix}path__lt': path + cls.PATH_END}
+
+
+class IdentifierSequence(models.Model):
+    """Named counters for allocating unique identifiers such as SKUs."""
+    
+    name = models.CharField(max_length=300, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'identifier_sequences'
+    
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+    
+    @classmethod
+    def allocate(cls, name, count=1, start=1):
+        """
+        Reserve ``count`` consecutive values and return them as a range.
+        
+        The increment and the read happen in one statement (or one
+        transaction without RETURNING), so concurrent callers always
+        receive disjoint blocks. ``start`` (a value or a callable) seeds a
+        sequence on first use.
+        """
+        end = cls._increment(name, count)
+        if end is None:
+            cls.objects.get_or_create(
+                name=name, defaults={'next_value': start() if callable(start) else start}
+            )
+            end = cls._increment(name, count)
+        return range(end - count, end)
+    
+    @classmethod
+    def allocate_many(cls, counts, start=None):
+        """
+        ``allocate`` for several sequences at once, mapping name to range.
+        
+        Sequences used for the first time are seeded together in one
+        INSERT; ``start(name)`` gives each its first value.
+        """
+        known = set(cls.objects.filter(name__in=counts).values_list('name', flat=True))
+        missing = [name for name in counts if name not in known]
+        if missing:
+            cls.objects.bulk_create(
+                [cls(name=name, next_value=start(name) if start else 1) for name in missing],
+                ignore_conflicts=True,
+            )
+        return {name: cls.allocate(name, count) for name, count in counts.items()}
+    
+    @classmethod
+    def advance(cls, name, value):
+        """Move a sequence forward to at least ``value``."""
+        cls.objects.filter(name=name, next_value__lt=value).update(next_value=value)
+    
+    @classmethod
+    def _increment(cls, name, count):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {cls._meta.db_table} SET next_value = next_value + %s '
+                    'WHERE name = %s RETURNING next_value',
+                    [count, name],
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(next_value=F('next_value') + count):
+                return None
+            return cls.objects.filter(name=name).values_list('next_value', flat=True).get()
 
 
 class Product(models.Model):
@@ -105,6 +222,16 @@ class Product(models.Model):
     # Reviews
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
     review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # Review counts per star, so detail pages never aggregate reviews
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Bumped by every write that changes the detail page; keys the response cache
+    detail_version = models.PositiveIntegerField(default=1, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -121,42 +248,132 @@ class Product(models.Model):
     
     def save(self, *args, **kwargs):
         # Auto-generate slug from name if not provided
-        if not self.slug:
+        generated_slug = not self.slug
+        if generated_slug:
             self.slug = self.generate_unique_slug()
         
-        # Auto-generate SKU only on creation (when pk is None)
-        if not self.pk and not self.sku:
+        # Auto-generate SKU only on creation
+        if self._state.adding and not self.sku:
             self.sku = self.generate_sku()
         
+        if self._state.adding:
+            if not generated_slug:
+                super().save(*args, **kwargs)
+                return
+            # A hand-picked slug may already use the generated one; allocate again
+            for attempt in range(3):
+                try:
+                    with transaction.atomic():
+                        super().save(*args, **kwargs)
+                    return
+                except IntegrityError:
+                    if attempt == 2 or not Product.objects.filter(slug=self.slug).exists():
+                        raise
+                    # The slug was set by hand elsewhere; catch the sequence up
+                    base = self.slug_base(self.name)
+                    IdentifierSequence.advance(f'slug:{base}', self.next_slug_suffix(base))
+                    self.slug = self.generate_unique_slug()
+        
+        # Bump in SQL so a stale in-memory version never rolls the counter back
+        self.detail_version = F('detail_version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'detail_version'}
         super().save(*args, **kwargs)
+        # Defer the new version rather than reload it; it is read back only if used
+        del self.detail_version
     
     def generate_unique_slug(self):
         """Generate a unique slug from product name."""
-        base_slug = slugify(self.name)
-        slug = base_slug
-        counter = 1
+        return Product.allocate_slugs([self.name])[0]
+    
+    @staticmethod
+    def slug_base(name):
+        return slugify(name) or 'product'
+    
+    @classmethod
+    def allocate_slugs(cls, names, reserved=()):
+        """
+        Unique slugs for ``names``, in order.
+        
+        One query finds which bare slugs are taken (in the table or in
+        ``reserved``); the first product of each free base gets the bare
+        slug. Only bases that collide use a sequence of suffixes, seeded
+        after the highest suffix already in the table, so the common case
+        of distinct names costs a single query and stores no sequences.
+        """
+        names = list(names)
+        counts = {}
+        for name in names:
+            base = cls.slug_base(name)
+            counts[base] = counts.get(base, 0) + 1
+        reserved = set(reserved)
+        taken = reserved.intersection(counts)
+        taken.update(cls.objects.filter(slug__in=set(counts) - taken).values_list('slug', flat=True))
         
-        while Product.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
+        # Suffixes needed per base: all of them once the bare slug is taken
+        needed = {
+            base: count if base in taken else count - 1
+            for base, count in counts.items()
+            if base in taken or count > 1
+        }
+        suffixes = {}
+        if len(needed) == 1:
+            (base, count), = needed.items()
+            suffixes[base] = iter(IdentifierSequence.allocate(
+                f'slug:{base}', count, start=lambda: max(cls.next_slug_suffix(base), 1)
+            ))
+        elif needed:
+            blocks = IdentifierSequence.allocate_many(
+                {f'slug:{base}': count for base, count in needed.items()},
+                start=lambda name: max(cls.next_slug_suffix(name[len('slug:'):]), 1),
+            )
+            suffixes = {base: iter(blocks[f'slug:{base}']) for base in needed}
         
-        return slug
+        slugs = []
+        for name in names:
+            base = cls.slug_base(name)
+            if base not in taken:
+                taken.add(base)
+                slugs.append(base)
+            else:
+                slugs.append(f"{base}-{next(suffixes[base])}")
+        return slugs
+    
+    @classmethod
+    def next_slug_suffix(cls, base):
+        """First free suffix for ``base`` according to the products table."""
+        # '-' sorts directly before '.', so [base-, base.) holds every suffixed slug
+        usage = cls.objects.filter(
+            Q(slug=base) | Q(slug__gte=f"{base}-", slug__lt=f"{base}.")
+        ).aggregate(
+            taken=Count('id', filter=Q(slug=base)),
+            highest=Max(
+                Cast(Substr('slug', len(base) + 2), models.BigIntegerField()),
+                filter=Q(slug__regex=rf"^{re.escape(base)}-[0-9]+$"),
+            ),
+        )
+        if not usage['taken'] and usage['highest'] is None:
+            return 0
+        return (usage['highest'] or 0) + 1
     
     @staticmethod
     def generate_sku():
         """Generate a unique SKU (Stock Keeping Unit)."""
-        # Format: PRD-YYYYMMDD-XXXXX (e.g., PRD-20251024-A3F9K)
+        return Product.allocate_skus(1)[0]
+    
+    @staticmethod
+    def allocate_skus(count):
+        """
+        ``count`` unique SKUs from the ``sku`` sequence in one query.
+        
+        Format: PRD-YYYYMMDD-NNNNNN (e.g., PRD-20251024-000042). The numeric
+        part never has five characters, so it cannot clash with the random
+        five-character SKUs issued before the sequence existed.
+        """
         from datetime import datetime
         date_str = datetime.now().strftime('%Y%m%d')
-        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-        sku = f"PRD-{date_str}-{random_str}"
-        
-        # Ensure uniqueness
-        while Product.objects.filter(sku=sku).exists():
-            random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-            sku = f"PRD-{date_str}-{random_str}"
-        
-        return sku
+        return [f"PRD-{date_str}-{value:06d}" for value in IdentifierSequence.allocate('sku', count)]
     
     def __str__(self):
         return self.name
@@ -228,6 +445,10 @@ class ProductReview(models.Model):
         db_table = 'product_reviews'
         ordering = ['-created_at']
         unique_together = ['product', 'user']
+        indexes = [
+            # Review feed: one product's reviews, newest first
+            models.Index(fields=['product', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.product.name} ({self.rating}★)"
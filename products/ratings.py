@@ -0,0 +1,125 @@
+"""
+Product rating summaries: sum, count, average and per-star histogram.
+
+The summary lives on ``Product`` (``rating_sum``, ``review_count``,
+``average_rating`` and ``rating_1`` .. ``rating_5``) so detail pages and
+review feeds never aggregate over reviews. Review writes adjust it
+incrementally with a single ``F()`` UPDATE (see ``apply_review_change``,
+wired to review signals so the API, ``add_review`` and the admin all share
+it); ``recompute_product_ratings`` and the ``reconcile_product_ratings``
+command rebuild it from the reviews table.
+"""
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Avg, Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Cast, Round
+from django.dispatch import Signal
+
+from .models import Product, ProductReview
+
+STARS = range(1, 6)
+HISTOGRAM_FIELDS = {star: f'rating_{star}' for star in STARS}
+SUMMARY_FIELDS = ['rating_sum', 'review_count', 'average_rating', *HISTOGRAM_FIELDS.values()]
+
+# Sent with product_id, sum_delta and count_delta whenever a product's
+# rating sum or review count moves, so owners' aggregates can follow
+product_rating_changed = Signal()
+
+
+def rating_summary(product):
+    """Serializable summary built from the product's stored columns."""
+    return {
+        'average_rating': float(product.average_rating or 0),
+        'review_count': product.review_count,
+        'histogram': {str(star): getattr(product, field) for star, field in HISTOGRAM_FIELDS.items()},
+    }
+
+
+def apply_review_change(product_id, old_rating=None, new_rating=None):
+    """
+    Move one review's contribution in a single atomic UPDATE.
+
+    ``old_rating`` is removed and ``new_rating`` added; pass ``None`` for
+    the side that does not exist (a create or a delete).
+    """
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    if not count_delta and not sum_delta:
+        return 0
+
+    updates = {
+        'review_count': F('review_count') + count_delta,
+        'rating_sum': F('rating_sum') + sum_delta,
+        'detail_version': F('detail_version') + 1,
+    }
+    if old_rating is not None:
+        updates[HISTOGRAM_FIELDS[old_rating]] = F(HISTOGRAM_FIELDS[old_rating]) - 1
+    if new_rating is not None:
+        field = HISTOGRAM_FIELDS[new_rating]
+        updates[field] = (updates[field] if field in updates else F(field)) + 1
+
+    updates['average_rating'] = average_rating_expression(sum_delta, count_delta)
+    updated = Product.objects.filter(pk=product_id).update(**updates)
+    if updated:
+        product_rating_changed.send(
+            sender=Product, product_id=product_id, sum_delta=sum_delta, count_delta=count_delta
+        )
+    return updated
+
+
+def average_rating_expression(sum_delta, count_delta, sum_field='rating_sum', count_field='review_count'):
+    """
+    New average for an UPDATE that also moves ``sum_field`` and ``count_field``.
+
+    Every F() in one UPDATE reads the pre-update row, so the average is
+    derived from the same deltas rather than from the new columns.
+    """
+    new_count = F(count_field) + count_delta
+    new_sum = F(sum_field) + sum_delta
+    decimal = models.DecimalField(max_digits=3, decimal_places=2)
+    return Case(
+        When(Q(**{f'{count_field}__lte': -count_delta}), then=Value(Decimal('0.00'))),
+        default=Cast(
+            Round(Cast(new_sum, models.FloatField()) / Cast(new_count, models.FloatField()), 2),
+            decimal,
+        ),
+        output_field=decimal,
+    )
+
+
+def aggregate_ratings(product_ids):
+    """Summary columns for the given products computed from their reviews in one query."""
+    rows = ProductReview.objects.filter(product_id__in=product_ids).values('product_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        average=Avg('rating'),
+        **{field: Count('id', filter=Q(rating=star)) for star, field in HISTOGRAM_FIELDS.items()},
+    ).order_by()
+
+    summaries = {
+        product_id: {
+            'rating_sum': 0,
+            'review_count': 0,
+            'average_rating': Decimal('0.00'),
+            **dict.fromkeys(HISTOGRAM_FIELDS.values(), 0),
+        }
+        for product_id in product_ids
+    }
+    for row in rows:
+        summary = summaries[row['product_id']]
+        summary['review_count'] = row['review_count']
+        summary['rating_sum'] = row['rating_sum'] or 0
+        summary['average_rating'] = round(Decimal(row['average'] or 0), 2)
+        for field in HISTOGRAM_FIELDS.values():
+            summary[field] = row[field]
+    return summaries
+
+
+def recompute_product_ratings(product_ids):
+    """Rebuild the stored summary of the given products from their reviews."""
+    product_ids = list(product_ids)
+    for product_id, summary in aggregate_ratings(product_ids).items():
+        Product.objects.filter(pk=product_id).update(
+            detail_version=F('detail_version') + 1, **summary
+        )
@@ -0,0 +1,179 @@
+"""
+Pluggable product search.
+
+``get_backend()`` returns the backend named by ``PRODUCT_SEARCH_BACKEND``.
+The default on SQLite is ``SQLiteFTSBackend``, a relevance-ranked FTS5
+index with prefix matching and typo correction against the index
+vocabulary. Other databases fall back to ``DatabaseSearchBackend`` until a
+native backend is configured. Backends are kept in sync by the signal
+handlers in ``products.signals`` and rebuilt by ``rebuild_search_index``.
+Each storefront search sends ``product_searched`` so it can be logged.
+"""
+import difflib
+import re
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_backends = {}
+
+# Sent once per search of the product list (first page only) with query,
+# results_count, user, session_id and ip_address
+product_searched = Signal()
+
+
+def get_backend():
+    """Return the configured search backend instance."""
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if path is None:
+        path = (
+            'products.search.SQLiteFTSBackend' if connection.vendor == 'sqlite'
+            else 'products.search.DatabaseSearchBackend'
+        )
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+class BaseSearchBackend:
+    """Interface every search backend implements."""
+
+    def index(self, products):
+        """Add or refresh the given products."""
+
+    def remove(self, product_ids):
+        """Drop the given products from the index."""
+
+    def clear(self):
+        """Empty the index before a rebuild."""
+
+    def search(self, query, limit=500, active_only=True):
+        """
+        Return up to ``limit`` product ids, best match first; inactive
+        products are left out before the limit unless ``active_only`` is off.
+        """
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Unindexed fallback matching every term against name, brand, SKU or description."""
+
+    def search(self, query, limit=500, active_only=True):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        condition = Q(is_active=True) if active_only else Q()
+        for term in terms:
+            condition &= (
+                Q(name__icontains=term) | Q(brand__icontains=term)
+                | Q(sku__icontains=term) | Q(description__icontains=term)
+            )
+        return list(Product.objects.filter(condition).values_list('id', flat=True)[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    FTS5 index over name, brand, SKU and description, ranked with bm25.
+
+    Rows are keyed by a 63-bit rowid derived from the product UUID, so
+    updates and deletes are rowid lookups rather than table scans.
+    """
+
+    table = 'products_fts'
+    vocab_table = 'products_fts_vocab'
+    # bm25 weights for (product_id, name, brand, sku, description)
+    weights = (0.0, 10.0, 4.0, 8.0, 1.0)
+    typo_cutoff = 0.75
+
+    @staticmethod
+    def rowid(product_id):
+        if not isinstance(product_id, uuid.UUID):
+            product_id = uuid.UUID(str(product_id))
+        return product_id.int & ((1 << 63) - 1)
+
+    def index(self, products):
+        products = list(products)
+        if not products:
+            return
+        self.remove([product.pk for product in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, product_id, name, brand, sku, description) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    (self.rowid(product.pk), product.pk.hex, product.name,
+                     product.brand, product.sku, product.description)
+                    for product in products
+                ],
+            )
+
+    def remove(self, product_ids):
+        rowids = [(self.rowid(product_id),) for product_id in product_ids]
+        if rowids:
+            with connection.cursor() as cursor:
+                cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', rowids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, limit=500, active_only=True):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # Drop inactive products inside the ranked query so they never take a slot under the limit
+        active = (
+            f'AND product_id IN (SELECT id FROM {Product._meta.db_table} WHERE is_active) '
+            if active_only else ''
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT product_id FROM {self.table} WHERE {self.table} MATCH %s {active}'
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                [expression, limit],
+            )
+            return [uuid.UUID(row[0]) for row in cursor.fetchall()]
+
+    def match_expression(self, query):
+        """
+        Build an FTS5 query: every term must match as a prefix, and terms
+        with no prefix match in the vocabulary are swapped for close spellings.
+        """
+        clauses = []
+        for term in tokenize(query):
+            alternatives = [term] if self.has_prefix(term) else self.corrections(term)
+            if not alternatives:
+                alternatives = [term]
+            clauses.append('(' + ' OR '.join(f'"{word}"*' for word in alternatives) + ')')
+        return ' AND '.join(clauses)
+
+    def has_prefix(self, term):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT 1 FROM {self.vocab_table} WHERE term >= %s AND term < %s LIMIT 1',
+                [term, term + '\uffff'],
+            )
+            return cursor.fetchone() is not None
+
+    def corrections(self, term, count=3):
+        """Indexed words sharing the first letter and spelled close to ``term``."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT term FROM {self.vocab_table} WHERE term >= %s AND term < %s',
+                [term[0], term[0] + '\uffff'],
+            )
+            words = [row[0] for row in cursor.fetchall()]
+        return difflib.get_close_matches(term, words, n=count, cutoff=self.typo_cutoff)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import Category, Product, ProductImage, ProductReview
+from .ratings import rating_summary
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,10 +15,27 @@ class CategorySerializer(serializers.ModelSerializer):
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def validate_parent(self, value):
+        if value and self.instance and value.path.startswith(self.instance.path):
+            raise serializers.ValidationError("A category cannot be moved under itself or its subcategories.")
+        return value
+    
     def get_children(self, obj):
-        if obj.children.exists():
-            return CategorySerializer(obj.children.all(), many=True).data
-        return []
+        # Children come from an in-memory map built from one query; the
+        # viewset supplies it for lists, otherwise load this subtree once
+        children_map = self.context.get('category_children')
+        if children_map is None:
+            children_map = category_children_map(obj.get_descendants())
+        context = {**self.context, 'category_children': children_map}
+        return CategorySerializer(children_map.get(obj.pk, []), many=True, context=context).data
+
+
+def category_children_map(categories):
+    """Group categories by parent id, keeping name order within a parent."""
+    children = {}
+    for category in sorted(categories, key=lambda category: category.name):
+        children.setdefault(category.parent_id, []).append(category)
+    return children
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
@@ -70,7 +89,8 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         write_only=True
     )
     images = ProductImageSerializer(many=True, read_only=True)
-    reviews = ProductReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField()
+    rating_summary = serializers.SerializerMethodField()
     seller_name = serializers.CharField(source='seller.username', read_only=True)
     discounted_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     final_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -83,11 +103,22 @@ class ProductDetailSerializer(serializers.ModelSerializer):
                   'weight', 'tags', 'technical_specs', 'refund_policy',
                   'image_url', 'thumbnail_url', 'images', 'is_active', 
                   'is_featured', 'deletion_requested', 'deletion_requested_at',
-                  'reviews', 'average_rating', 'review_count', 
+                  'reviews', 'average_rating', 'review_count', 'rating_summary',
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'seller', 'in_stock', 'discounted_price', 'final_price', 
                             'deletion_requested', 'deletion_requested_at', 'average_rating', 
                             'review_count', 'created_at', 'updated_at']
+    
+    def get_reviews(self, obj):
+        # Only the newest few; the full history is the paginated reviews feed
+        reviews = getattr(obj, 'top_reviews', None)
+        if reviews is None:
+            count = getattr(settings, 'PRODUCT_DETAIL_REVIEW_COUNT', 5)
+            reviews = obj.reviews.select_related('user').order_by('-created_at', '-id')[:count]
+        return ProductReviewSerializer(reviews, many=True, context=self.context).data
+    
+    def get_rating_summary(self, obj):
+        return rating_summary(obj)
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
@@ -141,3 +172,13 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Technical specifications must be a dictionary.")
         return value
 
+
+class ProductImportSerializer(ProductCreateUpdateSerializer):
+    """
+    Create/update rules for rows of a bulk catalog import.
+    
+    ``category`` is a category id or slug that the import resolves for a
+    whole chunk at once, so validating a row runs no queries.
+    """
+    
+    category = serializers.CharField(allow_null=True)
@@ -0,0 +1,92 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, detail_cache, ratings
+from .models import Category, Product, ProductImage, ProductReview
+from .search import get_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """Keep the search and autocomplete indexes in step with product writes."""
+    if raw:
+        return
+    get_backend().index([instance])
+    autocomplete.index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+    autocomplete.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_owner_version(sender, instance, raw=False, **kwargs):
+    """Images are rendered on their product's detail page."""
+    if not raw:
+        detail_cache.bump(pk=instance.product_id)
+
+
+@receiver(pre_save, sender=ProductReview)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    instance._previous_rating = None
+    if not raw and not instance._state.adding:
+        instance._previous_rating = ProductReview.objects.filter(pk=instance.pk).values(
+            'product_id', 'rating'
+        ).first()
+
+
+@receiver(post_save, sender=ProductReview)
+def apply_review_save(sender, instance, created=False, raw=False, **kwargs):
+    """Every review write path (API, add_review, admin) goes through here."""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_previous_rating', None)
+    if previous is None:
+        ratings.apply_review_change(instance.product_id, new_rating=instance.rating)
+    elif previous['product_id'] == instance.product_id:
+        ratings.apply_review_change(instance.product_id, previous['rating'], instance.rating)
+    else:
+        ratings.apply_review_change(previous['product_id'], old_rating=previous['rating'])
+        ratings.apply_review_change(instance.product_id, new_rating=instance.rating)
+
+
+def _deleting_product(origin):
+    return isinstance(origin, Product) or getattr(origin, 'model', None) is Product
+
+
+@receiver(pre_delete, sender=ProductReview)
+def remember_deleted_rating(sender, instance, origin=None, **kwargs):
+    # Read the stored rating; the instance being deleted may be stale
+    if not _deleting_product(origin):
+        instance._previous_rating = ProductReview.objects.filter(pk=instance.pk).values(
+            'product_id', 'rating'
+        ).first()
+
+
+@receiver(post_delete, sender=ProductReview)
+def apply_review_delete(sender, instance, origin=None, **kwargs):
+    # Nothing to maintain when the product itself is being deleted
+    previous = getattr(instance, '_previous_rating', None)
+    if previous and not _deleting_product(origin):
+        ratings.apply_review_change(previous['product_id'], old_rating=previous['rating'])
+
+
+@receiver(post_save, sender=Category)
+def bump_category_versions(sender, instance, raw=False, **kwargs):
+    """Products render their category with its children, so bump every branch touched."""
+    if raw:
+        return
+    detail_cache.bump_for_category_path(instance.path)
+    previous_path = getattr(instance, '_previous_path', '')
+    if previous_path and previous_path != instance.path:
+        detail_cache.bump_for_category_path(previous_path)
+
+
+@receiver(pre_delete, sender=Category)
+def bump_deleted_category_versions(sender, instance, **kwargs):
+    # Products in the subtree lose their category; ancestors lose a child
+    detail_cache.bump(**Category.subtree_filter(instance.path))
+    detail_cache.bump_for_category_path(instance.path)
@@ -1,6 +1,26 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from importlib import import_module
+from types import SimpleNamespace
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from .models import Category, Product, ProductReview
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from analytics.models import SearchQueryDaily
+from analytics.tracking import search_queries
+from . import autocomplete
+from .models import Category, IdentifierSequence, Product, ProductImage, ProductReview
+from .ratings import recompute_product_ratings
+from .search import DatabaseSearchBackend, get_backend, product_searched
+from .views import ProductSearchFilter, ProductViewSet
 
 User = get_user_model()
 
@@ -112,3 +132,719 @@ class ProductReviewModelTest(TestCase):
         self.assertEqual(review.rating, 5)
         self.assertEqual(review.product, self.product)
         self.assertEqual(review.user, self.buyer)
+
+
+class ProductListQueryTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            password='pass123'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        for i in range(5):
+            product = Product.objects.create(
+                seller=self.seller,
+                category=self.category,
+                name=f'Laptop {i}',
+                slug=f'laptop-{i}',
+                description='Long marketing copy. ' * 50,
+                price=999.99,
+                stock=10,
+                sku=f'LAP00{i}'
+            )
+            ProductImage.objects.create(product=product, image_url='https://example.com/a.jpg')
+            ProductReview.objects.create(
+                product=product, user=self.buyer, rating=5, title='Great', comment='Great laptop'
+            )
+        self.client = APIClient()
+    
+    def test_list_skips_large_columns_and_relations(self):
+        """Test listings load only rendered columns and no images or reviews"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['category_name'], 'Electronics')
+        
+        # One count query and one page query
+        self.assertEqual(len(ctx.captured_queries), 2)
+        sql = ctx.captured_queries[-1]['sql']
+        for column in ('description', 'technical_specs', 'refund_policy'):
+            self.assertNotIn(f'"products"."{column}"', sql)
+    
+    def test_detail_prefetches_images_and_reviews(self):
+        """Test the detail view still renders images and reviews"""
+        response = self.client.get('/api/products/laptop-0/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['images']), 1)
+        self.assertEqual(response.data['reviews'][0]['user_name'], 'buyer')
+
+
+# Searches are logged; queued ones are written before the test's
+# transaction rolls back so they never reach a later test
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        self.addCleanup(search_queries.flush)
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.laptop = self.create_product('Gaming Laptop', 'Acme', 'A fast machine for games', 'GL-1')
+        self.mouse = self.create_product('Wireless Mouse', 'Logi', 'Pairs with any laptop', 'WM-1')
+        self.keyboard = self.create_product('Mechanical Keyboard', 'Acme', 'Clicky switches', 'MK-1')
+        self.client = APIClient()
+    
+    def create_product(self, name, brand, description, sku):
+        return Product.objects.create(
+            seller=self.seller,
+            category=self.category,
+            name=name,
+            brand=brand,
+            description=description,
+            sku=sku,
+            price=100,
+            stock=10
+        )
+    
+    def search(self, query):
+        response = self.client.get('/api/products/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.data['results']]
+    
+    def test_search_ranks_name_matches_first(self):
+        """Test a name match outranks a description match"""
+        self.assertEqual(self.search('laptop'), ['Gaming Laptop', 'Wireless Mouse'])
+    
+    def test_search_matches_prefixes_and_typos(self):
+        """Test partial words and misspellings still find products"""
+        self.assertEqual(self.search('mech key'), ['Mechanical Keyboard'])
+        self.assertEqual(self.search('keybaord'), ['Mechanical Keyboard'])
+    
+    def test_index_follows_saves_and_deletes(self):
+        """Test the index is kept in sync on product writes"""
+        self.mouse.name = 'Trackball'
+        self.mouse.description = 'Ergonomic'
+        self.mouse.save()
+        self.assertEqual(self.search('wireless'), [])
+        self.assertEqual(self.search('trackball'), ['Trackball'])
+        
+        self.keyboard.delete()
+        self.assertEqual(self.search('acme'), ['Gaming Laptop'])
+    
+    def test_rebuild_search_index(self):
+        """Test the rebuild command restores a cleared index"""
+        get_backend().clear()
+        self.assertEqual(self.search('laptop'), [])
+        call_command('rebuild_search_index', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.search('laptop'), ['Gaming Laptop', 'Wireless Mouse'])
+    
+    def test_search_index_migration_indexes_existing_products(self):
+        """Test the migration creating the index also fills it"""
+        migration = import_module('products.migrations.0005_product_search_index')
+        get_backend().clear()
+        migration.populate_search_index(apps, SimpleNamespace(connection=connection), batch_size=2)
+        self.assertEqual(self.search('laptop'), ['Gaming Laptop', 'Wireless Mouse'])
+        self.assertCountEqual(self.search('acme'), ['Gaming Laptop', 'Mechanical Keyboard'])
+    
+    @override_settings(PRODUCT_SEARCH_LIMIT=1)
+    def test_inactive_matches_do_not_take_result_slots(self):
+        """Test the ranked query skips inactive products before applying its limit"""
+        hidden = self.create_product('Laptop Laptop', 'Acme', 'Laptop', 'LL-1')
+        hidden.is_active = False
+        hidden.save()
+        self.assertEqual(self.search('laptop'), ['Gaming Laptop'])
+    
+    def test_database_backend_matches_descriptions(self):
+        """Test the unindexed fallback also searches descriptions"""
+        backend = DatabaseSearchBackend()
+        self.assertEqual(backend.search('switches'), [self.keyboard.pk])
+        self.keyboard.is_active = False
+        self.keyboard.save()
+        self.assertEqual(backend.search('switches'), [])
+        self.assertEqual(backend.search('switches', active_only=False), [self.keyboard.pk])
+    
+    def test_search_signal_is_sent_by_the_list_view_only(self):
+        """Test filtering has no side effects and a listed search is reported once"""
+        received = []
+        
+        def receiver(query, results_count, **kwargs):
+            received.append((query, results_count))
+        
+        product_searched.connect(receiver)
+        self.addCleanup(product_searched.disconnect, receiver)
+        
+        request = Request(APIRequestFactory().get('/api/products/', {'search': 'laptop'}))
+        view = ProductViewSet(request=request, action='list')
+        ProductSearchFilter().filter_queryset(request, Product.objects.all(), view)
+        self.assertEqual(received, [])
+        
+        self.search('laptop')
+        self.client.get('/api/products/', {'search': 'laptop', 'page': 2})
+        self.assertEqual(received, [('laptop', 2)])
+
+
+class CategoryTreeTest(TestCase):
+    def setUp(self):
+        self.electronics = Category.objects.create(name='Electronics', slug='electronics')
+        self.computers = Category.objects.create(name='Computers', slug='computers', parent=self.electronics)
+        self.laptops = Category.objects.create(name='Laptops', slug='laptops', parent=self.computers)
+        self.clothing = Category.objects.create(name='Clothing', slug='clothing')
+        self.client = APIClient()
+    
+    def refresh(self, category):
+        return Category.objects.get(pk=category.pk)
+    
+    def test_path_and_depth_maintained_on_save(self):
+        """Test paths nest and moving a category re-roots its subtree"""
+        self.assertEqual(self.laptops.depth, 2)
+        self.assertTrue(self.laptops.path.startswith(self.electronics.path + self.computers.id.hex))
+        self.assertEqual(
+            set(self.electronics.get_descendants()),
+            {self.electronics, self.computers, self.laptops}
+        )
+        
+        self.computers.parent = self.clothing
+        self.computers.save()
+        laptops = self.refresh(self.laptops)
+        self.assertTrue(laptops.path.startswith(self.clothing.path))
+        self.assertEqual(laptops.depth, 2)
+        self.assertEqual(list(self.electronics.get_descendants(include_self=False)), [])
+    
+    def test_cannot_move_under_own_subtree(self):
+        """Test the API rejects cycles"""
+        admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pass123')
+        self.client.force_authenticate(admin)
+        response = self.client.patch(
+            '/api/categories/electronics/', {'parent': str(self.laptops.id)}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+    
+    def test_resaving_subcategory_keeps_its_path(self):
+        """Test a subcategory saved again under the same parent is not a cycle"""
+        laptops = self.refresh(self.laptops)
+        path = laptops.path
+        laptops.description = 'Portable computers'
+        laptops.save()
+        self.assertEqual(self.refresh(self.laptops).path, path)
+        
+        admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pass123')
+        self.client.force_authenticate(admin)
+        response = self.client.patch('/api/categories/computers/', {'description': 'PCs'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(self.computers).description, 'PCs')
+    
+    def test_tree_endpoint_uses_one_query(self):
+        """Test the whole hierarchy is built from a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/categories/tree/')
+        self.assertEqual([node['slug'] for node in response.data], ['clothing', 'electronics'])
+        computers = response.data[1]['children'][0]
+        self.assertEqual(computers['children'][0]['slug'], 'laptops')
+    
+    def test_product_filter_includes_subcategories(self):
+        """Test filtering by a category matches products in its subtree"""
+        seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        Product.objects.create(
+            seller=seller, category=self.laptops, name='Laptop', description='Portable',
+            price=999, stock=1, sku='LAP001'
+        )
+        response = self.client.get('/api/products/', {'category': 'electronics'})
+        self.assertEqual([p['name'] for p in response.data['results']], ['Laptop'])
+        response = self.client.get('/api/products/', {'category': 'clothing'})
+        self.assertEqual(response.data['results'], [])
+
+
+class ProductDetailCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            password='pass123'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=self.seller,
+            category=self.category,
+            name='Laptop',
+            slug='laptop',
+            description='A great laptop',
+            price=999.99,
+            stock=10,
+            sku='LAP001'
+        )
+        self.client = APIClient()
+    
+    def get(self, **headers):
+        return self.client.get('/api/products/laptop/', headers=headers)
+    
+    def test_cached_detail_and_not_modified(self):
+        """Test repeat hits skip serializers and a matching ETag returns 304"""
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        
+        with self.assertNumQueries(1):
+            cached = self.get()
+        self.assertEqual(cached.data, first.data)
+        
+        with self.assertNumQueries(1):
+            response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_related_writes_bump_version(self):
+        """Test product, image, review and category writes invalidate the cache"""
+        etag = self.get()['ETag']
+        
+        ProductImage.objects.create(product=self.product, image_url='https://example.com/a.jpg')
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['images']), 1)
+        
+        ProductReview.objects.create(
+            product=self.product, user=self.buyer, rating=4, title='Good', comment='Solid'
+        )
+        self.assertEqual(len(self.get().data['reviews']), 1)
+        
+        Category.objects.create(name='Laptops', slug='laptops', parent=self.category)
+        self.assertEqual(self.get().data['category']['children'][0]['slug'], 'laptops')
+        
+        self.product.price = 899
+        self.product.save()
+        self.assertEqual(self.get().data['price'], '899.00')
+    
+    def test_update_is_one_query_and_version_loads_on_demand(self):
+        """Test saving an existing product neither reallocates its slug nor reloads its version"""
+        self.product.name = 'Laptop Pro'
+        with CaptureQueriesContext(connection) as ctx:
+            self.product.save()
+        # One UPDATE; the other statements keep the search index in sync
+        statements = [q['sql'] for q in ctx.captured_queries if 'products_fts' not in q['sql']]
+        self.assertEqual([sql.split()[0] for sql in statements], ['UPDATE'])
+        self.assertEqual(self.product.slug, 'laptop')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.product.detail_version, 2)
+        self.product.save()
+        self.assertEqual(self.product.detail_version, 3)
+    
+    def test_moving_category_invalidates_old_and_new_branch(self):
+        """Test moving a subcategory refreshes products under both parents"""
+        laptops = Category.objects.create(name='Laptops', slug='laptops', parent=self.category)
+        clothing = Category.objects.create(name='Clothing', slug='clothing')
+        Product.objects.create(
+            seller=self.seller, category=clothing, name='Shirt', slug='shirt',
+            description='Cotton', price=20, stock=5, sku='SHI001'
+        )
+        self.assertEqual(len(self.get().data['category']['children']), 1)
+        self.assertEqual(self.client.get('/api/products/shirt/').data['category']['children'], [])
+        
+        laptops.parent = clothing
+        laptops.save()
+        self.assertEqual(self.get().data['category']['children'], [])
+        shirt = self.client.get('/api/products/shirt/').data
+        self.assertEqual([child['slug'] for child in shirt['category']['children']], ['laptops'])
+
+
+class ReviewFeedTest(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=seller,
+            category=category,
+            name='Laptop',
+            slug='laptop',
+            description='A great laptop',
+            price=999.99,
+            stock=10,
+            sku='LAP001'
+        )
+        users = User.objects.bulk_create([
+            User(email=f'buyer{i}@example.com', username=f'buyer{i}') for i in range(25)
+        ])
+        ProductReview.objects.bulk_create([
+            ProductReview(
+                product=self.product, user=user, rating=i % 5 + 1, title=f'Review {i}', comment='Text'
+            )
+            for i, user in enumerate(users)
+        ])
+        recompute_product_ratings([self.product.id])
+        self.client = APIClient()
+    
+    def test_detail_embeds_top_reviews_and_histogram(self):
+        """Test detail carries a few reviews plus the precomputed histogram"""
+        response = self.client.get('/api/products/laptop/')
+        self.assertEqual(len(response.data['reviews']), 5)
+        summary = response.data['rating_summary']
+        self.assertEqual(summary['review_count'], 25)
+        self.assertEqual(summary['histogram'], {str(star): 5 for star in range(1, 6)})
+        self.assertEqual(summary['average_rating'], 3.0)
+    
+    def test_review_feed_is_cursor_paginated(self):
+        """Test the feed pages through every review with constant queries"""
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get('/api/products/laptop/reviews/')
+        self.assertEqual(len(first.data['results']), 20)
+        self.assertEqual(first.data['summary']['review_count'], 25)
+        # Product lookup and one page query with users joined
+        self.assertEqual(len(ctx.captured_queries), 2)
+        
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 5)
+        titles = {review['title'] for review in first.data['results'] + second.data['results']}
+        self.assertEqual(len(titles), 25)
+
+
+class RatingAggregationTest(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.buyers = [
+            User.objects.create_user(email=f'buyer{i}@example.com', username=f'buyer{i}', password='pass123')
+            for i in range(3)
+        ]
+        self.product = Product.objects.create(
+            seller=seller,
+            name='Laptop',
+            slug='laptop',
+            description='A great laptop',
+            price=999.99,
+            stock=10,
+            sku='LAP001'
+        )
+        self.client = APIClient()
+    
+    def summary(self):
+        product = Product.objects.get(pk=self.product.pk)
+        return (product.review_count, product.rating_sum, product.average_rating,
+                [product.rating_1, product.rating_2, product.rating_3, product.rating_4, product.rating_5])
+    
+    def test_every_write_path_updates_incrementally(self):
+        """Test add_review, the review API and direct saves keep the summary exact"""
+        self.client.force_authenticate(self.buyers[0])
+        response = self.client.post(
+            '/api/products/laptop/add_review/', {'rating': 5, 'title': 'Great', 'comment': 'Fast'}
+        )
+        self.assertEqual(response.status_code, 201)
+        
+        self.client.force_authenticate(self.buyers[1])
+        response = self.client.post('/api/reviews/', {
+            'product': str(self.product.id), 'rating': 2, 'title': 'Meh', 'comment': 'Slow'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.summary(), (2, 7, Decimal('3.50'), [0, 1, 0, 0, 1]))
+        
+        review = ProductReview.objects.get(user=self.buyers[1])
+        self.client.patch(f'/api/reviews/{review.id}/', {'rating': 4})
+        self.assertEqual(self.summary(), (2, 9, Decimal('4.50'), [0, 0, 0, 1, 1]))
+        
+        review.delete()
+        ProductReview.objects.get(user=self.buyers[0]).delete()
+        self.assertEqual(self.summary(), (0, 0, Decimal('0.00'), [0, 0, 0, 0, 0]))
+    
+    def test_reconcile_repairs_drift(self):
+        """Test the reconciliation command rebuilds drifted summaries"""
+        ProductReview.objects.bulk_create([
+            ProductReview(product=self.product, user=buyer, rating=3, title='Ok', comment='Fine')
+            for buyer in self.buyers
+        ])
+        self.assertEqual(self.summary()[0], 0)
+        
+        call_command('reconcile_product_ratings', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.summary(), (3, 9, Decimal('3.00'), [0, 0, 3, 0, 0]))
+    
+    def test_rating_sum_migration_recomputes_stale_summaries(self):
+        """Test the migration replaces legacy counts and averages rather than trusting them"""
+        ProductReview.objects.bulk_create([
+            ProductReview(product=self.product, user=buyer, rating=rating, title='Ok', comment='Fine')
+            for buyer, rating in zip(self.buyers, [5, 5, 2], strict=True)
+        ])
+        Product.objects.filter(pk=self.product.pk).update(review_count=0, average_rating=Decimal('4.90'))
+        
+        migration = import_module('products.migrations.0009_product_rating_sum')
+        migration.populate_rating_summaries(apps, None)
+        self.assertEqual(self.summary(), (3, 12, Decimal('4.00'), [0, 1, 0, 0, 2]))
+
+
+class ProductIdentifierTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+    
+    def create(self, name='USB Cable', **fields):
+        return Product.objects.create(
+            seller=self.seller, category=self.category, name=name, price=5, stock=1, **fields
+        )
+    
+    def test_same_name_gets_next_suffix(self):
+        """Test identical names get increasing suffixes and fresh SKUs"""
+        products = [self.create() for _ in range(4)]
+        self.assertEqual([p.slug for p in products], ['usb-cable', 'usb-cable-1', 'usb-cable-2', 'usb-cable-3'])
+        self.assertEqual(len({p.sku for p in products}), 4)
+        self.assertTrue(all(p.sku.startswith('PRD-') for p in products))
+        self.assertEqual(self.create('USB Cable Pro').slug, 'usb-cable-pro')
+    
+    def test_slug_allocation_cost_is_constant(self):
+        """Test slug generation takes two queries however many duplicates exist"""
+        for i in range(30):
+            self.create(slug=f'usb-cable-{i + 1}', sku=f'USB{i}')
+        self.create(slug='usb-cable-extra', sku='USB-EXTRA')
+        # The bare slug is free; the first collision seeds the sequence past existing suffixes
+        self.assertEqual(self.create().slug, 'usb-cable')
+        self.assertEqual(self.create().slug, 'usb-cable-31')
+        with CaptureQueriesContext(connection) as ctx:
+            slug = Product(name='USB Cable').generate_unique_slug()
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(slug, 'usb-cable-32')
+    
+    def test_unique_name_takes_one_query_per_identifier(self):
+        """Test a new name gets its bare slug from one lookup and stores no sequence"""
+        Product.allocate_skus(1)
+        with CaptureQueriesContext(connection) as ctx:
+            slug = Product(name='Desk Lamp').generate_unique_slug()
+            Product.generate_sku()
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(slug, 'desk-lamp')
+        self.assertFalse(IdentifierSequence.objects.filter(name__startswith='slug:').exists())
+    
+    def test_hand_picked_slug_does_not_break_allocation(self):
+        """Test a generated slug colliding with a manual one is allocated again"""
+        self.assertEqual(self.create().slug, 'usb-cable')
+        self.create(slug='usb-cable-1', sku='MANUAL-1')
+        self.assertEqual(self.create().slug, 'usb-cable-2')
+    
+    def test_updating_keeps_sku(self):
+        """Test clearing the slug on update regenerates it and keeps the SKU"""
+        product = self.create()
+        sku = product.sku
+        product.slug = ''
+        product.save()
+        self.assertEqual(product.slug, 'usb-cable-1')
+        self.assertEqual(product.sku, sku)
+    
+    def test_bulk_allocation(self):
+        """Test block allocation for imports matches one-by-one allocation"""
+        self.create()
+        slugs = Product.allocate_slugs(['USB Cable', 'Mouse', 'USB Cable', 'Mouse'])
+        self.assertEqual(slugs, ['usb-cable-1', 'mouse', 'usb-cable-2', 'mouse-1'])
+        
+        skus = Product.allocate_skus(3)
+        self.assertEqual(len(set(skus)), 3)
+        self.assertNotIn(self.create().sku, skus)
+        self.assertEqual(IdentifierSequence.objects.get(name='sku').next_value, 6)
+
+
+class ProductImportTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.other_seller = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='pass123',
+            role='seller'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+    
+    def upload(self, name, content, **data):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return self.client.post(
+            '/api/products/import/',
+            {'file': SimpleUploadedFile(name, content.encode()), **data},
+            format='multipart'
+        )
+    
+    def test_csv_import_creates_products_and_reports_bad_rows(self):
+        """Test CSV rows are created with allocated identifiers and errors keep line numbers"""
+        response = self.upload('catalog.csv', (
+            'name,description,price,stock,category,tags\n'
+            'USB Cable,Braided,9.99,10,electronics,"usb,cable"\n'
+            'USB Cable,Short,4.99,5,electronics,\n'
+            'Broken,Bad price,-1,5,electronics,\n'
+            'Mystery,Nowhere,5,5,no-such-category,\n'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (2, 0, 2))
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        
+        products = Product.objects.filter(seller=self.seller).order_by('slug')
+        self.assertEqual([p.slug for p in products], ['usb-cable', 'usb-cable-1'])
+        self.assertTrue(all(p.sku.startswith('PRD-') for p in products))
+        self.assertEqual(products[0].tags, ['usb', 'cable'])
+        self.assertEqual(set(get_backend().search('braided')), {products[0].id})
+    
+    def test_jsonl_import_upserts_by_sku(self):
+        """Test existing SKUs are updated in place and conflicting rows rejected"""
+        product = Product.objects.create(
+            seller=self.seller, category=self.category, name='Mouse', description='Wired',
+            price=20, stock=3, sku='MOUSE-1'
+        )
+        Product.objects.create(
+            seller=self.other_seller, category=self.category, name='Keyboard', description='Loud',
+            price=50, stock=3, sku='KEY-1'
+        )
+        version = product.detail_version
+        rows = [
+            {'sku': 'MOUSE-1', 'price': '18.50', 'stock': 7},
+            {'sku': 'KEY-1', 'price': '1.00'},
+            {'sku': 'PAD-1', 'name': 'Mouse Pad', 'description': 'Cloth', 'price': '5', 'category': str(self.category.id)},
+            {'sku': 'PAD-1', 'name': 'Mouse Pad copy', 'description': 'Cloth', 'price': '5', 'category': 'electronics'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        response = self.upload('catalog.jsonl', content)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 3))
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 4, 5])
+        
+        product.refresh_from_db()
+        self.assertEqual((product.price, product.stock, product.name), (Decimal('18.50'), 7, 'Mouse'))
+        self.assertEqual(product.detail_version, version + 1)
+        self.assertEqual(Product.objects.get(sku='KEY-1').price, Decimal('50.00'))
+        self.assertEqual(Product.objects.get(sku='PAD-1').slug, 'mouse-pad')
+    
+    def test_query_count_does_not_grow_with_rows(self):
+        """Test a chunk costs a fixed number of queries however many rows it has"""
+        def run(count, offset):
+            content = 'name,description,price,category\n' + ''.join(
+                f'Item {offset + i},Text,5,electronics\n' for i in range(count)
+            )
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.upload('catalog.csv', content)
+            self.assertEqual(response.data['created'], count)
+            # SQLite's parameter limit splits the INSERT itself by row count
+            return len([q for q in ctx.captured_queries if not q['sql'].startswith('INSERT INTO "products"')])
+        
+        Product.allocate_skus(1)
+        # Categories, slugs, SKUs, slug conflicts, savepoint, search index (2), release;
+        # new names get their bare slugs from one lookup for the whole chunk
+        self.assertEqual(run(10, 0), 8)
+        self.assertEqual(run(100, 1000), 8)
+        self.assertFalse(IdentifierSequence.objects.filter(name__startswith='slug:').exists())
+        names = 'name,description,price,category\n' + 'Same,Text,5,electronics\n' * 100
+        with CaptureQueriesContext(connection) as ctx:
+            self.upload('catalog.csv', names)
+        self.assertLess(len(ctx.captured_queries), 20)
+    
+    def test_generated_slug_avoids_slug_picked_in_same_chunk(self):
+        """Test a generated bare slug yields to a row that picked it by hand"""
+        content = 'name,slug,description,price,category\nLamp,,Warm,30,electronics\nOther,lamp,Cold,20,electronics\n'
+        response = self.upload('catalog.csv', content)
+        self.assertEqual((response.data['created'], response.data['errors']), (2, []))
+        self.assertEqual(
+            dict(Product.objects.values_list('name', 'slug')), {'Lamp': 'lamp-1', 'Other': 'lamp'}
+        )
+    
+    def test_command_imports_file_and_writes_error_report(self):
+        """Test the management command streams a file and writes rejected rows"""
+        with tempfile.TemporaryDirectory() as directory:
+            catalog = os.path.join(directory, 'catalog.csv')
+            report = os.path.join(directory, 'errors.jsonl')
+            with open(catalog, 'w') as f:
+                f.write('name,description,price,sku,category\nLamp,Warm,30,LAMP-1,electronics\nLamp,Cold,,LAMP-2,electronics\n')
+            call_command(
+                'import_products', catalog, seller='seller@example.com', errors=report,
+                stdout=open(os.devnull, 'w')
+            )
+            with open(report) as f:
+                errors = [json.loads(line) for line in f]
+        self.assertEqual([error['line'] for error in errors], [3])
+        self.assertTrue(Product.objects.filter(sku='LAMP-1', seller=self.seller).exists())
+
+
+class ProductAutocompleteTest(TestCase):
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password='pass123', role='seller'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        for name, brand in [('Gaming Laptop', 'Acme'), ('Laptop Stand', 'Lapco'), ('Lamp', 'Acme')]:
+            self.create_product(name, brand)
+        SearchQueryDaily.objects.create(query='laptop', date=timezone.now().date(), searches=40)
+        SearchQueryDaily.objects.create(query='lapdesk', date=timezone.now().date(), searches=9, zero_results=9)
+        # Too rare to suggest
+        SearchQueryDaily.objects.create(query='lapis lazuli', date=timezone.now().date(), searches=2)
+        self.client = APIClient()
+        
+    def create_product(self, name, brand, **fields):
+        return Product.objects.create(
+            seller=self.seller, category=self.category, name=name, brand=brand,
+            description='Text', price=10, stock=5, **fields
+        )
+        
+    def complete(self, prefix):
+        response = self.client.get('/api/products/autocomplete/', {'q': prefix})
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['text']) for row in response.data]
+        
+    def test_suggests_queries_brands_then_names(self):
+        """Test suggestions rank popular queries, then brands, then product names"""
+        self.assertEqual(
+            self.complete(' LAP'),
+            [('query', 'laptop'), ('brand', 'Lapco'), ('product', 'Laptop Stand')]
+        )
+        self.assertEqual(self.complete('ac'), [('brand', 'Acme')])
+        self.assertEqual(self.complete(''), [])
+        
+    def test_lookups_are_served_from_memory(self):
+        """Test a built index answers without queries"""
+        self.complete('la')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.complete('gam'), [('product', 'Gaming Laptop')])
+        self.assertEqual(len(ctx.captured_queries), 0)
+        
+    def test_index_follows_product_changes(self):
+        """Test saves, deactivations and deletes update a built index"""
+        self.complete('la')
+        mic = self.create_product('Lapel Mic', 'Rode')
+        self.assertIn(('product', 'Lapel Mic'), self.complete('lape'))
+        self.assertEqual(self.complete('ro'), [('brand', 'Rode')])
+        
+        mic.name = 'Clip Mic'
+        mic.save()
+        self.assertEqual(self.complete('lape'), [])
+        mic.is_active = False
+        mic.save()
+        self.assertEqual(self.complete('clip'), [])
+        
+        Product.objects.get(name='Laptop Stand').delete()
+        self.assertEqual(self.complete('lapc'), [])
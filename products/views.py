@@ -2,11 +2,17 @@ from rest_framework import viewsets, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Q, Avg
+from rest_framework.pagination import CursorPagination
+from django.conf import settings
+from django.db.models import Q, Case, IntegerField, Prefetch, When
 from django.core.files.storage import default_storage
+from . import autocomplete, detail_cache, imports
 from .models import Category, Product, ProductImage, ProductReview
+from .ratings import rating_summary
+from .search import get_backend, product_searched
 from .serializers import (
     CategorySerializer,
+    category_children_map,
     ProductListSerializer,
     ProductDetailSerializer,
     ProductCreateUpdateSerializer,
@@ -25,16 +31,97 @@ class CategoryViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            # Nested children for every listed category from one query
+            context['category_children'] = category_children_map(Category.objects.all())
+        return context
+    
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """Whole category hierarchy, built in memory from one query."""
+        children_map = category_children_map(Category.objects.all())
+        serializer = CategorySerializer(
+            children_map.get(None, []),
+            many=True,
+            context={**self.get_serializer_context(), 'category_children': children_map}
+        )
+        return Response(serializer.data)
+
+
+# Columns ProductListSerializer renders; description, technical_specs and
+# refund_policy stay unloaded on listings
+PRODUCT_LIST_FIELDS = (
+    'id', 'name', 'slug', 'price', 'stock', 'image_url', 'thumbnail_url',
+    'is_featured', 'is_active', 'deletion_requested', 'deletion_requested_at',
+    'average_rating', 'review_count', 'created_at',
+    'category__name', 'seller__username',
+)
+
+
+def product_list_queryset(queryset=None):
+    """Products loaded with only what a listing page renders."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.select_related('category', 'seller').only(*PRODUCT_LIST_FIELDS)
+
+
+def product_detail_queryset(queryset=None):
+    """Products with their images and only the newest reviews the detail view renders."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    review_count = getattr(settings, 'PRODUCT_DETAIL_REVIEW_COUNT', 5)
+    return queryset.select_related('category', 'seller').prefetch_related(
+        'images',
+        Prefetch(
+            'reviews',
+            queryset=ProductReview.objects.select_related('user').order_by('-created_at', '-id')[:review_count],
+            to_attr='top_reviews',
+        ),
+    )
+
+
+class ReviewCursorPagination(CursorPagination):
+    """Stable newest-first review feed that stays fast deep into the history."""
+    
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the product search index.
+
+    Results keep the backend's relevance order unless ``?ordering=`` is given.
+    The backend leaves inactive products out unless the view lists them.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        
+        limit = getattr(settings, 'PRODUCT_SEARCH_LIMIT', 500)
+        include_inactive = getattr(view, 'include_inactive', lambda: False)()
+        product_ids = get_backend().search(query, limit=limit, active_only=not include_inactive)
+        if not product_ids:
+            return queryset.none()
+        relevance = Case(
+            *[When(id=product_id, then=position) for position, product_id in enumerate(product_ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(id__in=product_ids).order_by(relevance)
 
 
 class ProductViewSet(viewsets.ModelViewSet):
     """ViewSet for Product operations."""
     
-    queryset = Product.objects.select_related('category', 'seller').prefetch_related('images', 'reviews')
+    queryset = Product.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description', 'sku', 'brand']
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter]
     ordering_fields = ['price', 'created_at', 'name']
     
     def get_serializer_class(self):
@@ -46,11 +133,21 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = product_list_queryset(queryset)
+        elif self.action == 'retrieve':
+            queryset = product_detail_queryset(queryset)
+        else:
+            queryset = queryset.select_related('category', 'seller')
         
-        # Filter by category
+        # Filter by category and its subcategories
         category = self.request.query_params.get('category', None)
         if category:
-            queryset = queryset.filter(category__slug=category)
+            # Include every subcategory via one range scan on the path index
+            path = Category.objects.filter(slug=category).values_list('path', flat=True).first()
+            if path is None:
+                return queryset.none()
+            queryset = queryset.filter(**Category.subtree_filter(path))
         
         # Filter by seller
         seller = self.request.query_params.get('seller', None)
@@ -83,18 +180,61 @@ class ProductViewSet(viewsets.ModelViewSet):
         if featured == 'true':
             queryset = queryset.filter(is_featured=True)
         
-        # Only show active products to users, EXCEPT:
-        # 1. When a seller is viewing their own products (for product management page)
-        # 2. When performing update/delete operations (to allow modifying inactive products)
+        if not self.include_inactive():
+            queryset = queryset.filter(is_active=True)
+        
+        return queryset
+    
+    def include_inactive(self):
+        """
+        Only show active products to users, EXCEPT:
+        1. When a seller is viewing their own products (for product management page)
+        2. When performing update/delete operations (to allow modifying inactive products)
+        """
         seller_id = self.request.query_params.get('seller', None)
         viewing_own_products = (seller_id and self.request.user.is_authenticated and 
                                  str(seller_id) == str(self.request.user.id))
         is_update_action = self.action in ['update', 'partial_update', 'destroy']
+        return bool(viewing_own_products or is_update_action)
+    
+    def list(self, request, *args, **kwargs):
+        """List products; a search of the first page sends ``product_searched``."""
+        response = super().list(request, *args, **kwargs)
+        query = request.query_params.get(ProductSearchFilter.search_param, '').strip()
+        if query and request.query_params.get('page', '1') == '1':
+            session = getattr(request, 'session', None)
+            product_searched.send(
+                sender=self.__class__,
+                query=query,
+                results_count=response.data['count'] if 'count' in response.data else len(response.data),
+                user=request.user,
+                session_id=getattr(session, 'session_key', None) or '',
+                ip_address=request.META.get('REMOTE_ADDR'),
+            )
+        return response
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Product detail served from a cache keyed by slug and version.
         
-        if not (viewing_own_products or is_update_action):
-            queryset = queryset.filter(is_active=True)
+        A matching If-None-Match returns 304 after one indexed lookup,
+        without loading relations or running serializers.
+        """
+        slug = kwargs[self.lookup_field]
+        current = self.get_queryset().filter(slug=slug).values('id', 'detail_version').first()
+        if current is None:
+            return super().retrieve(request, *args, **kwargs)
         
-        return queryset
+        version = current['detail_version']
+        etag = detail_cache.etag(current['id'], version)
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        data = detail_cache.get_cached(slug, current['id'], version)
+        if data is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            detail_cache.store(slug, current['id'], version, data)
+        return Response(data, headers={'ETag': etag})
     
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
@@ -127,9 +267,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def add_review(self, request, slug=None):
-        """Add a review to a product."""
+        """Add a review to a product; its rating summary is updated incrementally."""
         product = self.get_object()
-        serializer = ProductReviewSerializer(data=request.data)
+        # The product comes from the URL, so clients need not repeat it
+        data = request.data.copy()
+        data['product'] = product.pk
+        serializer = ProductReviewSerializer(data=data)
         if serializer.is_valid():
             serializer.save(user=request.user, product=product)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -137,11 +280,53 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def reviews(self, request, slug=None):
-        """Get all reviews for a product."""
+        """Cursor-paginated reviews for a product, with its rating summary."""
         product = self.get_object()
-        reviews = product.reviews.all()
-        serializer = ProductReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        paginator = ReviewCursorPagination()
+        page = paginator.paginate_queryset(product.reviews.select_related('user'), request, view=self)
+        response = paginator.get_paginated_response(ProductReviewSerializer(page, many=True).data)
+        response.data['summary'] = rating_summary(product)
+        return response
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def autocomplete(self, request):
+        """
+        Suggestions for the search box from the in-memory prefix index:
+        popular queries, brands and product names starting with ``?q=``.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 20)
+        except ValueError:
+            return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(autocomplete.complete(request.query_params.get('q', ''), limit))
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAuthenticated], parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """
+        Create or update the seller's products from a CSV or JSONL upload.
+        
+        Rows are matched by SKU and streamed in chunks; the response
+        reports created and updated counts and the errors of rejected rows.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = request.data.get('file_format') or imports.detect_format(upload.name)
+        if file_format not in imports.FORMATS:
+            return Response({'error': 'Unsupported file format; use csv or jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = imports.import_products(
+                upload,
+                request.user,
+                file_format,
+                dry_run=request.data.get('dry_run') in ('1', 'true', 'True'),
+                max_errors=getattr(settings, 'PRODUCT_IMPORT_MAX_ERRORS', 1000),
+            )
+        except UnicodeDecodeError:
+            return Response({'error': 'File must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict())
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated], parser_classes=[MultiPartParser, FormParser])
     def upload_image(self, request):
@@ -189,26 +374,6 @@ class ProductReviewViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(product__id=product_id)
         return queryset
     
+    # Product rating summaries follow review writes through products.ratings
     def perform_create(self, serializer):
-        review = serializer.save(user=self.request.user)
-        self.update_product_ratings(review.product)
-    
-    def perform_update(self, serializer):
-        review = serializer.save()
-        self.update_product_ratings(review.product)
-    
-    def perform_destroy(self, instance):
-        product = instance.product
-        instance.delete()
-        self.update_product_ratings(product)
-    
-    def update_product_ratings(self, product):
-        """Update product's average rating and review count."""
-        reviews = ProductReview.objects.filter(product=product)
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-        review_count = reviews.count()
-        
-        Product.objects.filter(id=product.id).update(
-            average_rating=round(avg_rating, 2),
-            review_count=review_count
-        )
+        serializer.save(user=self.request.user)
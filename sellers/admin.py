@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import SellerProfile, SellerPayout
+from .models import SellerProfile, SellerPayout, SellerDailyStats, SellerBalance, SellerLedgerEntry
+from .metrics import order_summary, payout_summary, product_summary
 
 
 @admin.register(SellerProfile)
@@ -7,7 +8,7 @@ class SellerProfileAdmin(admin.ModelAdmin):
     list_display = ['business_name', 'user', 'is_verified', 'is_active', 'average_rating', 'created_at']
     list_filter = ['is_verified', 'is_active', 'created_at']
     search_fields = ['business_name', 'user__email', 'business_email']
-    readonly_fields = ['average_rating', 'total_reviews', 'created_at', 'updated_at', 'verified_at']
+    readonly_fields = ['average_rating', 'total_reviews', 'sales_overview', 'created_at', 'updated_at', 'verified_at']
     
     fieldsets = (
         ('User', {
@@ -32,10 +33,28 @@ class SellerProfileAdmin(admin.ModelAdmin):
         ('Ratings', {
             'fields': ('average_rating', 'total_reviews')
         }),
+        ('Sales', {
+            'fields': ('sales_overview',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    @admin.display(description='Sales overview')
+    def sales_overview(self, obj):
+        """Lifetime seller metrics from the shared aggregation layer."""
+        if not obj.pk:
+            return '-'
+        products = product_summary(obj.user_id)
+        orders = order_summary(obj.user_id)
+        payouts = payout_summary(obj.user_id)
+        return (
+            f"{products['active_products']}/{products['total_products']} active products, "
+            f"${orders['lifetime_revenue']} revenue "
+            f"(${orders['lifetime_refunded']} refunded), "
+            f"${payouts['completed']} paid out, ${payouts['pending']} pending"
+        )
 
 
 @admin.register(SellerPayout)
@@ -44,3 +63,34 @@ class SellerPayoutAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['seller__email', 'transaction_id']
     readonly_fields = ['created_at', 'processed_at']
+
+
+@admin.register(SellerDailyStats)
+class SellerDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'date', 'total_orders', 'revenue', 'units_sold', 'customers']
+    list_filter = ['date']
+    search_fields = ['seller__email']
+    readonly_fields = ['updated_at']
+    date_hierarchy = 'date'
+
+
+@admin.register(SellerBalance)
+class SellerBalanceAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'balance', 'updated_at']
+    search_fields = ['seller__email']
+    readonly_fields = ['seller', 'balance', 'updated_at']
+
+
+@admin.register(SellerLedgerEntry)
+class SellerLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'entry_type', 'amount', 'balance_after', 'created_at']
+    list_filter = ['entry_type', 'created_at']
+    search_fields = ['seller__email', 'description']
+    readonly_fields = ['seller', 'entry_type', 'amount', 'balance_after', 'order_item',
+                       'payout', 'description', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SellersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sellers'
+    
+    def ready(self):
+        """Register signal handlers that maintain the dashboard rollups."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,211 @@
+"""
+Append-only seller ledger with a materialized running balance.
+
+Sales credit the seller, refunds and payouts debit them. Every posting
+locks the sellers' ``SellerBalance`` rows, appends the entries and moves the
+balances in the same transaction, so reading the available balance is a
+single-row lookup and concurrent payouts cannot overdraw it. A checkout
+posts for all of its sellers with a fixed number of queries.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SellerBalance, SellerLedgerEntry, SellerPayout
+
+
+class InsufficientBalanceError(ValueError):
+    """Raised when a debit would take a seller's balance below zero."""
+
+    def __init__(self, available):
+        self.available = available
+        super().__init__(f'Requested amount exceeds available balance of ${available:.2f}.')
+
+
+def get_balance(seller):
+    """Return the seller's available balance without touching the ledger."""
+    return SellerBalance.objects.filter(seller=seller).values_list(
+        'balance', flat=True
+    ).first() or Decimal('0.00')
+
+
+def _lock_balances(seller_ids):
+    """Lock the sellers' balance rows, creating missing ones; returns them by seller id."""
+    seller_ids = set(seller_ids)
+    # Always lock in seller order so concurrent multi-seller postings cannot deadlock
+    locked = SellerBalance.objects.select_for_update().order_by('seller_id')
+    balances = {balance.seller_id: balance for balance in locked.filter(seller_id__in=seller_ids)}
+    missing = seller_ids - balances.keys()
+    if missing:
+        SellerBalance.objects.bulk_create(
+            [SellerBalance(seller_id=seller_id) for seller_id in missing], ignore_conflicts=True
+        )
+        balances.update(
+            (balance.seller_id, balance) for balance in locked.filter(seller_id__in=missing)
+        )
+    return balances
+
+
+def _lock_balance(seller_id):
+    return _lock_balances([seller_id])[seller_id]
+
+
+def post_seller_entries(entries_by_seller, allow_negative=True):
+    """
+    Append unsaved ``SellerLedgerEntry`` objects for any number of sellers
+    with one query each to lock the balances, insert the entries and move
+    the balances; returns the balances by seller id.
+
+    Raises ``InsufficientBalanceError`` without writing anything when
+    ``allow_negative`` is false and the postings would overdraw a balance.
+    """
+    with transaction.atomic():
+        balances = _lock_balances(entries_by_seller)
+        posted = []
+        for seller_id, entries in entries_by_seller.items():
+            balance = balances[seller_id]
+            running = balance.balance
+            if not allow_negative and running + sum(entry.amount for entry in entries) < 0:
+                raise InsufficientBalanceError(running)
+
+            for entry in entries:
+                running += entry.amount
+                entry.seller_id = seller_id
+                entry.balance_after = running
+            balance.balance = running
+            posted.extend(entries)
+        SellerLedgerEntry.objects.bulk_create(posted)
+
+        now = timezone.now()
+        for balance in balances.values():
+            balance.updated_at = now
+        SellerBalance.objects.bulk_update(balances.values(), ['balance', 'updated_at'])
+    return balances
+
+
+def post_entries(seller_id, entries, allow_negative=True):
+    """Append ``entries`` for one seller; see ``post_seller_entries``."""
+    return post_seller_entries({seller_id: entries}, allow_negative)[seller_id]
+
+
+def _post_by_seller(items, entry_type, sign, description):
+    by_seller = defaultdict(list)
+    for item in items:
+        if item.seller_id is None:
+            continue
+        by_seller[item.seller_id].append(SellerLedgerEntry(
+            entry_type=entry_type,
+            amount=sign * item.price * item.quantity,
+            order_item=item,
+            description=f'{description} {item.quantity}x {item.product_name}',
+        ))
+    if by_seller:
+        post_seller_entries(by_seller)
+
+
+def record_sales(order_items):
+    """Credit each seller for newly sold order items."""
+    _post_by_seller(order_items, 'sale', 1, 'Sale of')
+
+
+def record_refunds(order_items):
+    """Debit each seller for refunded order items."""
+    _post_by_seller(order_items, 'refund', -1, 'Refund of')
+
+
+def request_payout(seller, amount, **fields):
+    """Create a pending payout and debit it, refusing to overdraw the balance."""
+    with transaction.atomic():
+        balance = _lock_balance(seller.id)
+        if amount > balance.balance:
+            raise InsufficientBalanceError(balance.balance)
+        # Debited by the SellerPayout post_save handler, like payouts created elsewhere
+        payout = SellerPayout.objects.create(seller=seller, amount=amount, status='pending', **fields)
+    return payout
+
+
+def debit_payout(payout):
+    """Debit a payout from the seller's balance, at most once."""
+    with transaction.atomic():
+        _lock_balance(payout.seller_id)
+        if SellerLedgerEntry.objects.filter(payout=payout, entry_type='payout').exists():
+            return
+        post_entries(payout.seller_id, [SellerLedgerEntry(
+            entry_type='payout',
+            amount=-payout.amount,
+            payout=payout,
+            description=f'Payout #{payout.id}',
+        )])
+
+
+def reverse_payout(payout):
+    """Return a failed payout to the seller's balance, at most once."""
+    with transaction.atomic():
+        _lock_balance(payout.seller_id)
+        if SellerLedgerEntry.objects.filter(payout=payout, entry_type='payout_reversal').exists():
+            return
+        if not SellerLedgerEntry.objects.filter(payout=payout, entry_type='payout').exists():
+            return
+        post_entries(payout.seller_id, [SellerLedgerEntry(
+            entry_type='payout_reversal',
+            amount=payout.amount,
+            payout=payout,
+            description=f'Reversal of failed payout #{payout.id}',
+        )])
+
+
+def _history(seller_id, skip_posted=False):
+    """
+    Unsaved entries for a seller's sales, refunds and payouts, oldest first;
+    with ``skip_posted`` only those the ledger does not hold yet.
+    """
+    from orders.models import OrderItem
+
+    # Entry type -> ids of the order items or payouts it was posted for
+    posted = {'sale': set(), 'refund': set(), 'payout': set()}
+    if skip_posted:
+        rows = SellerLedgerEntry.objects.filter(seller_id=seller_id, entry_type__in=posted)
+        for entry_type, item_id, payout_id in rows.values_list('entry_type', 'order_item_id', 'payout_id'):
+            posted[entry_type].add(payout_id if entry_type == 'payout' else item_id)
+
+    entries = []
+    items = OrderItem.objects.filter(seller_id=seller_id).order_by('created_at', 'id')
+    for item in items.iterator(chunk_size=2000):
+        line_total = item.price * item.quantity
+        if item.pk not in posted['sale']:
+            entries.append((item.created_at, SellerLedgerEntry(
+                entry_type='sale', amount=line_total, order_item=item,
+                description=f'Sale of {item.quantity}x {item.product_name}',
+            )))
+        if item.is_refunded and item.pk not in posted['refund']:
+            entries.append((item.refunded_at or item.created_at, SellerLedgerEntry(
+                entry_type='refund', amount=-line_total, order_item=item,
+                description=f'Refund of {item.quantity}x {item.product_name}',
+            )))
+    payouts = SellerPayout.objects.filter(seller_id=seller_id).exclude(status='failed')
+    for payout in payouts.exclude(pk__in=posted['payout']):
+        entries.append((payout.created_at, SellerLedgerEntry(
+            entry_type='payout', amount=-payout.amount, payout=payout,
+            description=f'Payout #{payout.id}',
+        )))
+
+    entries.sort(key=lambda pair: pair[0])
+    return [entry for _, entry in entries]
+
+
+def rebuild_seller_ledger(seller_id):
+    """Replay a seller's sales, refunds and payouts into an empty ledger."""
+    entries = _history(seller_id)
+    with transaction.atomic():
+        SellerLedgerEntry.objects.filter(seller_id=seller_id).delete()
+        SellerBalance.objects.filter(seller_id=seller_id).update(balance=0)
+        return post_entries(seller_id, entries)
+
+
+def backfill_seller_ledger(seller_id):
+    """Append the sales, refunds and payouts missing from a seller's ledger."""
+    with transaction.atomic():
+        _lock_balance(seller_id)
+        return post_entries(seller_id, _history(seller_id, skip_posted=True))
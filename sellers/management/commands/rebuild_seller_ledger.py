@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from sellers.ledger import backfill_seller_ledger, rebuild_seller_ledger
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Post order items, refunds and payouts missing from the seller ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seller-id',
+            type=int,
+            action='append',
+            dest='seller_ids',
+            help='Only rebuild this seller (can be repeated)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Replay every seller into an empty ledger instead of adding missing entries',
+        )
+
+    def handle(self, *args, **options):
+        sellers = User.objects.filter(role='seller').order_by('id')
+        if options['seller_ids']:
+            sellers = sellers.filter(id__in=options['seller_ids'])
+        rebuild = rebuild_seller_ledger if options['force'] else backfill_seller_ledger
+
+        for seller in sellers.iterator():
+            balance = rebuild(seller.id)
+            self.stdout.write(f'{seller.email}: balance ${balance.balance}')
+
+        self.stdout.write(self.style.SUCCESS('Seller ledger rebuilt.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from sellers.rollups import rebuild_seller_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-seller daily dashboard rollups from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seller-id',
+            type=int,
+            action='append',
+            dest='seller_ids',
+            help='Only rebuild this seller (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of sellers aggregated per query (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_seller_stats(
+            seller_ids=options['seller_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} seller daily stat rows.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from sellers.ratings import recompute_seller_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute seller average ratings and review totals from their products' rating summaries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seller-id',
+            type=int,
+            action='append',
+            dest='seller_ids',
+            help='Only recompute this seller (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of sellers aggregated per query (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        updated = recompute_seller_ratings(
+            seller_ids=options['seller_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Recomputed ratings for {updated} sellers.'))
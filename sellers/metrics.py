@@ -0,0 +1,93 @@
+"""
+Single-pass seller metrics shared by the dashboard, analytics, payouts and admin.
+
+Each helper answers its block with one conditional-aggregation query, so
+callers never need a separate ``.count()`` or ``aggregate()`` per number.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from products.models import Product
+from .models import SellerDailyStats, SellerPayout
+from .rollups import STATUS_FIELDS
+
+
+def product_summary(seller):
+    """Product counts for a seller in a single query."""
+    totals = Product.objects.filter(seller=seller).aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(is_active=True)),
+        out_of_stock=Count('id', filter=Q(stock__lte=0)),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def order_summary(seller, start_date=None, end_date=None, today=None):
+    """
+    Order and revenue metrics for a seller in a single query.
+
+    Range metrics cover ``start_date``..``end_date`` (inclusive, either bound
+    optional); lifetime and week-over-week metrics ignore the range.
+    """
+    today = today or timezone.localdate()
+    this_week_start = today - timedelta(days=7)
+    last_week_start = today - timedelta(days=14)
+
+    in_range = Q()
+    if start_date:
+        in_range &= Q(date__gte=start_date)
+    if end_date:
+        in_range &= Q(date__lte=end_date)
+
+    # Aliases must not shadow the rollup columns they sum
+    totals = SellerDailyStats.objects.filter(seller=seller).aggregate(
+        range_orders=Sum('total_orders', filter=in_range),
+        range_revenue=Sum('revenue', filter=in_range),
+        range_refunded=Sum('refunded_revenue', filter=in_range),
+        range_units=Sum('units_sold', filter=in_range),
+        this_week_orders=Sum('total_orders', filter=Q(date__gte=this_week_start)),
+        last_week_orders=Sum(
+            'total_orders',
+            filter=Q(date__gte=last_week_start, date__lt=this_week_start)
+        ),
+        lifetime_revenue=Sum('revenue'),
+        lifetime_refunded=Sum('refunded_revenue'),
+        **{
+            f'status_{status}': Sum(field, filter=in_range)
+            for status, field in STATUS_FIELDS.items()
+        },
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    summary = {
+        'total_orders': totals['range_orders'],
+        'total_revenue': totals['range_revenue'],
+        'refunded_revenue': totals['range_refunded'],
+        'units_sold': totals['range_units'],
+        'orders_by_status': {
+            status: totals[f'status_{status}'] for status in STATUS_FIELDS
+        },
+        'this_week_orders': totals['this_week_orders'],
+        'last_week_orders': totals['last_week_orders'],
+        'lifetime_revenue': totals['lifetime_revenue'],
+        'lifetime_refunded': totals['lifetime_refunded'],
+    }
+
+    this_week, last_week = summary['this_week_orders'], summary['last_week_orders']
+    if last_week > 0:
+        summary['week_over_week_change'] = (this_week - last_week) / last_week * 100
+    else:
+        summary['week_over_week_change'] = 100.0 if this_week > 0 else 0.0
+    return summary
+
+
+def payout_summary(seller):
+    """Payout totals for a seller by status in a single query."""
+    totals = SellerPayout.objects.filter(seller=seller).aggregate(
+        **{
+            status: Sum('amount', filter=Q(status=status))
+            for status, _ in SellerPayout.STATUS_CHOICES
+        }
+    )
+    return {key: value or 0 for key, value in totals.items()}
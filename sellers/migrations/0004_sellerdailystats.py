@@ -0,0 +1,42 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0003_sellerprofile_bank_address_sellerprofile_bank_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('orders_pending', models.PositiveIntegerField(default=0)),
+                ('orders_processing', models.PositiveIntegerField(default=0)),
+                ('orders_shipped', models.PositiveIntegerField(default=0)),
+                ('orders_delivered', models.PositiveIntegerField(default=0)),
+                ('orders_cancelled', models.PositiveIntegerField(default=0)),
+                ('orders_refunded', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('refunded_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('customers', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.ForeignKey(limit_choices_to={'role': 'seller'}, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Seller daily stats',
+                'db_table': 'seller_daily_stats',
+                'ordering': ['-date'],
+                'unique_together': {('seller', 'date')},
+            },
+        ),
+    ]
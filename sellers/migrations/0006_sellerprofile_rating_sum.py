@@ -0,0 +1,47 @@
+# Generated by Django 5.0.13 on 2026-10-17 04:52
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_seller_ratings(apps, schema_editor):
+    """Derive seller rating aggregates from the products' stored summaries."""
+    Product = apps.get_model('products', 'Product')
+    SellerProfile = apps.get_model('sellers', 'SellerProfile')
+    totals = {
+        row['seller_id']: row
+        for row in Product.objects.values('seller_id').annotate(
+            rating_sum_total=Sum('rating_sum'), review_count_total=Sum('review_count')
+        ).order_by()
+    }
+    profiles = list(SellerProfile.objects.all())
+    for profile in profiles:
+        row = totals.get(profile.user_id, {})
+        profile.rating_sum = row.get('rating_sum_total') or 0
+        profile.total_reviews = row.get('review_count_total') or 0
+        profile.average_rating = (
+            round(Decimal(profile.rating_sum) / profile.total_reviews, 2)
+            if profile.total_reviews else Decimal('0.00')
+        )
+    SellerProfile.objects.bulk_update(
+        profiles, ['rating_sum', 'total_reviews', 'average_rating'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0005_seller_ledger'),
+        ('products', '0009_product_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_seller_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+def backfill_ledger(apps, schema_editor):
+    """Post every sale, refund and payout without a ledger entry, oldest first per seller."""
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    SellerBalance = apps.get_model('sellers', 'SellerBalance')
+    SellerLedgerEntry = apps.get_model('sellers', 'SellerLedgerEntry')
+    SellerPayout = apps.get_model('sellers', 'SellerPayout')
+
+    seller_ids = set(
+        OrderItem.objects.exclude(seller=None).values_list('seller_id', flat=True).distinct()
+    ) | set(SellerPayout.objects.values_list('seller_id', flat=True).distinct())
+    for seller_id in sorted(seller_ids):
+        posted = {'sale': set(), 'refund': set(), 'payout': set()}
+        rows = SellerLedgerEntry.objects.filter(seller_id=seller_id, entry_type__in=posted)
+        for entry_type, item_id, payout_id in rows.values_list('entry_type', 'order_item_id', 'payout_id'):
+            posted[entry_type].add(payout_id if entry_type == 'payout' else item_id)
+
+        entries = []
+        items = OrderItem.objects.filter(seller_id=seller_id).order_by('created_at', 'id')
+        for item in items.iterator(chunk_size=2000):
+            line_total = item.price * item.quantity
+            if item.pk not in posted['sale']:
+                entries.append((item.created_at, SellerLedgerEntry(
+                    seller_id=seller_id, entry_type='sale', amount=line_total, order_item=item,
+                    description=f'Sale of {item.quantity}x {item.product_name}',
+                )))
+            if item.is_refunded and item.pk not in posted['refund']:
+                entries.append((item.refunded_at or item.created_at, SellerLedgerEntry(
+                    seller_id=seller_id, entry_type='refund', amount=-line_total, order_item=item,
+                    description=f'Refund of {item.quantity}x {item.product_name}',
+                )))
+        payouts = SellerPayout.objects.filter(seller_id=seller_id).exclude(status='failed')
+        for payout in payouts.exclude(pk__in=posted['payout']):
+            entries.append((payout.created_at, SellerLedgerEntry(
+                seller_id=seller_id, entry_type='payout', amount=-payout.amount, payout=payout,
+                description=f'Payout #{payout.id}',
+            )))
+        if not entries:
+            continue
+
+        entries.sort(key=lambda pair: pair[0])
+        balance, _ = SellerBalance.objects.get_or_create(seller_id=seller_id)
+        running = balance.balance
+        for _, entry in entries:
+            running += entry.amount
+            entry.balance_after = running
+        SellerLedgerEntry.objects.bulk_create([entry for _, entry in entries], batch_size=1000)
+        balance.balance = running
+        balance.save(update_fields=['balance', 'updated_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_orderitem_seller_indexes'),
+        ('sellers', '0006_sellerprofile_rating_sum'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_daily_stats(apps, schema_editor, batch_size=100):
+    """Fill the dashboard rollups from existing order items, a batch of sellers per query."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    SellerDailyStats = apps.get_model('sellers', 'SellerDailyStats')
+
+    status_fields = {
+        status: f'orders_{status}' for status, _ in Order._meta.get_field('status').choices
+    }
+    line_total = F('price') * F('quantity')
+    seller_ids = list(
+        OrderItem.objects.exclude(seller=None).values_list('seller_id', flat=True)
+        .distinct().order_by('seller_id')
+    )
+    for start in range(0, len(seller_ids), batch_size):
+        batch = seller_ids[start:start + batch_size]
+        rows = OrderItem.objects.filter(seller_id__in=batch).annotate(
+            day=TruncDate('order__created_at')
+        ).values('seller_id', 'day').annotate(
+            total_orders=Count('order', distinct=True),
+            revenue=Sum(line_total),
+            refunded_revenue=Sum(line_total, filter=Q(is_refunded=True)),
+            units_sold=Sum('quantity'),
+            customers=Count('order__user', distinct=True),
+            **{
+                field: Count('order', distinct=True, filter=Q(order__status=status))
+                for status, field in status_fields.items()
+            },
+        ).order_by()
+        SellerDailyStats.objects.filter(seller_id__in=batch).delete()
+        SellerDailyStats.objects.bulk_create([
+            SellerDailyStats(
+                seller_id=row['seller_id'],
+                date=row['day'],
+                total_orders=row['total_orders'],
+                revenue=row['revenue'] or 0,
+                refunded_revenue=row['refunded_revenue'] or 0,
+                units_sold=row['units_sold'] or 0,
+                customers=row['customers'],
+                **{field: row[field] for field in status_fields.values()},
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_orderitem_seller_indexes'),
+        ('sellers', '0007_backfill_seller_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_daily_stats, migrations.RunPython.noop),
+    ]
@@ -40,9 +40,10 @@ class SellerProfile(models.Model):
     is_verified = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     
-    # Ratings
+    # Ratings, maintained from the seller's product ratings (see sellers.ratings)
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     total_reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -94,3 +95,113 @@ class SellerPayout(models.Model):
     
     def __str__(self):
         return f"Payout to {self.seller.email} - ${self.amount}"
+
+
+class SellerDailyStats(models.Model):
+    """Per-seller, per-day order rollup backing the seller dashboard."""
+    
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        limit_choices_to={'role': 'seller'}
+    )
+    date = models.DateField()
+    
+    # Orders containing this seller's items, bucketed by order status
+    total_orders = models.PositiveIntegerField(default=0)
+    orders_pending = models.PositiveIntegerField(default=0)
+    orders_processing = models.PositiveIntegerField(default=0)
+    orders_shipped = models.PositiveIntegerField(default=0)
+    orders_delivered = models.PositiveIntegerField(default=0)
+    orders_cancelled = models.PositiveIntegerField(default=0)
+    orders_refunded = models.PositiveIntegerField(default=0)
+    
+    # Sales
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunded_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    customers = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'seller_daily_stats'
+        ordering = ['-date']
+        unique_together = ['seller', 'date']
+        verbose_name_plural = 'Seller daily stats'
+    
+    def __str__(self):
+        return f"Stats for {self.seller.email} on {self.date}"
+
+
+class SellerBalance(models.Model):
+    """Materialized running balance, updated together with the ledger."""
+    
+    seller = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='seller_balance',
+        limit_choices_to={'role': 'seller'}
+    )
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'seller_balances'
+    
+    def __str__(self):
+        return f"Balance for {self.seller.email} - ${self.balance}"
+
+
+class SellerLedgerEntry(models.Model):
+    """Append-only record of every credit and debit to a seller's balance."""
+    
+    ENTRY_TYPE_CHOICES = (
+        ('sale', 'Sale'),
+        ('refund', 'Refund'),
+        ('payout', 'Payout'),
+        ('payout_reversal', 'Payout Reversal'),
+    )
+    
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+        limit_choices_to={'role': 'seller'}
+    )
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    
+    # Signed amount: credits are positive, debits negative
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    # Source of the entry
+    order_item = models.ForeignKey(
+        'orders.OrderItem',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    payout = models.ForeignKey(
+        SellerPayout,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    description = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'seller_ledger_entries'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['seller', '-created_at']),
+        ]
+        verbose_name_plural = 'Seller ledger entries'
+    
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} for {self.seller.email}"
@@ -0,0 +1,75 @@
+"""
+Seller rating aggregates maintained from product rating changes.
+
+``SellerProfile`` keeps a rating sum and review count across all of the
+seller's products, so ``average_rating`` and ``total_reviews`` never need
+a join over every review. Each product rating change is applied with one
+``F()`` UPDATE; ``recompute_seller_ratings`` rebuilds sellers in batches
+from the products' stored summaries.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Subquery, Sum
+
+from products.models import Product
+from products.ratings import average_rating_expression
+from .models import SellerProfile
+
+
+def apply_rating_change(product_id, sum_delta, count_delta):
+    """Move the owning seller's aggregates by a product's rating deltas."""
+    seller = Product.objects.filter(pk=product_id).values('seller_id')
+    return _apply(SellerProfile.objects.filter(user_id=Subquery(seller)), sum_delta, count_delta)
+
+
+def remove_product(product_id):
+    """Take a product's whole stored rating contribution off its seller."""
+    row = Product.objects.filter(pk=product_id).values('seller_id', 'rating_sum', 'review_count').first()
+    if row and (row['rating_sum'] or row['review_count']):
+        _apply(
+            SellerProfile.objects.filter(user_id=row['seller_id']),
+            -row['rating_sum'], -row['review_count'],
+        )
+
+
+def _apply(profiles, sum_delta, count_delta):
+    return profiles.update(
+        rating_sum=F('rating_sum') + sum_delta,
+        total_reviews=F('total_reviews') + count_delta,
+        average_rating=average_rating_expression(sum_delta, count_delta, count_field='total_reviews'),
+    )
+
+
+def recompute_seller_ratings(seller_ids=None, batch_size=500):
+    """Rebuild seller aggregates with one grouped query per batch of sellers."""
+    profiles = SellerProfile.objects.order_by('user_id')
+    if seller_ids is not None:
+        profiles = profiles.filter(user_id__in=seller_ids)
+    all_ids = list(profiles.values_list('user_id', flat=True))
+
+    updated = 0
+    for start in range(0, len(all_ids), batch_size):
+        batch = all_ids[start:start + batch_size]
+        totals = {
+            row['seller_id']: row
+            for row in Product.objects.filter(seller_id__in=batch).values('seller_id').annotate(
+                rating_sum_total=Sum('rating_sum'),
+                review_count_total=Sum('review_count'),
+            ).order_by()
+        }
+        batch_profiles = list(SellerProfile.objects.filter(user_id__in=batch))
+        for profile in batch_profiles:
+            row = totals.get(profile.user_id, {})
+            profile.rating_sum = row.get('rating_sum_total') or 0
+            profile.total_reviews = row.get('review_count_total') or 0
+            profile.average_rating = (
+                round(Decimal(profile.rating_sum) / profile.total_reviews, 2)
+                if profile.total_reviews else Decimal('0.00')
+            )
+        with transaction.atomic():
+            SellerProfile.objects.bulk_update(
+                batch_profiles, ['rating_sum', 'total_reviews', 'average_rating']
+            )
+        updated += len(batch_profiles)
+    return updated
@@ -0,0 +1,123 @@
+"""
+Incremental maintenance of the per-seller, per-day order rollups.
+
+Every write to an order, order item or refund recomputes only the
+(seller, day) rows it touches, so the dashboard can answer from a handful
+of indexed ``SellerDailyStats`` rows instead of scanning order history.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+from orders.models import Order, OrderItem
+from .models import SellerDailyStats
+
+STATUS_FIELDS = {status: f'orders_{status}' for status, _ in Order.STATUS_CHOICES}
+
+ROLLUP_FIELDS = [
+    'total_orders', *STATUS_FIELDS.values(),
+    'revenue', 'refunded_revenue', 'units_sold', 'customers', 'updated_at',
+]
+
+
+def seller_items():
+    """Order items annotated with the owning seller and the order's day."""
+    return OrderItem.objects.annotate(
+        seller_key=F('seller'),
+        day=TruncDate('order__created_at'),
+    )
+
+
+def _aggregate(items):
+    """Group items by (seller, day) and compute every rollup column in one query."""
+    line_total = F('price') * F('quantity')
+    status_counts = {
+        field: Count('order', distinct=True, filter=Q(order__status=status))
+        for status, field in STATUS_FIELDS.items()
+    }
+    return items.values('seller_key', 'day').annotate(
+        total_orders=Count('order', distinct=True),
+        revenue=Sum(line_total),
+        refunded_revenue=Sum(line_total, filter=Q(is_refunded=True)),
+        units_sold=Sum('quantity'),
+        customers=Count('order__user', distinct=True),
+        **status_counts,
+    ).order_by()
+
+
+def _build(row):
+    return SellerDailyStats(
+        seller_id=row['seller_key'],
+        date=row['day'],
+        total_orders=row['total_orders'],
+        revenue=row['revenue'] or 0,
+        refunded_revenue=row['refunded_revenue'] or 0,
+        units_sold=row['units_sold'] or 0,
+        customers=row['customers'],
+        **{field: row[field] for field in STATUS_FIELDS.values()},
+    )
+
+
+def _upsert(rows):
+    SellerDailyStats.objects.bulk_create(
+        [_build(row) for row in rows],
+        update_conflicts=True,
+        unique_fields=['seller', 'date'],
+        update_fields=ROLLUP_FIELDS,
+    )
+
+
+def refresh_seller_days(keys):
+    """Recompute the rollup rows for the given ``(seller_id, date)`` pairs."""
+    keys = {(seller_id, day) for seller_id, day in keys if seller_id and day}
+    if not keys:
+        return
+
+    seller_ids = {seller_id for seller_id, _ in keys}
+    days = {day for _, day in keys}
+    rows = [
+        row for row in _aggregate(seller_items().filter(seller_key__in=seller_ids, day__in=days))
+        if (row['seller_key'], row['day']) in keys
+    ]
+
+    with transaction.atomic():
+        _upsert(rows)
+        stale = keys - {(row['seller_key'], row['day']) for row in rows}
+        if stale:
+            query = Q()
+            for seller_id, day in stale:
+                query |= Q(seller_id=seller_id, date=day)
+            SellerDailyStats.objects.filter(query).delete()
+
+
+def keys_for_orders(order_ids):
+    """Return the (seller_id, date) pairs touched by the given orders."""
+    return set(
+        seller_items().filter(order_id__in=order_ids)
+        .values_list('seller_key', 'day').distinct()
+    )
+
+
+def refresh_orders(order_ids):
+    """Recompute the rollup rows for every seller with items in these orders."""
+    refresh_seller_days(keys_for_orders(order_ids))
+
+
+def rebuild_seller_stats(seller_ids=None, batch_size=100):
+    """Recompute rollups from scratch, one grouped query per batch of sellers."""
+    from django.contrib.auth import get_user_model
+
+    sellers = get_user_model().objects.filter(role='seller').order_by('id')
+    if seller_ids is not None:
+        sellers = sellers.filter(id__in=seller_ids)
+    all_ids = list(sellers.values_list('id', flat=True))
+
+    rebuilt = 0
+    for start in range(0, len(all_ids), batch_size):
+        batch = all_ids[start:start + batch_size]
+        rows = list(_aggregate(seller_items().filter(seller_key__in=batch)))
+        with transaction.atomic():
+            SellerDailyStats.objects.filter(seller_id__in=batch).delete()
+            _upsert(rows)
+        rebuilt += len(rows)
+    return rebuilt
@@ -0,0 +1,102 @@
+"""Keep seller rollups, ledger and ratings in sync with order, item, refund, payout and review writes."""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from orders.models import Order, OrderItem, Refund
+from orders.signals import order_items_created
+from products.models import Product
+from products.ratings import product_rating_changed
+from . import ratings
+from .ledger import debit_payout, record_refunds, record_sales, reverse_payout
+from .models import SellerPayout
+from .rollups import keys_for_orders, refresh_orders, refresh_seller_days
+
+
+def _order_day(order):
+    return timezone.localdate(order.created_at) if order.created_at else None
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_day(sender, instance, **kwargs):
+    """Capture the rollup rows an order belongs to before its date changes."""
+    if instance.pk is None:
+        return
+    previous = Order.objects.filter(pk=instance.pk).values_list('created_at', flat=True).first()
+    if previous and instance.created_at and timezone.localdate(previous) != _order_day(instance):
+        instance._previous_stat_keys = keys_for_orders([instance.pk])
+
+
+@receiver(post_save, sender=Order)
+def refresh_order_stats(sender, instance, created, **kwargs):
+    if created:
+        return  # Items are not attached yet; they refresh the rollup themselves.
+    keys = keys_for_orders([instance.pk]) | getattr(instance, '_previous_stat_keys', set())
+    refresh_seller_days(keys)
+
+
+@receiver(pre_delete, sender=Order)
+def remember_deleted_order(sender, instance, **kwargs):
+    instance._previous_stat_keys = keys_for_orders([instance.pk])
+
+
+@receiver(post_delete, sender=Order)
+def refresh_deleted_order_stats(sender, instance, **kwargs):
+    refresh_seller_days(getattr(instance, '_previous_stat_keys', set()))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_item_stats(sender, instance, **kwargs):
+    seller_id = instance.seller_id
+    created_at = Order.objects.filter(pk=instance.order_id).values_list('created_at', flat=True).first()
+    if seller_id and created_at:
+        refresh_seller_days([(seller_id, timezone.localdate(created_at))])
+
+
+@receiver(post_save, sender=Refund)
+def refresh_refund_stats(sender, instance, **kwargs):
+    refresh_orders([instance.order_id])
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_refund_state(sender, instance, **kwargs):
+    # Only items saved as refunded need the stored flag
+    if instance.is_refunded and instance.pk is not None:
+        instance._was_refunded = OrderItem.objects.filter(pk=instance.pk, is_refunded=True).exists()
+
+
+@receiver(post_save, sender=OrderItem)
+def post_item_to_ledger(sender, instance, created, **kwargs):
+    """Credit new sales and debit refunds however the item was marked refunded."""
+    if created:
+        record_sales([instance])
+    if instance.is_refunded and not getattr(instance, '_was_refunded', False):
+        record_refunds([instance])
+
+
+@receiver(order_items_created, sender=Order)
+def handle_bulk_created_items(sender, order, items, **kwargs):
+    """Credit sellers and refresh rollups once per checkout instead of per item."""
+    record_sales(items)
+    refresh_orders([order.pk])
+
+
+@receiver(post_save, sender=SellerPayout)
+def post_payout_to_ledger(sender, instance, created, **kwargs):
+    """Debit new payouts however they were created, so the balance matches a rebuild."""
+    if instance.status == 'failed':
+        reverse_payout(instance)
+    elif created:
+        debit_payout(instance)
+
+
+@receiver(product_rating_changed)
+def apply_product_rating_change(sender, product_id, sum_delta, count_delta, **kwargs):
+    ratings.apply_rating_change(product_id, sum_delta, count_delta)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_product_rating(sender, instance, **kwargs):
+    """A deleted product's reviews go with it without per-review updates."""
+    ratings.remove_product(instance.pk)
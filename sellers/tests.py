@@ -1,3 +1,379 @@
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from django.apps import apps
+from django.core.management import call_command
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import SellerBalance, SellerProfile, SellerDailyStats, SellerLedgerEntry, SellerPayout
+from . import ledger
+from .rollups import rebuild_seller_stats
+from .metrics import order_summary
+from orders.models import Order, OrderItem
+from products.models import Product, Category, ProductReview
 
-# Create your tests here.
+User = get_user_model()
+
+
+class SellerTestMixin:
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            email='seller@example.com',
+            username='seller',
+            password='pass123',
+            role='seller'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com',
+            username='buyer',
+            password='pass123'
+        )
+        self.profile = SellerProfile.objects.create(
+            user=self.seller,
+            business_name='Seller Store',
+            business_email='store@example.com',
+            business_phone='1234567890',
+            business_address='1 Market St',
+            business_city='New York',
+            business_state='NY',
+            business_zip='10001',
+            business_country='USA'
+        )
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            seller=self.seller,
+            category=self.category,
+            name='Laptop',
+            description='A great laptop',
+            price=Decimal('100.00'),
+            stock=10,
+            sku='LAP001'
+        )
+    
+    def create_order(self, quantity=1, status='pending'):
+        order = Order.objects.create(
+            user=self.buyer,
+            status=status,
+            subtotal=self.product.price * quantity,
+            total=self.product.price * quantity,
+            shipping_address='123 Main St',
+            shipping_city='New York',
+            shipping_state='NY',
+            shipping_zip='10001',
+            shipping_country='USA',
+            phone='1234567890'
+        )
+        OrderItem.objects.create(
+            order=order,
+            product=self.product,
+            product_name=self.product.name,
+            product_sku=self.product.sku,
+            price=self.product.price,
+            quantity=quantity
+        )
+        return order
+
+
+class SellerDailyStatsTest(SellerTestMixin, TestCase):
+    def test_rollup_tracks_new_items(self):
+        """Test order items are rolled up per seller and day"""
+        self.create_order(quantity=2)
+        self.create_order(quantity=1)
+        
+        stats = SellerDailyStats.objects.get(seller=self.seller, date=timezone.localdate())
+        self.assertEqual(stats.total_orders, 2)
+        self.assertEqual(stats.orders_pending, 2)
+        self.assertEqual(stats.units_sold, 3)
+        self.assertEqual(stats.revenue, Decimal('300.00'))
+        self.assertEqual(stats.customers, 1)
+    
+    def test_rollup_tracks_status_changes(self):
+        """Test changing an order's status moves it between buckets"""
+        order = self.create_order()
+        order.status = 'shipped'
+        order.save()
+        
+        stats = SellerDailyStats.objects.get(seller=self.seller)
+        self.assertEqual(stats.orders_pending, 0)
+        self.assertEqual(stats.orders_shipped, 1)
+    
+    def test_rollup_removed_with_order(self):
+        """Test deleting the last order removes the rollup row"""
+        order = self.create_order()
+        order.delete()
+        self.assertFalse(SellerDailyStats.objects.filter(seller=self.seller).exists())
+    
+    def test_backfill_legacy_item_sellers(self):
+        """Test legacy items without a seller are backfilled and rolled up"""
+        order = self.create_order(quantity=2)
+        OrderItem.objects.filter(order=order).update(seller=None)
+        SellerDailyStats.objects.all().delete()
+        
+        call_command('backfill_order_item_sellers', stdout=StringIO())
+        self.assertFalse(OrderItem.objects.filter(seller__isnull=True).exists())
+        self.assertEqual(SellerDailyStats.objects.get(seller=self.seller).units_sold, 2)
+    
+    def test_rebuild_matches_incremental(self):
+        """Test a full rebuild produces the same rows"""
+        self.create_order(quantity=2, status='delivered')
+        before = list(SellerDailyStats.objects.values('date', 'total_orders', 'revenue'))
+        rebuild_seller_stats()
+        after = list(SellerDailyStats.objects.values('date', 'total_orders', 'revenue'))
+        self.assertEqual(before, after)
+    
+    def test_migration_builds_rollups_for_existing_orders(self):
+        """Test the backfill migration reproduces the incremental rows"""
+        self.create_order(quantity=2, status='delivered')
+        self.create_order(quantity=1)
+        fields = ('date', 'total_orders', 'orders_delivered', 'orders_pending', 'revenue', 'units_sold')
+        before = list(SellerDailyStats.objects.values(*fields))
+        SellerDailyStats.objects.all().delete()
+        
+        migration = import_module('sellers.migrations.0008_backfill_seller_daily_stats')
+        migration.build_daily_stats(apps, None)
+        self.assertEqual(list(SellerDailyStats.objects.values(*fields)), before)
+
+
+class SellerMetricsTest(SellerTestMixin, TestCase):
+    def test_order_summary_single_query(self):
+        """Test every order metric is computed in one query"""
+        self.create_order(quantity=2)
+        self.create_order(status='shipped')
+        
+        with self.assertNumQueries(1):
+            summary = order_summary(self.seller)
+        self.assertEqual(summary['total_orders'], 2)
+        self.assertEqual(summary['lifetime_revenue'], Decimal('300.00'))
+        self.assertEqual(summary['orders_by_status']['shipped'], 1)
+        self.assertEqual(summary['this_week_orders'], 2)
+        self.assertEqual(summary['week_over_week_change'], 100.0)
+
+
+class SellerDashboardTest(SellerTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+    
+    def test_dashboard_reads_rollups(self):
+        """Test dashboard overview reflects orders"""
+        self.create_order(quantity=2)
+        self.create_order(quantity=1, status='delivered')
+        
+        response = self.client.get('/api/sellers/profiles/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['overview']['total_orders'], 2)
+        self.assertEqual(response.data['overview']['total_revenue'], 300.0)
+        self.assertEqual(response.data['orders_by_status']['pending'], 1)
+        self.assertEqual(response.data['orders_by_status']['delivered'], 1)
+        self.assertEqual(response.data['recent_performance']['this_week_orders'], 2)
+        self.assertEqual(len(response.data['recent_orders']), 2)
+        self.assertEqual(response.data['recent_orders'][0]['items_count'], 1)
+    
+    def test_dashboard_query_count_is_constant(self):
+        """Test dashboard queries do not grow with the number of orders"""
+        self.create_order()
+        self.client.get('/api/sellers/profiles/dashboard/')
+        with self.assertNumQueries(9) as ctx:
+            self.client.get('/api/sellers/profiles/dashboard/')
+        
+        for _ in range(5):
+            self.create_order()
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.get('/api/sellers/profiles/dashboard/')
+
+
+class SellerOrdersEndpointTest(SellerTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+    
+    def test_orders_are_cursor_paginated(self):
+        """Test seller orders are returned one page at a time"""
+        for _ in range(3):
+            self.create_order(quantity=2)
+        
+        response = self.client.get('/api/sellers/profiles/orders/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['total'], 200.0)
+        self.assertIsNotNone(response.data['next'])
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+    
+    def test_orders_page_query_count_is_constant(self):
+        """Test a page costs the same number of queries regardless of size"""
+        self.create_order()
+        with self.assertNumQueries(2) as ctx:
+            self.client.get('/api/sellers/profiles/orders/')
+        
+        for _ in range(5):
+            self.create_order()
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.get('/api/sellers/profiles/orders/')
+
+
+class SellerLedgerTest(SellerTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+    
+    def test_sale_credits_balance(self):
+        """Test selling an item credits the seller's balance"""
+        self.create_order(quantity=2)
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('200.00'))
+        entry = SellerLedgerEntry.objects.get(seller=self.seller)
+        self.assertEqual(entry.entry_type, 'sale')
+        self.assertEqual(entry.balance_after, Decimal('200.00'))
+    
+    def test_refund_debits_balance(self):
+        """Test cancelling and refunding debits the seller's balance"""
+        order = self.create_order(quantity=2)
+        response = self.client.post(f'/api/sellers/orders/{order.id}/cancel_and_refund/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('0.00'))
+    
+    def test_refund_saved_elsewhere_debits_balance_once(self):
+        """Test marking an item refunded outside the cancel view debits it once"""
+        order = self.create_order(quantity=2)
+        item = OrderItem.objects.get(order=order)
+        item.is_refunded = True
+        item.refunded_at = timezone.now()
+        item.save()
+        item.save()
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('0.00'))
+        self.assertEqual(ledger.rebuild_seller_ledger(self.seller.id).balance, Decimal('0.00'))
+    
+    def test_payout_cannot_overdraw(self):
+        """Test payouts are limited to the available balance"""
+        self.create_order(quantity=1)
+        response = self.client.post('/api/sellers/payouts/request_payout/', {'amount': '150'})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/sellers/payouts/request_payout/', {'amount': '60'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('40.00'))
+        
+        response = self.client.post('/api/sellers/payouts/request_payout/', {'amount': '60'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_failed_payout_is_reversed(self):
+        """Test a failed payout returns the amount to the balance once"""
+        self.create_order(quantity=1)
+        payout = ledger.request_payout(
+            self.seller, Decimal('100.00'),
+            period_start=timezone.localdate(), period_end=timezone.localdate()
+        )
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('0.00'))
+        
+        payout.status = 'failed'
+        payout.save()
+        payout.save()
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('100.00'))
+    
+    def test_payout_created_directly_debits_balance(self):
+        """Test a payout created outside request_payout agrees with a rebuild"""
+        self.create_order(quantity=3)
+        SellerPayout.objects.create(
+            seller=self.seller, amount=Decimal('120.00'),
+            period_start=timezone.localdate(), period_end=timezone.localdate()
+        )
+        SellerPayout.objects.create(
+            seller=self.seller, amount=Decimal('30.00'), status='failed',
+            period_start=timezone.localdate(), period_end=timezone.localdate()
+        )
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('180.00'))
+        self.assertEqual(ledger.rebuild_seller_ledger(self.seller.id).balance, Decimal('180.00'))
+    
+    def test_rebuild_replays_history(self):
+        """Test rebuilding the ledger reproduces the running balance"""
+        self.create_order(quantity=3)
+        ledger.request_payout(
+            self.seller, Decimal('50.00'),
+            period_start=timezone.localdate(), period_end=timezone.localdate()
+        )
+        balance = ledger.rebuild_seller_ledger(self.seller.id)
+        self.assertEqual(balance.balance, Decimal('250.00'))
+        self.assertEqual(SellerLedgerEntry.objects.filter(seller=self.seller).count(), 2)
+    
+    def test_migration_backfills_legacy_history(self):
+        """Test the ledger migration posts sales, refunds and payouts made before it"""
+        first = self.create_order(quantity=3)
+        self.create_order(quantity=1)
+        OrderItem.objects.filter(order=first).update(is_refunded=True, refunded_at=timezone.now())
+        ledger.request_payout(
+            self.seller, Decimal('40.00'),
+            period_start=timezone.localdate(), period_end=timezone.localdate()
+        )
+        SellerLedgerEntry.objects.all().delete()
+        SellerBalance.objects.update(balance=0)
+        
+        migration = import_module('sellers.migrations.0007_backfill_seller_ledger')
+        migration.backfill_ledger(apps, None)
+        migration.backfill_ledger(apps, None)
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('60.00'))
+        self.assertEqual(SellerLedgerEntry.objects.filter(seller=self.seller).count(), 4)
+    
+    def test_rebuild_command_adds_missing_history(self):
+        """Test the command posts legacy entries for sellers who already have a ledger"""
+        self.create_order(quantity=1)
+        legacy = self.create_order(quantity=2)
+        SellerLedgerEntry.objects.filter(order_item__order=legacy).delete()
+        SellerBalance.objects.update(balance=Decimal('100.00'))
+        
+        call_command('rebuild_seller_ledger', stdout=StringIO())
+        self.assertEqual(ledger.get_balance(self.seller), Decimal('300.00'))
+        call_command('rebuild_seller_ledger', stdout=StringIO())
+        self.assertEqual(SellerLedgerEntry.objects.filter(seller=self.seller).count(), 2)
+
+
+class SellerRatingTest(SellerTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_product = Product.objects.create(
+            seller=self.seller,
+            category=self.category,
+            name='Mouse',
+            description='A mouse',
+            price=Decimal('20.00'),
+            stock=10,
+            sku='MOU001'
+        )
+    
+    def review(self, product, rating, user=None):
+        return ProductReview.objects.create(
+            product=product, user=user or self.buyer, rating=rating, title='Review', comment='Text'
+        )
+    
+    def refreshed_profile(self):
+        return SellerProfile.objects.get(pk=self.profile.pk)
+    
+    def test_reviews_roll_up_to_seller(self):
+        """Test seller rating follows reviews across all of their products"""
+        review = self.review(self.product, 5)
+        self.review(self.other_product, 2)
+        profile = self.refreshed_profile()
+        self.assertEqual((profile.total_reviews, profile.average_rating), (2, Decimal('3.50')))
+        
+        review.rating = 3
+        review.save()
+        self.assertEqual(self.refreshed_profile().average_rating, Decimal('2.50'))
+        
+        self.other_product.delete()
+        profile = self.refreshed_profile()
+        self.assertEqual((profile.total_reviews, profile.average_rating), (1, Decimal('3.00')))
+    
+    def test_recompute_command_repairs_sellers(self):
+        """Test the batched recompute rebuilds drifted seller aggregates"""
+        self.review(self.product, 4)
+        SellerProfile.objects.update(total_reviews=0, rating_sum=0, average_rating=0)
+        
+        call_command('recompute_seller_ratings', batch_size=1, stdout=StringIO())
+        profile = self.refreshed_profile()
+        self.assertEqual((profile.total_reviews, profile.rating_sum, profile.average_rating), (1, 4, Decimal('4.00')))
@@ -1,13 +1,17 @@
 from rest_framework import viewsets, views, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Avg, Q, F
-from django.db.models.functions import TruncDate
+from rest_framework.pagination import CursorPagination
+from django.db import transaction
+from django.db.models import Sum, Count, Avg, Q, F, Prefetch
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
-from .models import SellerProfile, SellerPayout
+from .models import SellerProfile, SellerPayout, SellerDailyStats
 from .serializers import SellerProfileSerializer, SellerPayoutSerializer
+from .metrics import order_summary, payout_summary, product_summary
+from . import ledger
+from products.inventory import increment_stock
 from products.models import Product
 from orders.models import Order, OrderItem, Refund, OrderStatusHistory
 
@@ -27,6 +31,48 @@ class IsSellerOrReadOnly(permissions.BasePermission):
         return obj.user == request.user
 
 
+class SellerOrderPagination(CursorPagination):
+    """Keyset pagination over a seller's orders, newest first."""
+    
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def serialize_seller_order(order, seller_items):
+    """Build the seller-facing payload for an order and the seller's items in it."""
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'customer': {
+            'name': f"{order.user.first_name} {order.user.last_name}".strip() or order.user.username,
+            'email': order.user.email,
+        },
+        'shipping_address': {
+            'address': order.shipping_address,
+            'city': order.shipping_city,
+            'state': order.shipping_state,
+            'zip': order.shipping_zip,
+            'country': order.shipping_country,
+        },
+        'phone': order.phone,
+        'items': [
+            {
+                'product_name': item.product_name,
+                'quantity': item.quantity,
+                'price': float(item.price),
+                'total': float(item.price * item.quantity)
+            }
+            for item in seller_items
+        ],
+        'total': float(sum(item.price * item.quantity for item in seller_items)),
+        'created_at': order.created_at,
+        'updated_at': order.updated_at,
+    }
+
+
 class SellerProfileViewSet(viewsets.ModelViewSet):
     """ViewSet for Seller Profile operations."""
     
@@ -133,10 +179,10 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
         
         # Get all seller's products
         products = Product.objects.filter(seller=request.user)
-        product_ids = list(products.values_list('id', flat=True))
+        product_totals = product_summary(request.user)
         
         # If no products, return empty dashboard
-        if not product_ids:
+        if not product_totals['total_products']:
             dashboard_data = {
                 'seller_info': {
                     'business_name': seller_profile.business_name,
@@ -173,64 +219,38 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
             }
             return Response(dashboard_data)
         
-        # Orders containing seller's products
-        order_items = OrderItem.objects.filter(product_id__in=product_ids)
-        order_ids = order_items.values_list('order_id', flat=True).distinct()
-        orders = Order.objects.filter(id__in=order_ids)
-        
         # === OVERVIEW METRICS ===
-        total_products = products.count()
-        active_products = products.filter(is_active=True).count()
-        # Count products with stock less than or equal to 0
-        out_of_stock = products.filter(stock__lte=0).count()
-        
-        # Filter orders by date range - this filters the data based on the selected date range
-        orders_in_range = orders.filter(created_at__gte=start_datetime, created_at__lte=end_datetime)
-        order_items_in_range = order_items.filter(order__in=orders_in_range)
-        
-        # Total orders and revenue within date range
-        total_orders = orders_in_range.count()
-        total_revenue = order_items_in_range.aggregate(
-            total=Sum(F('price') * F('quantity'))
-        )['total'] or 0
-        
-        # Orders by status (within date range)
-        pending_orders = orders_in_range.filter(status='pending').count()
-        processing_orders = orders_in_range.filter(status='processing').count()
-        shipped_orders = orders_in_range.filter(status='shipped').count()
-        delivered_orders = orders_in_range.filter(status='delivered').count()
-        
-        # Orders that need action (pending or processing)
-        orders_to_fulfill = pending_orders + processing_orders
-        
-        # === RECENT ANALYTICS (within date range) ===
-        recent_orders = orders_in_range
-        recent_revenue = order_items_in_range.aggregate(
-            total=Sum(F('price') * F('quantity'))
-        )['total'] or 0
-        
-        recent_orders_count = recent_orders.count()
+        # Every order metric comes from one query over the daily rollups
+        order_totals = order_summary(
+            request.user,
+            start_date=start_date,
+            end_date=end_date,
+            today=today_start.date()
+        )
         
-        # Week over week comparison (always use last 7 days from today, not filtered by date range)
-        # This week: last 7 days (including today)
-        # Last week: 8-14 days ago (previous 7-day period, excluding the last 7 days)
-        this_week_start = today_start - timedelta(days=7)
-        this_week_orders = orders.filter(created_at__gte=this_week_start).count()
+        total_orders = order_totals['total_orders']
+        total_revenue = order_totals['total_revenue']
+        orders_by_status = order_totals['orders_by_status']
         
-        last_week_start = today_start - timedelta(days=14)
-        last_week_orders = orders.filter(
-            created_at__gte=last_week_start,
-            created_at__lt=this_week_start
-        ).count()
+        # Orders that need action (pending or processing)
+        orders_to_fulfill = orders_by_status['pending'] + orders_by_status['processing']
         
         # === DAILY REVENUE CHART (within date range) ===
-        daily_revenue = order_items_in_range.annotate(
-            date=TruncDate('order__created_at')
-        ).values('date').annotate(
-            revenue=Sum(F('price') * F('quantity')),
-            orders=Count('order_id', distinct=True)
+        daily_revenue = SellerDailyStats.objects.filter(
+            seller=request.user,
+            date__gte=start_date,
+            date__lte=end_date
+        ).values('date', 'revenue').annotate(
+            orders=F('total_orders')
         ).order_by('date')
         
+        # Seller's items in orders placed within the date range
+        order_items_in_range = OrderItem.objects.filter(
+            seller=request.user,
+            order__created_at__gte=start_datetime,
+            order__created_at__lte=end_datetime
+        )
+        
         # === TOP SELLING PRODUCTS ===
         top_products = order_items_in_range.values(
             'product_id',
@@ -248,42 +268,38 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
         ).values('id', 'name', 'stock', 'price')[:10]
         
         # === RECENT ORDERS (Last 10 within date range) ===
-        recent_orders_list = []
-        for order in orders_in_range.order_by('-created_at')[:10]:
-            # Get items for this seller in this order
-            seller_items = order_items_in_range.filter(order=order)
-            order_total = seller_items.aggregate(
-                total=Sum(F('price') * F('quantity'))
-            )['total'] or 0
-            
-            recent_orders_list.append({
+        seller_lines = Q(items__seller=request.user)
+        recent_orders = Order.objects.filter(
+            id__in=order_items_in_range.values('order_id')
+        ).select_related('user').annotate(
+            seller_total=Sum(F('items__price') * F('items__quantity'), filter=seller_lines),
+            seller_items_count=Count('items', filter=seller_lines)
+        ).order_by('-created_at')[:10]
+        
+        recent_orders_list = [
+            {
                 'id': order.id,
                 'order_number': order.order_number,
                 'status': order.status,
-                'total': float(order_total),
-                'items_count': seller_items.count(),
+                'total': float(order.seller_total or 0),
+                'items_count': order.seller_items_count,
                 'created_at': order.created_at,
                 'customer_name': f"{order.user.first_name} {order.user.last_name}".strip() or order.user.email
-            })
+            }
+            for order in recent_orders
+        ]
         
         # === RATING AND REVIEWS ===
         avg_rating = seller_profile.average_rating or 0
         total_reviews = seller_profile.total_reviews or 0
         
         # === PAYOUT INFORMATION ===
-        pending_payout = SellerPayout.objects.filter(
-            seller=request.user,
-            status='pending'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        total_payouts = SellerPayout.objects.filter(
-            seller=request.user,
-            status='completed'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        payout_totals = payout_summary(request.user)
+        pending_payout = payout_totals['pending']
+        total_payouts = payout_totals['completed']
         
-        # Available balance is total revenue minus all payouts
-        # Ensure balance doesn't go negative (shouldn't happen, but safety check)
-        available_balance = max(0, float(total_revenue) - float(pending_payout) - float(total_payouts))
+        # Available balance is the seller's running ledger balance
+        available_balance = max(0, float(ledger.get_balance(request.user)))
         
         # Construct response
         dashboard_data = {
@@ -300,31 +316,25 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
                 'member_since': seller_profile.created_at,
             },
             'overview': {
-                'total_products': total_products,
-                'active_products': active_products,
-                'out_of_stock': out_of_stock,
+                **product_totals,
                 'total_orders': total_orders,
                 'orders_to_fulfill': orders_to_fulfill,
                 'total_revenue': float(total_revenue),
             },
             'orders_by_status': {
-                'pending': pending_orders,
-                'processing': processing_orders,
-                'shipped': shipped_orders,
-                'delivered': delivered_orders,
+                'pending': orders_by_status['pending'],
+                'processing': orders_by_status['processing'],
+                'shipped': orders_by_status['shipped'],
+                'delivered': orders_by_status['delivered'],
             },
             'recent_performance': {
                 'last_30_days': {
-                    'orders': recent_orders_count,
-                    'revenue': float(recent_revenue),
+                    'orders': total_orders,
+                    'revenue': float(total_revenue),
                 },
-                'this_week_orders': this_week_orders,
-                'last_week_orders': last_week_orders,
-                'week_over_week_change': (
-                    ((this_week_orders - last_week_orders) / last_week_orders * 100)
-                    if last_week_orders > 0 
-                    else 100.0 if this_week_orders > 0 else 0.0
-                ),
+                'this_week_orders': order_totals['this_week_orders'],
+                'last_week_orders': order_totals['last_week_orders'],
+                'week_over_week_change': order_totals['week_over_week_change'],
             },
             'daily_revenue_chart': list(daily_revenue),
             'top_products': list(top_products),
@@ -353,11 +363,8 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
         days = int(request.query_params.get('days', 365))
         start_datetime = timezone.now() - timedelta(days=days)
         
-        products = Product.objects.filter(seller=request.user)
-        product_ids = list(products.values_list('id', flat=True))
-        
         order_items = OrderItem.objects.filter(
-            product_id__in=product_ids,
+            seller=request.user,
             order__created_at__gte=start_datetime
         )
         
@@ -390,8 +397,16 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
             order_count=Count('id')
         ).filter(order_count__gt=1).count()
         
+        totals = order_summary(request.user, start_date=start_datetime.date())
+        
         return Response({
             'date_range': f'Last {days} days',
+            'totals': {
+                'orders': totals['total_orders'],
+                'revenue': float(totals['total_revenue']),
+                'units_sold': totals['units_sold'],
+                'orders_by_status': totals['orders_by_status'],
+            },
             'sales_by_category': list(sales_by_category),
             'product_performance': list(product_performance),
             'customer_insights': {
@@ -411,63 +426,26 @@ class SellerProfileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        products = Product.objects.filter(seller=request.user)
-        product_ids = list(products.values_list('id', flat=True))
-        
-        order_items = OrderItem.objects.filter(product_id__in=product_ids)
-        order_ids = order_items.values_list('order_id', flat=True).distinct()
+        # Seller's items are attached with one prefetch, buyers with a join
+        seller_items = OrderItem.objects.filter(seller=request.user).order_by('id')
+        orders = Order.objects.filter(
+            id__in=seller_items.values('order_id')
+        ).select_related('user').prefetch_related(
+            Prefetch('items', queryset=seller_items, to_attr='seller_items')
+        )
         
         # Get status filter
         status_filter = request.query_params.get('status', None)
-        orders = Order.objects.filter(id__in=order_ids)
-        
         if status_filter:
             orders = orders.filter(status=status_filter)
         
-        orders = orders.order_by('-created_at')
+        # Keyset pagination keeps every page at a constant number of queries
+        paginator = SellerOrderPagination()
+        page = paginator.paginate_queryset(orders, request, view=self)
         
-        # Build response
-        orders_data = []
-        for order in orders:
-            seller_items = order_items.filter(order=order)
-            order_total = seller_items.aggregate(
-                total=Sum(F('price') * F('quantity'))
-            )['total'] or 0
-            
-            orders_data.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'status': order.status,
-                'customer': {
-                    'name': f"{order.user.first_name} {order.user.last_name}".strip() or order.user.username,
-                    'email': order.user.email,
-                },
-                'shipping_address': {
-                    'address': order.shipping_address,
-                    'city': order.shipping_city,
-                    'state': order.shipping_state,
-                    'zip': order.shipping_zip,
-                    'country': order.shipping_country,
-                },
-                'phone': order.phone,
-                'items': [
-                    {
-                        'product_name': item.product_name,
-                        'quantity': item.quantity,
-                        'price': float(item.price),
-                        'total': float(item.price * item.quantity)
-                    }
-                    for item in seller_items
-                ],
-                'total': float(order_total),
-                'created_at': order.created_at,
-                'updated_at': order.updated_at,
-            })
-        
-        return Response({
-            'count': len(orders_data),
-            'results': orders_data
-        })
+        return paginator.get_paginated_response([
+            serialize_seller_order(order, order.seller_items) for order in page
+        ])
 
 
 class SellerOrderViewSet(viewsets.ViewSet):
@@ -492,23 +470,15 @@ class SellerOrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get seller's products
-        products = Product.objects.filter(seller=request.user)
-        product_ids = list(products.values_list('id', flat=True))
-        
-        if not product_ids:
-            return Response(
-                {'error': 'No products found for this seller.'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Get order items for this seller's products
-        order_items = OrderItem.objects.filter(product_id__in=product_ids)
-        order_ids = order_items.values_list('order_id', flat=True).distinct()
+        # Get order items sold by this seller
+        order_items = OrderItem.objects.filter(seller=request.user)
         
         # Get the specific order if it contains seller's products
         try:
-            order = Order.objects.get(id=order_id, id__in=order_ids)
+            order = Order.objects.select_related('user').get(
+                id=order_id,
+                id__in=order_items.filter(order_id=order_id).values('order_id')
+            )
         except Order.DoesNotExist:
             return Response(
                 {'error': 'Order not found or does not contain your products.'},
@@ -516,40 +486,8 @@ class SellerOrderViewSet(viewsets.ViewSet):
             )
         
         # Get seller's items in this order
-        seller_items = order_items.filter(order=order)
-        
-        # Build response
-        order_data = {
-            'id': order.id,
-            'order_number': order.order_number,
-            'status': order.status,
-            'customer': {
-                'name': f"{order.user.first_name} {order.user.last_name}".strip() or order.user.username,
-                'email': order.user.email,
-            },
-            'shipping_address': {
-                'address': order.shipping_address,
-                'city': order.shipping_city,
-                'state': order.shipping_state,
-                'zip': order.shipping_zip,
-                'country': order.shipping_country,
-            },
-            'phone': order.phone,
-            'items': [
-                {
-                    'product_name': item.product_name,
-                    'quantity': item.quantity,
-                    'price': float(item.price),
-                    'total': float(item.price * item.quantity)
-                }
-                for item in seller_items
-            ],
-            'total': float(seller_items.aggregate(
-                total=Sum(F('price') * F('quantity'))
-            )['total'] or 0),
-            'created_at': order.created_at,
-            'updated_at': order.updated_at,
-        }
+        seller_items = list(order_items.filter(order=order).order_by('id'))
+        order_data = serialize_seller_order(order, seller_items)
         
         return Response(order_data)
     
@@ -571,23 +509,15 @@ class SellerOrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get seller's products
-        products = Product.objects.filter(seller=request.user)
-        product_ids = list(products.values_list('id', flat=True))
-        
-        if not product_ids:
-            return Response(
-                {'error': 'No products found for this seller.'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Get order items for this seller's products
-        order_items = OrderItem.objects.filter(product_id__in=product_ids)
-        order_ids = order_items.values_list('order_id', flat=True).distinct()
+        # Get order items sold by this seller
+        order_items = OrderItem.objects.filter(seller=request.user)
         
         # Get the specific order if it contains seller's products
         try:
-            order = Order.objects.get(id=order_id, id__in=order_ids)
+            order = Order.objects.select_related('user').get(
+                id=order_id,
+                id__in=order_items.filter(order_id=order_id).values('order_id')
+            )
         except Order.DoesNotExist:
             return Response(
                 {'error': 'Order not found or does not contain your products.'},
@@ -601,64 +531,84 @@ class SellerOrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get seller's items in this order (not already refunded)
-        seller_items = order_items.filter(order=order, is_refunded=False)
-        
-        if not seller_items.exists():
-            return Response(
-                {'error': 'No items to refund in this order.'},
-                status=status.HTTP_400_BAD_REQUEST
+        with transaction.atomic():
+            # Lock the seller's unrefunded items so a concurrent cancel cannot
+            # refund them (and restore their stock) twice
+            seller_items = list(
+                order_items.select_for_update().filter(order=order, is_refunded=False)
             )
-        
-        # Calculate refund amount
-        refund_amount = Decimal('0.00')
-        for item in seller_items:
-            refund_amount += item.price * item.quantity
-        
-        # Get buyer
-        buyer = order.user
-        
-        # Restore stock for cancelled items
-        for item in seller_items:
-            if item.product:
-                item.product.stock += item.quantity
-                item.product.save()
-        
-        # Mark items as refunded
-        now = timezone.now()
-        for item in seller_items:
-            item.is_refunded = True
-            item.refunded_at = now
-            item.save()
-        
-        # Add refund amount to buyer's wallet
-        buyer.wallet_balance += refund_amount
-        buyer.save()
-        
-        # Create refund record
-        refund = Refund.objects.create(
-            order=order,
-            seller=request.user,
-            amount=refund_amount,
-            status='processed',
-            reason=request.data.get('reason', 'Order cancelled by seller'),
-            notes=request.data.get('notes', ''),
-            processed_at=now
-        )
-        
-        # Create status history
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='refunded',
-            notes=f'Partially refunded by seller. Amount: ${refund_amount}',
-            changed_by=request.user
-        )
-        
-        # If all items in the order are refunded, mark order as refunded
-        remaining_items = OrderItem.objects.filter(order=order, is_refunded=False)
-        if not remaining_items.exists():
-            order.status = 'refunded'
-            order.save()
+            
+            if not seller_items:
+                return Response(
+                    {'error': 'No items to refund in this order.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Calculate refund amount
+            refund_amount = sum(
+                (item.price * item.quantity for item in seller_items),
+                Decimal('0.00')
+            )
+            
+            # Mark items as refunded; the is_refunded guard makes this the
+            # single point where a racing request loses
+            now = timezone.now()
+            updated = OrderItem.objects.filter(
+                id__in=[item.id for item in seller_items],
+                is_refunded=False
+            ).update(is_refunded=True, refunded_at=now)
+            if updated != len(seller_items):
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': 'Order items were refunded concurrently.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            for item in seller_items:
+                item.is_refunded = True
+                item.refunded_at = now
+            
+            # Restore stock for cancelled items in one UPDATE
+            restocked = {}
+            for item in seller_items:
+                if item.product_id:
+                    restocked[item.product_id] = restocked.get(item.product_id, 0) + item.quantity
+            increment_stock(restocked)
+            
+            # Debit the refunded items from the seller's ledger (the update
+            # above sends no post_save, so the signal handler does not)
+            ledger.record_refunds(seller_items)
+            
+            # Add refund amount to buyer's wallet
+            buyer = order.user
+            type(buyer).objects.filter(pk=buyer.pk).update(
+                wallet_balance=F('wallet_balance') + refund_amount
+            )
+            buyer.refresh_from_db(fields=['wallet_balance'])
+            
+            # Create refund record (refreshes the seller rollups for this order)
+            Refund.objects.create(
+                order=order,
+                seller=request.user,
+                amount=refund_amount,
+                status='processed',
+                reason=request.data.get('reason', 'Order cancelled by seller'),
+                notes=request.data.get('notes', ''),
+                processed_at=now
+            )
+            
+            # Create status history
+            OrderStatusHistory.objects.create(
+                order=order,
+                status='refunded',
+                notes=f'Partially refunded by seller. Amount: ${refund_amount}',
+                changed_by=request.user
+            )
+            
+            # If all items in the order are refunded, mark order as refunded
+            remaining_items = OrderItem.objects.filter(order=order, is_refunded=False)
+            if not remaining_items.exists():
+                order.status = 'refunded'
+                order.save()
         
         return Response({
             'success': True,
@@ -708,39 +658,13 @@ class SellerPayoutViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            requested_amount = float(requested_amount)
-        except (ValueError, TypeError):
+            requested_amount = Decimal(str(requested_amount)).quantize(Decimal('0.01'))
+        except (ArithmeticError, ValueError, TypeError):
             return Response(
                 {'error': 'Invalid amount.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calculate available balance
-        products = Product.objects.filter(seller=request.user)
-        product_ids = list(products.values_list('id', flat=True))
-        
-        order_items = OrderItem.objects.filter(product_id__in=product_ids)
-        order_ids = order_items.values_list('order_id', flat=True).distinct()
-        orders = Order.objects.filter(id__in=order_ids)
-        
-        # Calculate total revenue
-        total_revenue = order_items.aggregate(
-            total=Sum(F('price') * F('quantity'))
-        )['total'] or 0
-        
-        # Get existing payouts
-        pending_payout = SellerPayout.objects.filter(
-            seller=request.user,
-            status__in=['pending', 'processing']
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        total_payouts = SellerPayout.objects.filter(
-            seller=request.user,
-            status='completed'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        available_balance = max(0, float(total_revenue) - float(pending_payout) - float(total_payouts))
-        
         # Validate request
         if requested_amount <= 0:
             return Response(
@@ -748,22 +672,21 @@ class SellerPayoutViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if requested_amount > available_balance:
+        # Create payout request and debit the ledger under the balance row lock
+        try:
+            payout = ledger.request_payout(
+                request.user,
+                requested_amount,
+                period_start=timezone.now().date() - timedelta(days=365),
+                period_end=timezone.now().date(),
+                notes=request.data.get('notes', '')
+            )
+        except ledger.InsufficientBalanceError as e:
             return Response(
-                {'error': f'Requested amount exceeds available balance of ${available_balance:.2f}.'},
+                {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create payout request
-        payout = SellerPayout.objects.create(
-            seller=request.user,
-            amount=requested_amount,
-            status='pending',
-            period_start=timezone.now().date() - timedelta(days=365),
-            period_end=timezone.now().date(),
-            notes=request.data.get('notes', '')
-        )
-        
         # Serialize and return
         serializer = self.get_serializer(payout)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file